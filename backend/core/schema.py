@@ -0,0 +1,33 @@
+from rest_framework.schemas.inspectors import ViewInspector
+
+
+class LazyAutoSchema(ViewInspector):
+    """
+    DEFAULT_SCHEMA_CLASS placeholder. DRF instantiates the schema class for
+    every view at import time, and drf_spectacular's AutoSchema pulls in its
+    plumbing (and with it rest_framework.test, django.test, unittest, yaml) on
+    every worker boot. This stands in for it and builds the real AutoSchema
+    the first time a view's schema is used, i.e. when docs are generated.
+
+    Views decorated with @extend_schema bring their own schema class and are
+    unaffected.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._schema = None
+
+    def _real(self):
+        if self._schema is None:
+            from drf_spectacular.openapi import AutoSchema
+            self._schema = AutoSchema()
+        return self._schema
+
+    # ViewInspector is a data descriptor on the view class; delegate both ways
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return self._real().__get__(instance, owner)
+
+    def __set__(self, instance, other):
+        self._real().__set__(instance, other)
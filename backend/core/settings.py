@@ -45,11 +45,14 @@ INSTALLED_APPS = [
     'planning',
 ]
 
-REST_FRAMEWORK = {"DEFAULT_SCHEMA_CLASS":"drf_spectacular.openapi.AutoSchema"}
+# drf_spectacular's AutoSchema, loaded when the schema is first generated (core/schema.py)
+REST_FRAMEWORK = {"DEFAULT_SCHEMA_CLASS":"core.schema.LazyAutoSchema"}
 
 SPECTACULAR_SETTINGS = {
     "TITLE": "Spotter API",
     "VERSION": "1.0.0",
+    # the docs views are loaded lazily (core/urls.py) and not listed themselves
+    "SERVE_INCLUDE_SCHEMA": False,
 }
 
 MIDDLEWARE = [
@@ -15,14 +15,26 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from planning.views import plan_trip, render_logbook
+from planning.views import (
+    plan_trip, plan_sweep, render_logbook, replan_trip, list_trips, trip_detail, trip_day_svg, vector_tile,
+    import_addresses,
+)
 from django.urls import path
 
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-    SpectacularRedocView,
-)
+
+def _docs_view(name, **initkwargs):
+    """A drf_spectacular view, imported on its first request rather than at worker boot."""
+    view = None
+
+    def docs(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            from drf_spectacular import views
+            view = getattr(views, name).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+    docs.csrf_exempt = True
+    return docs
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -35,9 +47,16 @@ urlpatterns = [
     # Friendly aliases: hyphen + trailing slashes
     path("api/plan-trip/", plan_trip, name="plan_trip_dash"),
     path("api/logbook/", render_logbook, name="logbook_slash"),
+    path("api/plan-sweep/", plan_sweep, name="plan_sweep"),
+    path("api/replan/", replan_trip, name="replan"),
+    path("api/trips/", list_trips, name="trips"),
+    path("api/trips/<int:trip_id>/", trip_detail, name="trip_detail"),
+    path("api/trips/<int:trip_id>/days/<str:date>.svg", trip_day_svg, name="trip_day_svg"),
+    path("api/geocode/import/", import_addresses, name="import_addresses"),
+    path("tiles/<int:z>/<int:x>/<int:y>.mvt", vector_tile, name="vector_tile"),
 
     # --- OpenAPI / Swagger ---
-    path("api/schema/", SpectacularAPIView.as_view(api_version="1.0.0"), name="schema"),
-    path("api/schema/swagger/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
-    path("api/schema/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
+    path("api/schema/", _docs_view("SpectacularAPIView", api_version="1.0.0"), name="schema"),
+    path("api/schema/swagger/", _docs_view("SpectacularSwaggerView", url_name="schema"), name="swagger-ui"),
+    path("api/schema/redoc/", _docs_view("SpectacularRedocView", url_name="schema"), name="redoc"),
 ]
@@ -0,0 +1,21 @@
+# Picked up by `gunicorn core.wsgi:application` run from this directory.
+# The app and its read-only data (planning/warmup.py) are loaded once in the
+# master; workers fork from it warm and share those pages copy-on-write.
+import os
+import time
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+preload_app = True
+# request time limit; the CSV upload endpoint keeps its geocoding well inside it
+timeout = int(os.environ.get("WEB_TIMEOUT", "60"))
+
+
+def when_ready(server):
+    from planning.warmup import freeze, warm_up
+
+    t0 = time.perf_counter()
+    for name, seconds, status in warm_up():
+        server.log.info("warm-up %-18s %7.1f ms  %s", name, seconds * 1000, status)
+    freeze()
+    server.log.info("warm-up done in %.1f ms", (time.perf_counter() - t0) * 1000)
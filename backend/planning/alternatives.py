@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from .routing import osrm_routes, route_geometry, encode_polyline6
+from .spatial import simplify, CORRIDOR_TOL_M
+
+# OSRM offers alternatives only between two coordinates, so a trip is routed
+# leg by leg (current -> stop -> stop ...) and candidates are assembled from
+# per-leg options.
+LEG_WORKERS = 4
+
+
+class _Leg:
+    """One OSRM leg route, decoded and simplified exactly once."""
+
+    __slots__ = ("route", "pts", "cum", "total_m", "keep")
+
+    def __init__(self, route):
+        self.route = route
+        self.pts, self.cum, self.total_m = route_geometry(route["polyline"])
+        self.keep = simplify(self.pts, CORRIDOR_TOL_M)
+
+
+def leg_options(points, alternatives):
+    """[(lng, lat)] -> per leg, its OSRM routes (primary first). Legs are fetched concurrently."""
+    pairs = [[a, b] for a, b in zip(points, points[1:])]
+
+    def fetch(pair):
+        return [_Leg(r) for r in osrm_routes(pair, annotations=True, alternatives=alternatives)]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(LEG_WORKERS, len(pairs)))) as ex:
+        return list(ex.map(fetch, pairs))
+
+
+def _join(arrays, offsets):
+    """Concatenate cumulative arrays; each later one drops its leading 0 and is shifted."""
+    out = list(arrays[0])
+    for arr, off in zip(arrays[1:], offsets[1:]):
+        out.extend(v + off for v in arr[1:])
+    return out
+
+
+def combine(legs):
+    """
+    Stitch leg routes into one route dict (the shape osrm_route returns, with
+    annotations) plus its geometry tuple for _enrich_stops. Shared legs are
+    never decoded twice: points, distances and simplified indices are reused.
+    """
+    pts, keep = list(legs[0].pts), list(legs[0].keep)
+    for leg in legs[1:]:
+        base = len(pts) - 1
+        pts.extend(leg.pts[1:])
+        keep.extend(base + i for i in leg.keep if i > 0)
+
+    dist_off, dur_off, m_off = [], [], []
+    d = t = m = 0.0
+    for leg in legs:
+        dist_off.append(d)
+        dur_off.append(t)
+        m_off.append(m)
+        d += leg.route["distance_m"]
+        t += leg.route["duration_s"]
+        m += leg.total_m
+
+    route = {
+        "polyline": encode_polyline6(pts),
+        "distance_m": d,
+        "duration_s": t,
+        "distance_miles": d * 0.000621371,
+        "duration_hours": t / 3600.0,
+        "leg_durations_s": [leg.route["duration_s"] for leg in legs],
+        "cum_duration_s": _join([leg.route["cum_duration_s"] for leg in legs], dur_off),
+        "cum_distance_m": _join([leg.route["cum_distance_m"] for leg in legs], dist_off),
+    }
+    cum = _join([leg.cum for leg in legs], m_off)
+    return route, (pts, cum, m, keep)
+
+
+def route_candidates(points, alternatives):
+    """
+    Up to alternatives + 1 candidate routes through `points`, fastest first:
+    the best option on every leg, then single-leg deviations onto each
+    alternative. Each is (route, geometry) as returned by combine().
+    """
+    options = leg_options(points, alternatives)
+    choices = [[0] * len(options)]
+    for k, opts in enumerate(options):
+        for j in range(1, len(opts)):
+            choice = [0] * len(options)
+            choice[k] = j
+            choices.append(choice)
+
+    def seconds(choice):
+        return sum(options[k][j].route["duration_s"] for k, j in enumerate(choice))
+
+    # the all-primary route stays first; deviations by added time
+    picked = [choices[0]] + sorted(choices[1:], key=seconds)[:alternatives]
+    return [combine([options[k][j] for k, j in enumerate(choice)]) for choice in picked]
@@ -0,0 +1,346 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+import zlib
+from collections import deque
+from datetime import date, datetime, timedelta
+from multiprocessing import Pool
+
+from .hos import (
+    OFF, SB, D, ON,
+    MAX_DRIVE_DAY, MAX_DUTY_WIN, BREAK_AFTER_D, BREAK_MIN, OVERNIGHT_OFF, CYCLE_MAX, CYCLE_DAYS, RESTART_OFF,
+    QUANT_MIN,
+)
+from .hos_opt import _pairs
+from .logbook import normalize_segments, _hhmm_to_min
+
+# Rule limits in minutes, from the planner's constants.
+DRIVE_LIMIT   = int(MAX_DRIVE_DAY * 60)
+WINDOW_LIMIT  = int(MAX_DUTY_WIN * 60)
+BREAK_AFTER   = int(BREAK_AFTER_D * 60)
+BREAK_LEN     = int(BREAK_MIN * 60)
+RESET_LEN     = int(OVERNIGHT_OFF * 60)
+SPLIT_MIN_LEN = 2 * 60
+SPLIT_SB_LEN  = 7 * 60
+CYCLE_LIMIT   = int(CYCLE_MAX * 60)
+RESTART_LEN   = int(RESTART_OFF * 60)
+
+RULES = ("11_hour", "14_hour", "30_min_break", "70_hour")
+
+# ELD duty-status spellings, including the event codes 1-4.
+STATUS_ALIASES = {
+    "OFF": OFF, "OFF_DUTY": OFF, "1": OFF,
+    "SB": SB, "SLEEPER": SB, "SLEEPER_BERTH": SB, "2": SB,
+    "D": D, "DR": D, "DRIVING": D, "3": D,
+    "ON": ON, "ON_DUTY": ON, "4": ON,
+}
+
+
+class DriverState:
+    """
+    Rolling HOS state for one driver, fed one normalized log day at a time
+    (logbook.normalize_segments output). Rests are applied when they end,
+    with the same 10-hour / sleeper-berth pairing as the optimizing planner.
+    """
+
+    __slots__ = ("driver", "drive", "win", "brk", "seg_d", "seg_w", "prev_len", "prev_sb",
+                 "rest_run", "rest_sb", "sb_run", "idle_run", "days", "last_day")
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.drive = self.win = self.brk = self.seg_d = self.seg_w = 0
+        self.prev_len, self.prev_sb = 0, False
+        self.rest_run = self.rest_sb = self.sb_run = self.idle_run = 0
+        self.days = deque(maxlen=CYCLE_DAYS)    # [ordinal, on-duty minutes]
+        self.last_day = None
+
+    def _end_rest(self):
+        run, sb = self.rest_run, self.rest_sb >= SPLIT_SB_LEN
+        self.rest_run = self.rest_sb = self.sb_run = 0
+        if run >= RESTART_LEN:
+            for entry in self.days:
+                entry[1] = 0
+        if run >= RESET_LEN or not (self.win or self.seg_w):
+            # long enough to reset, or no duty period open yet
+            if run >= RESET_LEN:
+                self.drive = self.win = self.seg_d = self.seg_w = 0
+                self.prev_len, self.prev_sb = 0, False
+            return
+        if run >= SPLIT_MIN_LEN and self.prev_len and _pairs(self.prev_len // QUANT_MIN, self.prev_sb,
+                                                            run // QUANT_MIN, sb):
+            self.drive, self.win = self.seg_d, self.seg_w
+            self.seg_d = self.seg_w = 0
+            self.prev_len, self.prev_sb = run, sb
+        elif run >= SPLIT_MIN_LEN:
+            self.win += run
+            self.seg_d = self.seg_w = 0
+            self.prev_len, self.prev_sb = run, sb
+        else:
+            self.win += run
+            self.seg_w += run
+
+    def _violation(self, rule, day, minute, excess):
+        at = datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute)
+        return {"driver": self.driver, "rule": rule, "date": day.isoformat(),
+                "at": at.isoformat(timespec="minutes"), "excess_min": excess}
+
+    def feed_day(self, day, segments):
+        """Apply one normalized day; yield violations as they occur."""
+        ordinal = day.toordinal()
+        if self.last_day is not None:
+            # days with no log count as off duty
+            for _ in range(self.last_day + 1, ordinal):
+                self.rest_run += 24 * 60
+                self.idle_run += 24 * 60
+        self.last_day = ordinal
+        self.days.append([ordinal, 0])
+        today = self.days[-1]
+
+        for seg in segments:
+            status = seg["status"]
+            a, b = _hhmm_to_min(seg["from"]), _hhmm_to_min(seg["to"])
+            length = b - a
+            if length <= 0:
+                continue
+            if status in (OFF, SB):
+                self.rest_run += length
+                # longest unbroken stretch in the berth during this rest
+                self.sb_run = self.sb_run + length if status == SB else 0
+                self.rest_sb = max(self.rest_sb, self.sb_run)
+                self.idle_run += length
+                continue
+
+            if self.rest_run:
+                self._end_rest()
+            if status == ON:
+                self.idle_run += length
+                self.win += length
+                self.seg_w += length
+                today[1] += length
+                continue
+
+            # driving: every limit is checked at the minute it is crossed
+            if self.idle_run >= BREAK_LEN:
+                self.brk = 0
+            self.idle_run = 0
+            cycle = sum(m for o, m in self.days if o > ordinal - CYCLE_DAYS)
+            for rule, used, limit in (
+                ("11_hour", self.drive, DRIVE_LIMIT),
+                ("14_hour", self.win, WINDOW_LIMIT),
+                ("30_min_break", self.brk, BREAK_AFTER),
+                ("70_hour", cycle, CYCLE_LIMIT),
+            ):
+                excess = used + length - limit
+                if excess > 0:
+                    yield self._violation(rule, day, a + max(0, limit - used), min(excess, length))
+            self.drive += length
+            self.win += length
+            self.brk += length
+            self.seg_d += length
+            self.seg_w += length
+            today[1] += length
+
+
+def _open_text(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="")
+    return open(path, newline="")
+
+def _clock(value):
+    """ "H:MM"/"HH:MM" between 00:00 and 24:00 -> "HH:MM"; ValueError otherwise."""
+    hh, sep, mm = str(value).strip().partition(":")
+    if not sep or not (hh.isdigit() and len(hh) <= 2 and mm.isdigit() and len(mm) == 2):
+        raise ValueError(f"not a HH:MM time: {value!r}")
+    h, m = int(hh), int(mm)
+    if m > 59 or h > 24 or (h == 24 and m):
+        raise ValueError(f"not a HH:MM time: {value!r}")
+    return f"{h:02d}:{m:02d}"
+
+def _day_rows(rec):
+    """
+    One input record -> [(driver, date, status, from, to)], one per log day.
+    Records carry either date/from/to (the planner's segment model) or
+    ISO start/end timestamps, which are split at midnight (local wall time).
+    Dates come out as YYYY-MM-DD and times as HH:MM; anything that doesn't
+    parse raises ValueError.
+    """
+    driver = str(rec.get("driver") or rec.get("driver_id") or "").strip()
+    status = STATUS_ALIASES.get(str(rec.get("status", "")).strip().upper())
+    if not driver or status is None:
+        return None
+    if rec.get("date"):
+        day = date.fromisoformat(str(rec["date"]).strip()).isoformat()
+        return [(driver, day, status, _clock(rec["from"]), _clock(rec["to"]))]
+    start = datetime.fromisoformat(str(rec["start"])).replace(tzinfo=None)
+    end = datetime.fromisoformat(str(rec["end"])).replace(tzinfo=None)
+    if end <= start:
+        raise ValueError("record ends before it starts")
+    rows = []
+    while start < end:
+        midnight = datetime.combine(start.date() + timedelta(days=1), datetime.min.time())
+        stop = min(end, midnight)
+        rows.append((driver, start.date().isoformat(), status, start.strftime("%H:%M"),
+                     "24:00" if stop == midnight else stop.strftime("%H:%M")))
+        start = stop
+    return rows
+
+def read_records(path):
+    """Stream records from CSV or NDJSON (optionally .gz); never loads the file."""
+    name = path[:-3] if path.endswith(".gz") else path
+    with _open_text(path) as fh:
+        if name.endswith((".ndjson", ".jsonl")):
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(fh)
+
+def iter_day_rows(paths, stats):
+    for path in paths:
+        for rec in read_records(path):
+            stats["records"] += 1
+            try:
+                rows = _day_rows(rec)
+            except (KeyError, TypeError, ValueError):
+                rows = None
+            if rows is None:
+                stats["invalid"] += 1
+                continue
+            yield from rows
+
+def _clean_day(segs, stats):
+    """Drop (and count) segments that overlap an earlier one of the same day."""
+    out = []
+    end = 0
+    for seg in sorted(segs, key=lambda s: _hhmm_to_min(s["from"])):
+        if _hhmm_to_min(seg["from"]) < end:
+            stats["overlapping"] += 1
+            continue
+        out.append(seg)
+        end = _hhmm_to_min(seg["to"])
+    return out
+
+def audit_rows(rows, stats):
+    """
+    Validate (driver, date, status, from, to) rows, chronological per driver
+    (drivers may interleave). Each driver's current day is buffered, then
+    normalized and applied when the next day starts; violations are yielded
+    as soon as the day is applied. Segments that end before they start, or
+    overlap another segment of the same day (e.g. two logs for one date),
+    are counted in stats and left out rather than merged.
+    """
+    drivers = {}
+    pending = {}    # driver -> (date string, [segments])
+
+    def flush(driver):
+        day_str, segs = pending.pop(driver)
+        state = drivers.get(driver)
+        if state is None:
+            state = drivers[driver] = DriverState(driver)
+            stats["drivers"] += 1
+        yield from state.feed_day(date.fromisoformat(day_str), normalize_segments(_clean_day(segs, stats)))
+
+    for driver, day_str, status, hhmm_from, hhmm_to in rows:
+        if _hhmm_to_min(hhmm_to) <= _hhmm_to_min(hhmm_from):
+            stats["backwards"] += 1
+            continue
+        cur = pending.get(driver)
+        if cur is not None and cur[0] != day_str:
+            if day_str < cur[0]:
+                stats["out_of_order"] += 1
+                continue
+            yield from _count(flush(driver), stats)
+            cur = None
+        if cur is None:
+            state = drivers.get(driver)
+            if state is not None and state.last_day is not None and date.fromisoformat(day_str).toordinal() <= state.last_day:
+                stats["out_of_order"] += 1
+                continue
+            cur = pending[driver] = (day_str, [])
+        cur[1].append({"status": status, "from": hhmm_from, "to": hhmm_to})
+    for driver in list(pending):
+        yield from _count(flush(driver), stats)
+
+def _count(violations, stats):
+    for v in violations:
+        stats[v["rule"]] += 1
+        yield v
+
+
+def new_stats():
+    return dict.fromkeys(("records", "invalid", "backwards", "overlapping", "out_of_order", "drivers") + RULES, 0)
+
+def merge_stats(into, other):
+    for k, v in other.items():
+        into[k] += v
+    return into
+
+def _partition(job):
+    """Split one input file into per-driver-hash TSV shard parts."""
+    index, path, shards, tmpdir = job
+    stats = new_stats()
+    outs = [open(os.path.join(tmpdir, f"shard{k:04d}.part{index:05d}.tsv"), "w") for k in range(shards)]
+    try:
+        for row in iter_day_rows([path], stats):
+            outs[zlib.crc32(row[0].encode()) % shards].write("\t".join(row) + "\n")
+    finally:
+        for fh in outs:
+            fh.close()
+    return stats
+
+def _shard_rows(parts):
+    for part in parts:
+        with open(part) as fh:
+            for line in fh:
+                yield tuple(line.rstrip("\n").split("\t"))
+        os.remove(part)
+
+def _audit_shard(job):
+    """Validate one shard in a worker; violations are spooled to out_path for the parent to stream back."""
+    parts, out_path = job
+    stats = new_stats()
+    with open(out_path, "w") as out:
+        for v in audit_rows(_shard_rows(parts), stats):
+            out.write(json.dumps(v) + "\n")
+    return out_path, stats
+
+def _read_violations(path):
+    with open(path) as fh:
+        for line in fh:
+            yield json.loads(line)
+    os.remove(path)
+
+
+class FleetAudit:
+    """
+    Audit ELD logs across a fleet. Input files are read in the order given
+    (chronological per driver). With workers > 1, each file is partitioned
+    by driver hash into shards in parallel, then shards are validated in a
+    process pool and their violations streamed back as each shard finishes.
+    Memory is bounded by one log day per active driver, not by input size
+    or the number of violations.
+    """
+
+    def __init__(self, paths, workers=None, shards=None):
+        self.paths = list(paths)
+        self.workers = workers or os.cpu_count() or 1
+        self.shards = shards or self.workers * 4
+        self.stats = new_stats()
+
+    def __iter__(self):
+        if self.workers == 1:
+            yield from audit_rows(iter_day_rows(self.paths, self.stats), self.stats)
+            return
+        with tempfile.TemporaryDirectory(prefix="spotter-audit-") as tmpdir, Pool(self.workers) as pool:
+            jobs = [(i, path, self.shards, tmpdir) for i, path in enumerate(self.paths)]
+            for stats in pool.imap(_partition, jobs):
+                merge_stats(self.stats, stats)
+            shards = [(
+                [os.path.join(tmpdir, f"shard{k:04d}.part{i:05d}.tsv") for i in range(len(self.paths))],
+                os.path.join(tmpdir, f"shard{k:04d}.ndjson"),
+            ) for k in range(self.shards)]
+            for out_path, stats in pool.imap_unordered(_audit_shard, shards):
+                merge_stats(self.stats, stats)
+                yield from _read_violations(out_path)
@@ -0,0 +1,99 @@
+import bisect
+import csv
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from .routing import point_at_distance
+from .spatial import GridIndex, corridor_query
+
+MILE_M = 1609.344
+
+FUEL_RANGE_MILES = 1000.0   # fuel at least once every this many miles
+CORRIDOR_MILES   = 2.0      # how far off the route a station may be
+ALIGN_MILES      = 25.0     # station this close to an HOS stop is fueled during it
+
+# CSV with columns name,lat,lng (extra columns ignored).
+STATIONS_PATH_ENV = "SPOTTER_FUEL_STATIONS"
+DEFAULT_STATIONS_PATH = Path(__file__).resolve().parent.parent / "data" / "fuel_stations.csv"
+
+
+class FuelStations:
+    def __init__(self):
+        self.index = GridIndex(cell_deg=0.25)
+        self.names = []
+
+    def add(self, name, lat, lng):
+        self.index.add(lat, lng)
+        self.names.append(name)
+
+
+@lru_cache(maxsize=4)
+def load_stations(path: str):
+    stations = FuelStations()
+    with open(path, newline="") as fh:
+        for row in csv.DictReader(fh):
+            try:
+                stations.add(row.get("name") or "Fuel station", float(row["lat"]), float(row["lng"]))
+            except (KeyError, TypeError, ValueError):
+                continue
+    return stations
+
+def get_stations():
+    """Configured station dataset, or None when no dataset is available."""
+    path = os.environ.get(STATIONS_PATH_ENV) or str(DEFAULT_STATIONS_PATH)
+    if not os.path.exists(path):
+        return None
+    return load_stations(path)
+
+def _near_any(sorted_vals, x, tol):
+    i = bisect.bisect_left(sorted_vals, x)
+    return any(abs(sorted_vals[k] - x) <= tol for k in (i - 1, i) if 0 <= k < len(sorted_vals))
+
+def plan_fuel_stops(pts, cum, hos_along_m=(), stations=None, keep=None,
+                    range_miles=FUEL_RANGE_MILES, corridor_miles=CORRIDOR_MILES, align_miles=ALIGN_MILES):
+    """
+    Choose fuel stops along a decoded route so no stretch exceeds range_miles.
+    Within each reachable window the furthest station wins, preferring one
+    within align_miles of an HOS break/overnight (hos_along_m, metres along
+    the route). With no station in the second half of the tank the furthest
+    one before it is used; only where the corridor has none in range is a
+    stop placed on the route at the range limit with near=None.
+    keep: optional pre-simplified vertex indices (see spatial.corridor_query).
+    Returns [{along_m, lat, lng, near}] in route order.
+    """
+    total = cum[-1] if cum else 0.0
+    range_m = range_miles * MILE_M
+    align_m = align_miles * MILE_M
+    hos_sorted = sorted(hos_along_m)
+
+    cands = []
+    if stations is not None and len(stations.index):
+        found = corridor_query(stations.index, pts, cum, corridor_miles * MILE_M, keep=keep)
+        cands = sorted((along, row) for row, (along, _off) in found.items())
+    along_keys = [c[0] for c in cands]
+
+    out = []
+    pos = 0.0
+    while total - pos > range_m:
+        limit = pos + range_m
+        # don't refuel within the first half of the tank
+        lo = bisect.bisect_right(along_keys, pos + range_m / 2)
+        hi = bisect.bisect_right(along_keys, limit)
+        # nothing in the second half: refuel early rather than where there's no fuel
+        window = cands[lo:hi] or cands[bisect.bisect_right(along_keys, pos):hi]
+        if window:
+            aligned = [c for c in window if _near_any(hos_sorted, c[0], align_m)]
+            along, row = (aligned or window)[-1]
+            out.append({
+                "along_m": along,
+                "lat": stations.index.lats[row],
+                "lng": stations.index.lngs[row],
+                "near": stations.names[row],
+            })
+            pos = along
+        else:
+            p = point_at_distance(pts, cum, limit)
+            out.append({"along_m": limit, "lat": p["lat"], "lng": p["lng"], "near": None})
+            pos = limit
+    return out
@@ -0,0 +1,293 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import islice
+
+from .revgeo import PLACES_PATH_ENV, DEFAULT_PLACES_PATH, STATE_ABBR
+from .routing import nominatim_search
+
+# Bulk address geocoding: rows stream through in chunks, each distinct address
+# is resolved from (in order) this run's LRU, the places gazetteer, the
+# GeocodedAddress table, and only then Nominatim under a shared rate limit.
+
+CHUNK_ROWS = 200            # rows per GeocodedAddress lookup query
+LRU_SIZE = 10_000           # distinct addresses remembered within a run
+CHECKPOINT_ROWS = 500
+CHECKPOINT_S = 5.0
+NOMINATIM_RATE = 1.0        # requests per second (Nominatim usage policy)
+
+RESULT_FIELDS = ("lat", "lng", "display_name", "source", "status")
+
+_STATES = {name.casefold(): abbr.casefold() for name, abbr in STATE_ABBR.items()}
+_COUNTRY = {"us", "usa", "u s a", "united states", "united states of america"}
+_JUNK = re.compile(r"[^\w\s,#/-]")
+
+
+def normalize_address(text):
+    """Case, spacing, punctuation and state-name insensitive key for an address."""
+    s = _JUNK.sub(" ", unicodedata.normalize("NFKC", text or "").casefold().replace(".", ""))
+    parts = [" ".join(p.split()) for p in s.split(",")]
+    parts = [p for p in parts if p]
+    if parts and parts[-1] in _COUNTRY:
+        parts.pop()
+    return ", ".join(_STATES.get(p, p) for p in parts)
+
+def address_key(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+@lru_cache(maxsize=2)
+def load_gazetteer(path: str):
+    """
+    Forward lookup over the revgeo places CSV: normalized "city, st" ->
+    {lat, lng, display_name}. Where a name repeats in a state the first row wins.
+    """
+    out = {}
+    with open(path, newline="") as fh:
+        for row in csv.DictReader(fh):
+            try:
+                label = f"{row['name']}, {row['state']}"
+                place = {"lat": float(row["lat"]), "lng": float(row["lng"]), "display_name": label}
+            except (KeyError, TypeError, ValueError):
+                continue
+            out.setdefault(normalize_address(label), place)
+    return out
+
+def get_gazetteer():
+    """Configured gazetteer, or None when no places dataset is available."""
+    path = os.environ.get(PLACES_PATH_ENV) or str(DEFAULT_PLACES_PATH)
+    if not os.path.exists(path):
+        return None
+    return load_gazetteer(path)
+
+
+class RateLimiter:
+    """
+    At most `per_s` calls per second to the upstream named `name`, across
+    threads and worker processes: the next free slot lives in a RateLimitSlot
+    row, claimed in a transaction, so every limiter with the same name shares it.
+    """
+
+    def __init__(self, per_s, name="nominatim"):
+        self.interval = 1.0 / per_s
+        self.name = name
+
+    def _claim(self, deadline):
+        from django.db import transaction
+        from django.db.models import F
+        from .models import RateLimitSlot
+        RateLimitSlot.objects.get_or_create(name=self.name)
+        with transaction.atomic():
+            # write first: takes the row lock (and SQLite's write lock) before reading
+            rows = RateLimitSlot.objects.filter(name=self.name)
+            rows.update(next_at=F("next_at"))
+            slot = max(rows.values_list("next_at", flat=True).get(), time.time())
+            if deadline is not None and slot > deadline:
+                return None
+            rows.update(next_at=slot + self.interval)
+        return slot
+
+    def wait(self, deadline=None):
+        """
+        Sleep until this call's slot. With a deadline (epoch seconds) a slot
+        after it is not taken and False is returned at once.
+        """
+        slot = self._claim(deadline)
+        if slot is None:
+            return False
+        delay = slot - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        return True
+
+# shared by every Nominatim caller: imports (upload endpoint and command) and routing.geocode_place
+nominatim_limiter = RateLimiter(NOMINATIM_RATE)
+
+
+class AddressImport:
+    """
+    Geocode the rows of a CSV file object lazily. Iterating yields
+    (row number, row dict, result) in input order, where result has
+    RESULT_FIELDS; status is ok, not_found, error (upstream failed, not
+    cached, so a later run retries it) or empty. Memory is bounded by
+    CHUNK_ROWS rows and the LRU, whatever the file size.
+
+    With budget_s, no upstream request is started once that many seconds have
+    passed since iteration began (waits for the rate limit included):
+    iteration stops before the row that needed it and stopped_at holds its
+    row number. Everything before it is cached, so a rerun gets there fast.
+    """
+
+    def __init__(self, fh, columns=("address",), upstream=True, limiter=None, budget_s=None):
+        self.reader = csv.DictReader(fh)
+        self.columns = list(columns)
+        self.upstream = upstream
+        self.budget_s = budget_s
+        self.deadline = None
+        self.stopped_at = None
+        self.limiter = limiter or nominatim_limiter
+        self.gazetteer = get_gazetteer() or {}
+        self.lru = OrderedDict()
+        self.stats = dict.fromkeys(("rows", "ok", "not_found", "error", "empty",
+                                    "lru", "gazetteer", "cache", "nominatim"), 0)
+        missing = [c for c in self.columns if c not in (self.reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+    @property
+    def fieldnames(self):
+        return list(self.reader.fieldnames)
+
+    def address(self, row):
+        """The row's address: its non-blank address columns joined with ", "."""
+        return ", ".join(v for v in (" ".join(str(row.get(c) or "").split()) for c in self.columns) if v)
+
+    def _remember(self, key, result):
+        self.lru[key] = result
+        if len(self.lru) > LRU_SIZE:
+            self.lru.popitem(last=False)
+
+    def _cached(self, keys):
+        from .models import GeocodedAddress
+        return {g.key: g for g in GeocodedAddress.objects.filter(key__in=keys)}
+
+    def _lookup(self, query, key):
+        from .models import GeocodedAddress
+        if not self.limiter.wait(self.deadline):
+            return None, None
+        try:
+            place = nominatim_search(query)
+        except Exception:
+            return None, "error"
+        defaults = {"query": query, "found": place is not None}
+        if place is not None:
+            defaults.update(place)
+        GeocodedAddress.objects.update_or_create(key=key, defaults=defaults)
+        return place, "ok" if place is not None else "not_found"
+
+    def _resolve(self, chunk):
+        """[(row number, row)] -> results in order, as each resolves; one batched cache query per chunk."""
+        queries = []
+        for _, row in chunk:
+            text = self.address(row)
+            norm = normalize_address(text)
+            queries.append((text, norm, address_key(norm) if norm else None))
+        todo = {k for _, n, k in queries if k and k not in self.lru and n not in self.gazetteer}
+        cached = self._cached(list(todo)) if todo else {}
+
+        for (n, _), (query, norm, key) in zip(chunk, queries):
+            if key is None:
+                yield self._result(None, "", "empty")
+                continue
+            hit = self.lru.get(key)
+            if hit is not None:
+                self.lru.move_to_end(key)
+                self.stats["lru"] += 1
+                yield hit
+                continue
+            if norm in self.gazetteer:
+                result = self._result(self.gazetteer[norm], "gazetteer", "ok")
+            elif key in cached:
+                place = cached[key].as_place()
+                result = self._result(place, "cache", "ok" if place else "not_found")
+            elif self.upstream:
+                place, status = self._lookup(query, key)
+                if status is None:
+                    self.stopped_at = n
+                    return
+                result = self._result(place, "nominatim", status)
+            else:
+                result = self._result(None, "", "not_found")
+            if result["source"]:
+                self.stats[result["source"]] += 1
+            if result["status"] != "error":
+                self._remember(key, result)
+            yield result
+
+    @staticmethod
+    def _result(place, source, status):
+        place = place or {}
+        return {"lat": place.get("lat"), "lng": place.get("lng"), "display_name": place.get("display_name", ""),
+                "source": source, "status": status}
+
+    def rows(self, skip=0):
+        if self.budget_s is not None:
+            self.deadline = time.time() + self.budget_s
+        rows = enumerate(self.reader, start=1)
+        if skip:
+            rows = islice(rows, skip, None)
+        while True:
+            chunk = list(islice(rows, CHUNK_ROWS))
+            if not chunk:
+                return
+            for (n, row), result in zip(chunk, self._resolve(chunk)):
+                self.stats["rows"] += 1
+                self.stats[result["status"]] += 1
+                yield n, row, result
+            if self.stopped_at is not None:
+                return
+
+    def __iter__(self):
+        return self.rows()
+
+
+def _load_progress(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+def _save_progress(path, progress):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as fh:
+        json.dump(progress, fh)
+    os.replace(tmp, path)
+
+def import_csv(in_path, out_path, columns=("address",), upstream=True, restart=False, limiter=None):
+    """
+    Geocode in_path into out_path (the input columns plus RESULT_FIELDS),
+    writing rows as they resolve. Progress (rows done, output size) is
+    checkpointed to out_path + ".progress"; a later call resumes from it,
+    dropping any rows written after the last checkpoint. Returns the stats
+    of this run plus "resumed_at".
+    """
+    progress_path = out_path + ".progress"
+    progress = None if restart else _load_progress(progress_path)
+    if progress and progress.get("input") != os.path.abspath(in_path):
+        raise ValueError(f"{progress_path} belongs to another input; pass restart to start over")
+
+    with open(in_path, newline="", encoding="utf-8-sig") as src:
+        job = AddressImport(src, columns=columns, upstream=upstream, limiter=limiter)
+        done = progress["rows"] if progress else 0
+        if progress:
+            with open(out_path, "r+b") as fh:
+                fh.truncate(progress["offset"])
+        with open(out_path, "a" if progress else "w", newline="", encoding="utf-8") as out:
+            writer = csv.writer(out)
+            if not progress:
+                writer.writerow(job.fieldnames + list(RESULT_FIELDS))
+
+            def checkpoint():
+                out.flush()
+                _save_progress(progress_path, {"input": os.path.abspath(in_path), "rows": done, "offset": out.tell()})
+
+            checkpoint()
+            last_rows, last_t = done, time.monotonic()
+            for n, row, result in job.rows(skip=done):
+                writer.writerow([row.get(f, "") for f in job.fieldnames] +
+                                ["" if result[f] is None else result[f] for f in RESULT_FIELDS])
+                done = n
+                if done - last_rows >= CHECKPOINT_ROWS or time.monotonic() - last_t >= CHECKPOINT_S:
+                    checkpoint()
+                    last_rows, last_t = done, time.monotonic()
+    os.remove(progress_path)
+    stats = dict(job.stats)
+    stats["resumed_at"] = progress["rows"] if progress else 0
+    return stats
@@ -1,5 +1,6 @@
 from datetime import datetime, timedelta, timezone
 from dateutil import parser as dtparser
+from .traffic import FlatProfile
 
 OFF="OFF"; SB="SB"; D="D"; ON="ON"
 
@@ -9,8 +10,11 @@ BREAK_AFTER_D = 8.0      # hours driving before 30-min break
 BREAK_MIN     = 0.5      # hours (30 min)
 OVERNIGHT_OFF = 10.0     # hours
 CYCLE_MAX     = 70.0     # hours over 8 days
+CYCLE_DAYS    = 8
+RESTART_OFF   = 34.0     # hours off that restart the cycle
 
 DEFAULT_START_HOUR = 8.0
+PRETRIP_H = 0.25         # hours, pre-trip inspection before a multi-stop run
 
 QUANT_MIN = 5
 
@@ -27,84 +31,185 @@ def _fmt(dt: datetime) -> str:
         return "24:00"
     return f"{q//60:02d}:{q%60:02d}"
 
-def plan_schedule(total_drive_hours: float, start_dt: datetime, current_cycle_used: float):
+def _minutes(hhmm: str) -> int:
+    hh, mm = map(int, hhmm.split(":"))
+    return hh * 60 + mm
+
+def log_days(timeline, tz):
+    """
+    Split a duty timeline [(status, from, to)] (datetimes in order, gaps off
+    duty) at local midnights into log days [{"date", "segments", "totals"}],
+    one per calendar date, from the start of the timeline to 24:00 on the
+    day it ends.
+    """
+    days = []
+    prev_end = None
+
+    def add(status, a, b):
+        while a < b:
+            midnight = datetime.combine(a.date() + timedelta(days=1), datetime.min.time(), tzinfo=tz)
+            end = min(b, midnight)
+            date = a.strftime("%Y-%m-%d")
+            if not days or days[-1]["date"] != date:
+                days.append({"date": date, "segments": [], "totals": {OFF: 0.0, SB: 0.0, D: 0.0, ON: 0.0}})
+            frm, to = _fmt(a), "24:00" if end == midnight else _fmt(end)
+            if _minutes(to) > _minutes(frm):
+                days[-1]["segments"].append({"status": status, "from": frm, "to": to})
+                days[-1]["totals"][status] += (_minutes(to) - _minutes(frm)) / 60.0
+            a = end
+
+    for status, a, b in timeline:
+        a, b = a.astimezone(tz), b.astimezone(tz)
+        if prev_end is not None and a > prev_end:
+            add(OFF, prev_end, a)
+        add(status, a, b)
+        prev_end = b
+    if prev_end is not None and prev_end.time() != datetime.min.time():
+        add(OFF, prev_end, datetime.combine(prev_end.date() + timedelta(days=1), datetime.min.time(), tzinfo=tz))
+    return days
+
+def plan_schedule(total_drive_hours: float, start_dt: datetime, current_cycle_used: float, profile=None,
+                  waypoints=None, first_stop=None, last_stop=None, state=None):
+    """
+    total_drive_hours is the route's baseline (OSRM) duration. With a
+    traffic.SpeedProfile, each driving chunk covers baseline hours at the
+    speed factor of the hours it spans, so wall-clock driving (and thus
+    break/overnight timing) follows time of day. Every stop carries
+    `progress`: the fraction of the route's baseline duration done so far.
+
+    waypoints: intermediate on-duty stops, sorted by position:
+        {"at_h": baseline drive hours from start, "duration_h", "type",
+         "ready_at": datetime or None, **extra keys copied onto the stop}
+    Driving halts exactly at each waypoint; the truck waits OFF until
+    ready_at, then works ON. Any non-driving period of 30+ minutes counts
+    as the 30-minute break.
+    first_stop / last_stop: {"type", "duration_h", **extra} for the on-duty
+    period at the start and end of the trip (default: 1 hr pickup / dropoff);
+    last_stop may also carry "ready_at".
+    state: mid-day duty counters {"drive_today", "duty_elapsed",
+    "since_break_drive"} (hours) when re-planning from a driver's current
+    position; the first on-duty period is then skipped.
+    A wait of 10+ hours for a waypoint's ready_at is a 10-hour reset. The
+    plan's "days" are calendar days in start_dt's time zone (log_days).
+    """
     if start_dt.tzinfo is None:
         start_dt = start_dt.replace(tzinfo=timezone.utc)
+    if profile is None:
+        profile = FlatProfile()
+    waypoints = waypoints or []
+    first_stop = first_stop or {"type": "pickup_on_duty", "duration_h": 1.0}
+    last_stop = last_stop or {"type": "dropoff_on_duty", "duration_h": 1.0}
+    last_h = last_stop["duration_h"]
+    last_ready = last_stop.get("ready_at")
+
+    def _wait_h(at):
+        return max(0.0, (last_ready - at).total_seconds() / 3600.0) if last_ready is not None else 0.0
 
     remaining_drive = total_drive_hours
+    driven_total = 0.0
     cursor = start_dt
+    wp_i = 0
+
+    def _progress():
+        if total_drive_hours <= 0:
+            return 1.0
+        return min(1.0, max(0.0, 1.0 - remaining_drive / total_drive_hours))
+
+    def _stop(spec, at, duration_h, progress):
+        extra = {k: v for k, v in spec.items() if k not in ("type", "duration_h", "at_h", "ready_at")}
+        return {"type": spec["type"], "at_iso": at.isoformat(), "duration_min": int(round(duration_h * 60)),
+                "progress": progress, **extra}
 
-    days = []
     stops = []
+    timeline = []   # (status, from, to) datetimes in order; gaps are off duty
     cycle_used = current_cycle_used
 
-    def _span_hours(a, b):
-        def mins(hhmm: str) -> int:
-            if hhmm == "24:00":
-                return 24 * 60
-            hh, mm = map(int, hhmm.split(":"))
-            return hh * 60 + mm
-        am = mins(a)
-        bm = mins(b)
-        if bm <= am:
-            bm += 24 * 60
-        return (bm - am) / 60.0
-
-    def push_day(day_date, segments):
-        # compute totals
-        totals = {OFF:0.0, SB:0.0, D:0.0, ON:0.0}
-        for s in segments:
-            t = _span_hours(s["from"], s["to"])
-            totals[s["status"]] += t
-        days.append({"date": day_date.strftime("%Y-%m-%d"), "segments": segments, "totals": totals})
-
-    first_day = True
+    def log(status, a, b):
+        if b > a:
+            timeline.append((status, a, b))
+
+    first_shift = state is None
+    delivered = False
     while remaining_drive > 1e-6:
-        day_start = cursor
-        day_date = day_start.date()
         duty_elapsed = 0.0
         drive_today = 0.0
         since_break_drive = 0.0
-        segments = []
-
-        # 1h ON at pickup only on first day at the beginning
-        if first_day:
-            on1_from = day_start
-            on1_to = on1_from + _h(1.0)
-            segments.append({"status": ON, "from": _fmt(on1_from), "to": _fmt(on1_to)})
-            duty_elapsed += 1.0
-            cycle_used += 1.0
-            stops.append({"type":"pickup_on_duty", "at_iso": on1_from.isoformat(), "duration_min": 60})
+        if state is not None:
+            duty_elapsed = state.get("duty_elapsed", 0.0)
+            drive_today = state.get("drive_today", 0.0)
+            since_break_drive = state.get("since_break_drive", 0.0)
+            state = None
+
+        # on-duty period (pickup / pre-trip) only at the start of the first shift
+        if first_shift:
+            on1_from = cursor
+            on1_to = on1_from + _h(first_stop["duration_h"])
+            log(ON, on1_from, on1_to)
+            duty_elapsed += first_stop["duration_h"]
+            cycle_used += first_stop["duration_h"]
+            stops.append(_stop(first_stop, on1_from, first_stop["duration_h"], 0.0))
             cursor = on1_to
-            first_day = False
+            first_shift = False
+
+        while remaining_drive > 1e-6 or wp_i < len(waypoints):
+            # intermediate stops reached at the current position
+            while wp_i < len(waypoints) and waypoints[wp_i]["at_h"] <= total_drive_hours - remaining_drive + 1e-6:
+                wp = waypoints[wp_i]
+                wp_i += 1
+                idle = 0.0
+                ready = wp.get("ready_at")
+                if ready is not None and ready > cursor:
+                    idle = (ready - cursor).total_seconds() / 3600.0
+                    log(OFF, cursor, ready)
+                    cursor = ready
+                if idle >= OVERNIGHT_OFF - 1e-9:
+                    # waiting this long is a 10-hour reset: a fresh shift starts here
+                    duty_elapsed = drive_today = since_break_drive = idle = 0.0
+                work_to = cursor + _h(wp["duration_h"])
+                log(ON, cursor, work_to)
+                stops.append(_stop(wp, cursor, wp["duration_h"], _progress()))
+                duty_elapsed += idle + wp["duration_h"]
+                cycle_used += wp["duration_h"]
+                cursor = work_to
+                if idle + wp["duration_h"] >= BREAK_MIN - 1e-9:
+                    since_break_drive = 0.0
+            if remaining_drive <= 1e-6 or duty_elapsed >= MAX_DUTY_WIN - 1e-9:
+                break
 
-        while remaining_drive > 1e-6:
             if since_break_drive >= BREAK_AFTER_D - 1e-9:
                 # Insert 30-min OFF
                 br_from = cursor
                 br_to = br_from + _h(BREAK_MIN)
-                segments.append({"status": OFF, "from": _fmt(br_from), "to": _fmt(br_to)})
+                log(OFF, br_from, br_to)
                 duty_elapsed += BREAK_MIN
                 cursor = br_to
                 since_break_drive = 0.0
-                stops.append({"type":"break_30min", "at_iso": br_from.isoformat(), "duration_min": 30})
+                stops.append({"type":"break_30min", "at_iso": br_from.isoformat(), "duration_min": 30, "progress": _progress()})
                 if duty_elapsed >= MAX_DUTY_WIN - 1e-9:
                     break
 
-            # Max drive we can still do today
+            # Max drive we can still do in this shift
             drive_left_today = min(MAX_DRIVE_DAY - drive_today, MAX_DUTY_WIN - duty_elapsed)
             if drive_left_today <= 1e-9:
                 break
 
-            chunk = min(remaining_drive, drive_left_today, BREAK_AFTER_D - since_break_drive)
-            if chunk <= 1e-9:
-                chunk = min(remaining_drive, drive_left_today)
+            cap = min(drive_left_today, BREAK_AFTER_D - since_break_drive)
+            if cap <= 1e-9:
+                cap = drive_left_today
+            target = remaining_drive
+            if wp_i < len(waypoints):
+                target = min(target, waypoints[wp_i]["at_h"] - (total_drive_hours - remaining_drive))
+            chunk = profile.wall_hours(cursor, target, limit=cap)
 
             drv_from = cursor
             drv_to = drv_from + _h(chunk)
-            segments.append({"status": D, "from": _fmt(drv_from), "to": _fmt(drv_to)})
+            log(D, drv_from, drv_to)
 
-            remaining_drive -= chunk
+            covered = profile.progress(drv_from, chunk)
+            if covered >= target - 1e-9:
+                covered = target
+            remaining_drive = 0.0 if covered >= remaining_drive - 1e-9 else remaining_drive - covered
+            driven_total += chunk
             drive_today += chunk
             duty_elapsed += chunk
             since_break_drive += chunk
@@ -115,54 +220,52 @@ def plan_schedule(total_drive_hours: float, start_dt: datetime, current_cycle_us
                 break
 
         if remaining_drive <= 1e-6:
-            if duty_elapsed + 1.0 <= MAX_DUTY_WIN + 1e-9:
+            if duty_elapsed + _wait_h(cursor) + last_h <= MAX_DUTY_WIN + 1e-9:
+                wait = _wait_h(cursor)
+                if wait > 0:
+                    log(OFF, cursor, cursor + _h(wait))
+                    duty_elapsed += wait
+                    cursor += _h(wait)
                 on2_from = cursor
-                on2_to = on2_from + _h(1.0)
-                segments.append({"status": ON, "from": _fmt(on2_from), "to": _fmt(on2_to)})
-                duty_elapsed += 1.0
-                cycle_used += 1.0
-                stops.append({"type":"dropoff_on_duty", "at_iso": on2_from.isoformat(), "duration_min": 60})
+                on2_to = on2_from + _h(last_h)
+                log(ON, on2_from, on2_to)
+                duty_elapsed += last_h
+                cycle_used += last_h
+                stops.append(_stop(last_stop, on2_from, last_h, 1.0))
                 cursor = on2_to
+                delivered = True
             else:
                 # We'll place drop-off tomorrow after the overnight
                 pass
 
-        logical_off_start = cursor
-
-        end_of_day = datetime.combine(
-            day_date, datetime.max.time().replace(hour=23, minute=59), tzinfo=cursor.tzinfo
-        ) + timedelta(minutes=1)
-        if cursor < end_of_day:
-            segments.append({"status": OFF, "from": _fmt(cursor), "to": "24:00"})
-        push_day(day_date, segments)
-
-        if remaining_drive > 1e-6 or (remaining_drive <= 1e-6 and duty_elapsed + 1.0 > MAX_DUTY_WIN - 1e-9):
-            overnight_start = logical_off_start
+        if remaining_drive > 1e-6 or not delivered:
+            overnight_start = cursor
             overnight_end = overnight_start + _h(OVERNIGHT_OFF)
             stops.append({
                 "type": "overnight_off",
                 "at_iso": overnight_start.isoformat(),
                 "duration_min": int(OVERNIGHT_OFF * 60),
+                "progress": _progress(),
             })
-
+            log(OFF, overnight_start, overnight_end)
             cursor = overnight_end
 
             if remaining_drive <= 1e-6:
-                on2_from = cursor
-                on2_to = on2_from + _h(1.0)
-                day_date = on2_from.date()
-                segments = [{"status": ON, "from": _fmt(on2_from), "to": _fmt(on2_to)}]
-                stops.append({"type": "dropoff_on_duty", "at_iso": on2_from.isoformat(), "duration_min": 60})
+                on2_from = cursor + _h(_wait_h(cursor))
+                on2_to = on2_from + _h(last_h)
+                log(OFF, cursor, on2_from)
+                log(ON, on2_from, on2_to)
+                stops.append(_stop(last_stop, on2_from, last_h, 1.0))
+                cycle_used += last_h
                 cursor = on2_to
-                segments.append({"status": OFF, "from": _fmt(cursor), "to": "24:00"})
-                push_day(day_date, segments)
 
     cycle_exceeded = (cycle_used > CYCLE_MAX + 1e-9)
 
     return {
-        "days": days,
+        "days": log_days(timeline, start_dt.tzinfo),
         "stops": stops,
         "summary": {
+            "drive_hours": driven_total,
             "cycle_used_hours": cycle_used,
             "cycle_max_hours": CYCLE_MAX,
             "cycle_exceeded": cycle_exceeded
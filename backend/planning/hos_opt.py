@@ -0,0 +1,336 @@
+import heapq
+import math
+import time
+from datetime import timedelta, timezone
+from dateutil import parser as dtparser
+
+from .hos import (
+    OFF, SB, D, ON,
+    MAX_DRIVE_DAY, MAX_DUTY_WIN, BREAK_AFTER_D, BREAK_MIN, OVERNIGHT_OFF, CYCLE_MAX, QUANT_MIN,
+    plan_schedule,
+)
+from .traffic import FlatProfile
+
+# Everything below runs on a QUANT_MIN (5-minute) clock: a "tick".
+TICKS_PER_H = 60 // QUANT_MIN
+
+DRIVE_T = int(MAX_DRIVE_DAY * TICKS_PER_H)
+WIN_T   = int(MAX_DUTY_WIN * TICKS_PER_H)
+BRK_T   = int(BREAK_AFTER_D * TICKS_PER_H)
+BREAK_T = int(BREAK_MIN * TICKS_PER_H)
+RESET_T = int(OVERNIGHT_OFF * TICKS_PER_H)
+
+# Sleeper-berth split: a period of 7+ hours in the berth paired with another
+# of 2+ hours (off duty or berth), together at least 10 hours. Once the pair
+# completes, the 11/14-hour limits are counted from the end of the first
+# period, and neither period counts against the 14-hour window.
+SPLIT_MIN_T = 2 * TICKS_PER_H
+SPLIT_SB_T  = 7 * TICKS_PER_H
+
+# Rest periods the search may take where it stops: (status, hours).
+RESTS = ((OFF, BREAK_MIN), (OFF, 2.0), (OFF, 3.0), (SB, 7.0), (SB, 8.0), (OFF, OVERNIGHT_OFF))
+
+# Heavier traffic ahead than this (speed-factor step) makes stopping at the
+# hour boundary a candidate, so a rest can absorb the slow hour.
+TRAFFIC_STEP = 0.12
+
+# Search budget: states expanded, and seconds (checked every CHECK_EVERY
+# expansions). On running out, the best plan found so far is returned.
+MAX_LABELS = 200_000
+TIME_BUDGET_S = 0.2
+CHECK_EVERY = 32
+
+
+def _ticks_up(hours):
+    return int(math.ceil(hours * TICKS_PER_H - 1e-9))
+
+def _pairs(a_t, a_sb, b_t, b_sb):
+    if a_t < SPLIT_MIN_T or b_t < SPLIT_MIN_T or a_t + b_t < RESET_T:
+        return False
+    return (a_sb and a_t >= SPLIT_SB_T) or (b_sb and b_t >= SPLIT_SB_T)
+
+
+class _Label:
+    """One search state. Counters are in ticks; pos in baseline drive hours."""
+
+    __slots__ = ("t", "pos", "wp", "drive", "win", "brk", "seg_d", "seg_w", "prev_t", "prev_sb",
+                 "rested", "parent", "event")
+
+    def __init__(self, t, pos, wp, drive, win, brk, seg_d, seg_w, prev_t, prev_sb, rested, parent, event):
+        self.t, self.pos, self.wp = t, pos, wp
+        self.drive, self.win, self.brk = drive, win, brk
+        self.seg_d, self.seg_w = seg_d, seg_w
+        self.prev_t, self.prev_sb = prev_t, prev_sb
+        self.rested = rested
+        self.parent, self.event = parent, event
+
+    def _child(self, event, **kw):
+        vals = {s: getattr(self, s) for s in self.__slots__}
+        vals.update(kw, parent=self, event=event)
+        return _Label(**vals)
+
+    def drive_for(self, ticks, pos):
+        return self._child(
+            (D, self.t, self.t + ticks, None),
+            t=self.t + ticks, pos=pos, rested=False,
+            drive=self.drive + ticks, win=self.win + ticks, brk=self.brk + ticks,
+            seg_d=self.seg_d + ticks, seg_w=self.seg_w + ticks,
+        )
+
+    def rest(self, status, ticks, spec=None):
+        """
+        Off duty or in the berth for `ticks`, applying the 10-hour / split
+        rules. spec "wait" marks idling for a stop's ready time (no stop entry).
+        """
+        kw = {"t": self.t + ticks, "rested": True}
+        if ticks >= BREAK_T:
+            kw["brk"] = 0
+        sb = status == SB
+        if ticks >= RESET_T:
+            kw.update(drive=0, win=0, seg_d=0, seg_w=0, prev_t=0, prev_sb=False)
+        elif ticks >= SPLIT_MIN_T and self.prev_t and _pairs(self.prev_t, self.prev_sb, ticks, sb):
+            kw.update(drive=self.seg_d, win=self.seg_w, seg_d=0, seg_w=0, prev_t=ticks, prev_sb=sb)
+        elif ticks >= SPLIT_MIN_T:
+            kw.update(win=self.win + ticks, seg_d=0, seg_w=0, prev_t=ticks, prev_sb=sb)
+        else:
+            kw.update(win=self.win + ticks, seg_w=self.seg_w + ticks)
+        return self._child((status, self.t, self.t + ticks, spec), **kw)
+
+    def work(self, ticks, spec, idle=0):
+        """On duty (not driving) for `ticks`; with `idle` ticks before it, 30+ minutes resets the break."""
+        kw = {"t": self.t + ticks, "win": self.win + ticks, "seg_w": self.seg_w + ticks}
+        if idle + ticks >= BREAK_T:
+            kw["brk"] = 0
+        return self._child((ON, self.t, self.t + ticks, spec), **kw)
+
+    def dominates(self, other):
+        return (self.t <= other.t and self.pos >= other.pos - 1e-9 and self.drive <= other.drive and self.win <= other.win
+                and self.brk <= other.brk and self.seg_d <= other.seg_d and self.seg_w <= other.seg_w
+                and (not other.prev_t or (self.prev_t >= other.prev_t and self.prev_sb >= other.prev_sb))
+                and (other.rested or not self.rested))
+
+
+def _end_ticks(schedule, start_dt):
+    last = schedule["stops"][-1]
+    end = dtparser.isoparse(last["at_iso"]) + timedelta(minutes=last["duration_min"])
+    return _ticks_up((end - start_dt).total_seconds() / 3600.0)
+
+
+def optimize_schedule(total_drive_hours, start_dt, current_cycle_used, profile=None,
+                      waypoints=None, first_stop=None, last_stop=None, state=None, budget_s=TIME_BUDGET_S):
+    """
+    Earliest-arrival HOS plan. Same arguments and result shape as
+    hos.plan_schedule, which it uses as the incumbent for a best-first
+    branch-and-bound over 5-minute states: at each stop the search tries a
+    30-minute break, 2/3-hour off-duty or 7/8-hour sleeper-berth split
+    halves, or a 10-hour reset, and with a traffic profile may stop early at
+    an hour boundary ahead of heavier traffic. Labels at the same position
+    are pruned by dominance (no later and no worse on every HOS counter).
+    Falls back to the greedy plan when nothing beats it within budget_s
+    seconds (MAX_LABELS states); the best plan found so far otherwise.
+    """
+    deadline = time.perf_counter() + budget_s   # the greedy incumbent counts against the budget too
+    if start_dt.tzinfo is None:
+        start_dt = start_dt.replace(tzinfo=timezone.utc)
+    if profile is None:
+        profile = FlatProfile()
+    waypoints = waypoints or []
+    first_stop = first_stop or {"type": "pickup_on_duty", "duration_h": 1.0}
+    last_stop = last_stop or {"type": "dropoff_on_duty", "duration_h": 1.0}
+
+    greedy = plan_schedule(total_drive_hours, start_dt, current_cycle_used, profile=profile,
+                           waypoints=waypoints, first_stop=first_stop, last_stop=last_stop, state=state)
+    greedy["summary"]["planner"] = "greedy"
+    best_t = _end_ticks(greedy, start_dt)
+    best = None
+
+    def at(ticks):
+        return start_dt + timedelta(minutes=ticks * QUANT_MIN)
+
+    def ready_wait(ticks, ready):
+        if ready is None:
+            return 0
+        return max(0, _ticks_up((ready - at(ticks)).total_seconds() / 3600.0))
+
+    flat = isinstance(profile, FlatProfile)
+    min_factor = 1.0 if flat else min(profile.factors)
+    on_left = [0] * (len(waypoints) + 1)
+    for i in range(len(waypoints) - 1, -1, -1):
+        on_left[i] = on_left[i + 1] + _ticks_up(waypoints[i]["duration_h"])
+    last_t = _ticks_up(last_stop["duration_h"])
+
+    def bound(lb):
+        """Lower bound on the finish tick: drive, on-duty work and unavoidable rests left."""
+        drive_left = _ticks_up((total_drive_hours - lb.pos) * min_factor)
+        resets = max(0, math.ceil((drive_left - (DRIVE_T - lb.drive)) / DRIVE_T) - 1)
+        rest = resets * RESET_T
+        if not resets and lb.wp >= len(waypoints) and drive_left > BRK_T - lb.brk:
+            # no on-duty stop left to take the 30-minute break at
+            rest = BREAK_T
+        return lb.t + drive_left + on_left[lb.wp] + last_t + rest
+
+    if state is None:
+        root = _Label(0, 0.0, 0, 0, 0, 0, 0, 0, 0, False, False, None, None)
+        root = root.work(_ticks_up(first_stop["duration_h"]), first_stop)
+    else:
+        d, w, b = (_ticks_up(state.get(k, 0.0)) for k in ("drive_today", "duty_elapsed", "since_break_drive"))
+        root = _Label(0, 0.0, 0, d, w, b, d, w, 0, False, False, None, None)
+
+    frontier = {}
+    heap = []
+    seq = 0
+
+    def push(lb):
+        nonlocal seq
+        f = bound(lb)
+        if f >= best_t:
+            return
+        slot = frontier.setdefault((lb.wp, int(lb.pos)), [])
+        for other in slot:
+            if other.dominates(lb):
+                return
+        slot[:] = [o for o in slot if not lb.dominates(o)]
+        slot.append(lb)
+        seq += 1
+        heapq.heappush(heap, (f, -lb.t, seq, lb))
+
+    push(root)
+    expanded = 0
+    while heap and expanded < MAX_LABELS:
+        f, _, _, lb = heapq.heappop(heap)
+        if f >= best_t:
+            break
+        expanded += 1
+        if not expanded % CHECK_EVERY and time.perf_counter() > deadline:
+            break
+
+        # intermediate stops reached here
+        if lb.wp < len(waypoints) and waypoints[lb.wp]["at_h"] <= lb.pos + 1e-6:
+            wp = waypoints[lb.wp]
+            wait = ready_wait(lb.t, wp.get("ready_at"))
+            nxt = lb.rest(SB if wait >= SPLIT_SB_T else OFF, wait, "wait") if wait else lb
+            nxt = nxt.work(_ticks_up(wp["duration_h"]), wp, idle=wait)
+            nxt.wp = lb.wp + 1
+            nxt.rested = False
+            push(nxt)
+            continue
+
+        if lb.pos >= total_drive_hours - 1e-6 and lb.wp >= len(waypoints):
+            wait = ready_wait(lb.t, last_stop.get("ready_at"))
+            nxt = lb.rest(SB if wait >= SPLIT_SB_T else OFF, wait, "wait") if wait else lb
+            nxt = nxt.work(last_t, last_stop, idle=wait)
+            if nxt.t < best_t:
+                best_t, best = nxt.t, nxt
+            continue
+
+        avail = min(DRIVE_T - lb.drive, WIN_T - lb.win, BRK_T - lb.brk)
+        if avail > 0:
+            target = total_drive_hours
+            if lb.wp < len(waypoints):
+                target = min(target, waypoints[lb.wp]["at_h"])
+            now = at(lb.t)
+            need = _ticks_up(profile.wall_hours(now, target - lb.pos))
+            ticks = min(need, avail)
+            pos = target if need <= avail else min(target, lb.pos + profile.progress(now, ticks / TICKS_PER_H))
+            push(lb.drive_for(ticks, pos))
+            if not flat:
+                # stop at an hour boundary ahead of a slower hour
+                k = _ticks_up((60 - now.minute - now.second / 60.0) / 60.0) or TICKS_PER_H
+                while k < ticks:
+                    b = at(lb.t + k)
+                    if profile.factor_at(b) > profile.factor_at(b - timedelta(minutes=1)) + TRAFFIC_STEP:
+                        push(lb.drive_for(k, lb.pos + profile.progress(now, k / TICKS_PER_H)))
+                    k += TICKS_PER_H
+
+        if not lb.rested and (lb.drive or lb.brk):
+            for status, hours in RESTS:
+                ticks = _ticks_up(hours)
+                if ticks == BREAK_T and lb.brk == 0:
+                    continue
+                push(lb.rest(status, ticks))
+
+    if best is None:
+        return greedy
+    return _build(best, start_dt, current_cycle_used, total_drive_hours, profile, at)
+
+
+def _rest_type(status, ticks):
+    if ticks >= RESET_T:
+        return "overnight_off"
+    if status == SB:
+        return "sleeper_berth"
+    if ticks >= SPLIT_MIN_T:
+        return "off_duty_rest"
+    return "break_30min"
+
+
+def _build(lb, start_dt, current_cycle_used, total_drive_hours, profile, at):
+    """Turn the winning label's event chain into plan_schedule's days/stops/summary."""
+    events = []
+    while lb is not None:
+        if lb.event is not None and lb.event[2] > lb.event[1]:
+            events.append((lb.event, lb.pos))
+        lb = lb.parent
+    events.reverse()
+
+    stops = []
+    timeline = []
+    drive_ticks = on_ticks = 0
+    pos = 0.0
+    for (status, t0, t1, spec), pos_after in events:
+        if timeline and timeline[-1][0] == status and timeline[-1][2] == t0 and status == D:
+            timeline[-1][2] = t1
+        else:
+            timeline.append([status, t0, t1])
+        progress = min(1.0, pos / total_drive_hours) if total_drive_hours > 0 else 1.0
+        if status == D:
+            drive_ticks += t1 - t0
+            pos = pos_after
+        elif status == ON:
+            on_ticks += t1 - t0
+            extra = {k: v for k, v in spec.items() if k not in ("type", "duration_h", "at_h", "ready_at")}
+            stops.append({"type": spec["type"], "at_iso": at(t0).isoformat(),
+                          "duration_min": (t1 - t0) * QUANT_MIN, "progress": progress, **extra})
+        elif spec is None:
+            stops.append({"type": _rest_type(status, t1 - t0), "at_iso": at(t0).isoformat(),
+                          "duration_min": (t1 - t0) * QUANT_MIN, "progress": progress})
+    if stops:
+        stops[-1]["progress"] = 1.0
+
+    # split the timeline at local midnights into log days
+    days = []
+    tz = start_dt.tzinfo
+    for status, t0, t1 in timeline:
+        a, b = at(t0), at(t1)
+        while a < b:
+            midnight = (a + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            end = min(b, midnight)
+            date = a.astimezone(tz).strftime("%Y-%m-%d")
+            if not days or days[-1]["date"] != date:
+                days.append({"date": date, "segments": [], "totals": {OFF: 0.0, SB: 0.0, D: 0.0, ON: 0.0}})
+            days[-1]["segments"].append({
+                "status": status,
+                "from": a.strftime("%H:%M"),
+                "to": "24:00" if end == midnight else end.strftime("%H:%M"),
+            })
+            days[-1]["totals"][status] += (end - a).total_seconds() / 3600.0
+            a = end
+    if days:
+        last = days[-1]
+        end = at(timeline[-1][2])
+        if end.hour or end.minute:
+            last["segments"].append({"status": OFF, "from": end.strftime("%H:%M"), "to": "24:00"})
+            last["totals"][OFF] += 24.0 - (end.hour + end.minute / 60.0)
+
+    cycle_used = current_cycle_used + (drive_ticks + on_ticks) / TICKS_PER_H
+    return {
+        "days": days,
+        "stops": stops,
+        "summary": {
+            "drive_hours": drive_ticks / TICKS_PER_H,
+            "cycle_used_hours": cycle_used,
+            "cycle_max_hours": CYCLE_MAX,
+            "cycle_exceeded": cycle_used > CYCLE_MAX + 1e-9,
+            "planner": "optimal",
+        },
+    }
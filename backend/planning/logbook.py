@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import List, Dict
 
 LANES = ["OFF", "SB", "D", "ON"]
@@ -96,18 +97,44 @@ def normalize_segments(segments: List[Dict]) -> List[Dict]:
 
     return out
 
+SVG_W, SVG_H = 1000, 320
+SVG_MARGINS = (60, 30, 20, 90)    # left, top, right, bottom
+
+def _px(x: float) -> float:
+    return round(x) + 0.5
+
+@lru_cache(maxsize=1)
+def grid_svg() -> str:
+    """Opening tag, frame, hour lines and lanes: identical on every sheet, built once."""
+    width, height = SVG_W, SVG_H
+    ml, mt, mr, mb = SVG_MARGINS
+    inner_w = width - ml - mr
+    lane_h = (height - mt - mb) / (len(LANES) - 1)
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">']
+    parts.append(f'<rect x="0" y="0" width="{width}" height="{height}" fill="white" stroke="#ddd"/>')
+
+    for h in range(25):
+        x = _px(ml + inner_w * (h / 24.0))
+        parts.append(f'<line x1="{x}" y1="{mt-10}" x2="{x}" y2="{height-mb}" stroke="#e5e5e5" stroke-width="1"/>')
+        if h < 24:
+            parts.append(f'<text x="{x+2}" y="{mt-15}" font-size="10" fill="#555">{h:02d}</text>')
+
+    for idx, st in enumerate(LANES):
+        y = _px(mt + lane_h * idx)
+        parts.append(f'<line x1="{ml}" y1="{y}" x2="{width-mr}" y2="{y}" stroke="#bbb" stroke-width="1.5"/>')
+        parts.append(f'<text x="10" y="{y+4}" font-size="12" fill="#333">{st}</text>')
+    return "".join(parts)
+
 def render_svg(day_date: str, segments: List[Dict], labels: List[Dict]=None) -> str:
 
     segments = normalize_segments(segments)
 
-    width, height = 1000, 320
-    ml, mt, mr, mb = 60, 30, 20, 90
+    width, height = SVG_W, SVG_H
+    ml, mt, mr, mb = SVG_MARGINS
     inner_w = width - ml - mr
     lane_h = (height - mt - mb) / (len(LANES) - 1)
 
-    def _px(x: float) -> float:
-        return round(x) + 0.5
-
     def x_of(hhmm: str) -> float:
         hh, mm = map(int, hhmm.split(":"))
         minutes = _quant_min(hh * 60 + mm)
@@ -118,19 +145,7 @@ def render_svg(day_date: str, segments: List[Dict], labels: List[Dict]=None) ->
         idx = LANES.index(status)
         return _px(mt + lane_h * idx)
 
-    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">']
-    parts.append(f'<rect x="0" y="0" width="{width}" height="{height}" fill="white" stroke="#ddd"/>')
-
-    for h in range(25):
-        x = _px(ml + inner_w * (h / 24.0))
-        parts.append(f'<line x1="{x}" y1="{mt-10}" x2="{x}" y2="{height-mb}" stroke="#e5e5e5" stroke-width="1"/>')
-        if h < 24:
-            parts.append(f'<text x="{x+2}" y="{mt-15}" font-size="10" fill="#555">{h:02d}</text>')
-
-    for st in LANES:
-        y = y_of(st)
-        parts.append(f'<line x1="{ml}" y1="{y}" x2="{width-mr}" y2="{y}" stroke="#bbb" stroke-width="1.5"/>')
-        parts.append(f'<text x="10" y="{y+4}" font-size="12" fill="#333">{st}</text>')
+    parts = [grid_svg()]
 
     last_x = None
     last_y = None
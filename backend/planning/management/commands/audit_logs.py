@@ -0,0 +1,43 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from planning.audit import RULES, FleetAudit
+
+
+class Command(BaseCommand):
+    help = (
+        "Audit ELD duty-status logs (CSV or NDJSON, optionally .gz) for 11-hour, 14-hour, "
+        "30-minute break and 70/8 violations. Records have driver,status and either "
+        "date,from,to or start,end; pass files in chronological order."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+")
+        parser.add_argument("--out", default="-", help="NDJSON violations file (default: stdout).")
+        parser.add_argument("--workers", type=int, default=None, help="Processes (default: CPU count).")
+        parser.add_argument("--shards", type=int, default=None, help="Driver shards (default: 4 per worker).")
+
+    def handle(self, *args, **opts):
+        audit = FleetAudit(opts["paths"], workers=opts["workers"], shards=opts["shards"])
+        out = sys.stdout if opts["out"] == "-" else open(opts["out"], "w")
+        t0 = time.perf_counter()
+        try:
+            for v in audit:
+                out.write(json.dumps(v) + "\n")
+        except OSError as e:
+            raise CommandError(str(e))
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        elapsed = time.perf_counter() - t0
+
+        s = audit.stats
+        rules = ", ".join(f"{r} {s[r]}" for r in RULES)
+        self.stderr.write(self.style.SUCCESS(
+            f"{s['records']} records ({s['invalid']} invalid, {s['backwards']} backwards, "
+            f"{s['overlapping']} overlapping, {s['out_of_order']} out of order), "
+            f"{s['drivers']} drivers in {elapsed:.1f}s: {rules}"
+        ))
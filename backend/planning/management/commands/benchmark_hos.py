@@ -0,0 +1,51 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from dateutil import parser as dtparser
+from django.core.management.base import BaseCommand
+
+from planning.hos import plan_schedule
+from planning.hos_opt import optimize_schedule
+from planning.traffic import FlatProfile, get_profile
+
+
+def _finish(schedule):
+    last = schedule["stops"][-1]
+    return dtparser.isoparse(last["at_iso"]) + timedelta(minutes=last["duration_min"])
+
+
+class Command(BaseCommand):
+    help = "Compare the greedy HOS planner with the optimizing planner (finish time and solve time)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=float, nargs="+", default=[6, 12, 20, 30, 45, 60],
+                            help="Baseline drive hours per trip.")
+        parser.add_argument("--starts", type=int, nargs="+", default=[0, 6, 8, 14, 20],
+                            help="Start hours (UTC) on a Thursday.")
+        parser.add_argument("--cycle-used", type=float, default=0.0)
+        parser.add_argument("--flat", action="store_true", help="Ignore the traffic profile.")
+
+    def handle(self, *args, **opts):
+        profile = FlatProfile() if opts["flat"] else get_profile()
+        day = datetime(2025, 8, 14, tzinfo=timezone.utc)
+        self.stdout.write(f"{'drive h':>8} {'start':>6} {'greedy h':>9} {'optimal h':>10} {'saved h':>8} {'ms':>8}")
+        saved_total, solve_total, worst, runs = 0.0, 0.0, 0.0, 0
+        for hours in opts["hours"]:
+            for hour in opts["starts"]:
+                start = day + timedelta(hours=hour)
+                greedy = plan_schedule(hours, start, opts["cycle_used"], profile=profile)
+                t0 = time.perf_counter()
+                best = optimize_schedule(hours, start, opts["cycle_used"], profile=profile)
+                ms = (time.perf_counter() - t0) * 1000
+                g = (_finish(greedy) - start).total_seconds() / 3600
+                o = (_finish(best) - start).total_seconds() / 3600
+                saved_total += g - o
+                solve_total += ms
+                worst = max(worst, ms)
+                runs += 1
+                self.stdout.write(f"{hours:>8.1f} {hour:>4}:00 {g:>9.2f} {o:>10.2f} {g - o:>8.2f} {ms:>8.1f}")
+        if runs:
+            self.stdout.write(self.style.SUCCESS(
+                f"{runs} trips: {saved_total / runs:.2f} h saved on average, "
+                f"{solve_total / runs:.1f} ms per solve, {worst:.1f} ms worst"
+            ))
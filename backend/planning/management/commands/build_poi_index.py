@@ -0,0 +1,31 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from planning.poi import DEFAULT_INDEX_PATH, KINDS, write_index
+
+
+class Command(BaseCommand):
+    help = "Build the memory-mapped truck-stop/rest-area index from a CSV (name,lat,lng[,kind])."
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path")
+        parser.add_argument("--out", default=str(DEFAULT_INDEX_PATH))
+        parser.add_argument("--cell-deg", type=float, default=0.25)
+
+    def handle(self, *args, **opts):
+        def records():
+            with open(opts["csv_path"], newline="") as fh:
+                for row in csv.DictReader(fh):
+                    try:
+                        lat, lng = float(row["lat"]), float(row["lng"])
+                    except (KeyError, TypeError, ValueError):
+                        continue
+                    kind = (row.get("kind") or KINDS[0]).strip()
+                    yield (row.get("name") or kind.replace("_", " ").title(), lat, lng, kind)
+
+        try:
+            n = write_index(records(), opts["out"], cell_deg=opts["cell_deg"])
+        except OSError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {n} POIs to {opts['out']}"))
@@ -0,0 +1,40 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from planning.geoimport import RateLimiter, import_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Geocode the addresses in a CSV: the local gazetteer and geocode cache first, then "
+        "Nominatim for the rest under a rate limit. Output is the input columns plus "
+        "lat,lng,display_name,source,status. Interrupted runs resume where they stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path")
+        parser.add_argument("--out", required=True, help="Output CSV.")
+        parser.add_argument("--column", action="append", dest="columns",
+                            help="Address column; repeat to join several (default: address).")
+        parser.add_argument("--rate", type=float, default=None,
+                            help="Upstream requests per second (default: the shared 1/s Nominatim limit).")
+        parser.add_argument("--no-upstream", action="store_true", help="Only use the gazetteer and cache.")
+        parser.add_argument("--restart", action="store_true", help="Ignore saved progress and start over.")
+
+    def handle(self, *args, **opts):
+        limiter = RateLimiter(opts["rate"]) if opts["rate"] else None
+        t0 = time.perf_counter()
+        try:
+            s = import_csv(opts["csv_path"], opts["out"], columns=opts["columns"] or ["address"],
+                           upstream=not opts["no_upstream"], restart=opts["restart"], limiter=limiter)
+        except (OSError, ValueError, csv.Error) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - t0
+        resumed = f" (resumed after row {s['resumed_at']})" if s["resumed_at"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{s['rows']} rows in {elapsed:.1f}s{resumed}: {s['ok']} geocoded, {s['not_found']} not found, "
+            f"{s['error']} failed, {s['empty']} empty. Sources: {s['gazetteer']} gazetteer, "
+            f"{s['cache']} cache, {s['lru']} repeated, {s['nominatim']} Nominatim"
+        ))
@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from planning.warmup import warm_up
+
+# What a worker does at boot, run in a fresh interpreter under -X importtime.
+# (__import__ rather than importlib.import_module: only the former is timed)
+BOOT = (
+    "import django; django.setup(); "
+    "from django.conf import settings; "
+    "__import__(settings.ROOT_URLCONF); "
+    "from django.core.wsgi import get_wsgi_application; get_wsgi_application()"
+)
+
+
+def _importtime(lines):
+    """-X importtime stderr -> [(module, self us, cumulative us, depth)]."""
+    out = []
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|")
+            depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+            out.append((name.strip(), int(self_us), int(cum_us), depth))
+        except ValueError:
+            continue    # the header line
+    return out
+
+
+class Command(BaseCommand):
+    help = "Measure worker start-up: import cost per package and module, then the cost of each warm-up step."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=15, help="Rows per table.")
+        parser.add_argument("--no-warm", action="store_true", help="Only measure imports.")
+
+    def handle(self, *args, **opts):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "core.settings"))
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", BOOT], cwd=settings.BASE_DIR,
+                              env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise CommandError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "boot failed")
+        modules = _importtime(proc.stderr.splitlines())
+        top = opts["top"]
+
+        by_package = defaultdict(int)
+        for name, self_us, _, _ in modules:
+            by_package[name.split(".")[0]] += self_us
+        total = sum(by_package.values())
+        self.stdout.write(f"Imports: {len(modules)} modules, {total / 1000:.1f} ms")
+        self.stdout.write(f"\n{'package':<32} {'ms':>8} {'share':>6}")
+        for pkg, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+            self.stdout.write(f"{pkg:<32} {us / 1000:>8.1f} {100 * us / total:>5.1f}%")
+
+        self.stdout.write(f"\n{'module (incl. its imports)':<48} {'ms':>8} {'self ms':>8}")
+        roots = [m for m in modules if m[3] <= 1]
+        for name, self_us, cum_us, _ in sorted(roots, key=lambda m: -m[2])[:top]:
+            self.stdout.write(f"{name:<48} {cum_us / 1000:>8.1f} {self_us / 1000:>8.1f}")
+
+        if opts["no_warm"]:
+            return
+        self.stdout.write(f"\n{'warm-up step':<24} {'ms':>8}  status")
+        total_s = 0.0
+        for name, seconds, status in warm_up():
+            total_s += seconds
+            self.stdout.write(f"{name:<24} {seconds * 1000:>8.1f}  {status}")
+        self.stdout.write(self.style.SUCCESS(f"Warm-up: {total_s * 1000:.1f} ms"))
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('driver', models.CharField(blank=True, default='', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('start_date', models.DateField(blank=True, null=True)),
+                ('route_id', models.CharField(blank=True, db_index=True, default='', max_length=32)),
+                ('polyline', models.TextField()),
+                ('summary', models.JSONField(default=dict)),
+                ('places', models.JSONField(default=dict)),
+                ('stops', models.JSONField(default=list)),
+                ('order', models.JSONField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['driver', 'start_date'], name='planning_tr_driver_b30df9_idx'), models.Index(fields=['driver', '-id'], name='planning_tr_driver_291aef_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TripDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveSmallIntegerField()),
+                ('date', models.DateField()),
+                ('statuses', models.CharField(max_length=288)),
+                ('bounds', models.BinaryField()),
+                ('labels', models.JSONField(default=list)),
+                ('totals', models.JSONField(default=dict)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='planning.trip')),
+            ],
+            options={
+                'ordering': ['trip', 'seq'],
+                'indexes': [models.Index(fields=['trip', 'date'], name='planning_tr_trip_id_1a0b34_idx')],
+                'constraints': [models.UniqueConstraint(fields=('trip', 'seq'), name='uniq_trip_day_seq')],
+            },
+        ),
+    ]
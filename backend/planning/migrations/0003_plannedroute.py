@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:40
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planning', '0002_geocodedaddress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlannedRoute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('route_id', models.CharField(max_length=32, unique=True)),
+                ('route', models.JSONField()),
+                ('waypoints', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('last_stop', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('places_by_type', models.JSONField(default=dict)),
+                ('places_by_index', models.JSONField(default=list)),
+                ('saved_at', models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planning', '0003_plannedroute'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32, unique=True)),
+                ('next_at', models.FloatField(default=0.0)),
+            ],
+        ),
+    ]
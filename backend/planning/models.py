@@ -1,3 +1,166 @@
-from django.db import models
+from array import array
 
-# Create your models here.
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+
+# one character per duty status in TripDay.statuses
+STATUS_CODES = {"OFF": "F", "SB": "S", "D": "D", "ON": "N"}
+CODE_STATUS = {v: k for k, v in STATUS_CODES.items()}
+
+
+def _hhmm_to_min(hhmm):
+    if hhmm == "24:00":
+        return 24 * 60
+    hh, mm = map(int, hhmm.split(":"))
+    return hh * 60 + mm
+
+def _min_to_hhmm(m):
+    return "24:00" if m >= 24 * 60 else f"{m // 60:02d}:{m % 60:02d}"
+
+
+class Trip(models.Model):
+    """A planned trip. The route polyline is stored once; days live in TripDay."""
+
+    driver = models.CharField(max_length=64, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    start_date = models.DateField(null=True, blank=True)
+    route_id = models.CharField(max_length=32, blank=True, default="", db_index=True)
+    polyline = models.TextField()
+    summary = models.JSONField(default=dict)
+    places = models.JSONField(default=dict)
+    stops = models.JSONField(default=list)
+    order = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["driver", "start_date"]),
+            models.Index(fields=["driver", "-id"]),
+        ]
+
+    @classmethod
+    def from_plan(cls, plan, driver=""):
+        """Persist a plan-trip response (see views.plan_trip)."""
+        days = plan["days"]
+        with transaction.atomic():
+            trip = cls.objects.create(
+                driver=driver or "",
+                start_date=days[0]["date"] if days else None,
+                route_id=plan.get("route_id", ""),
+                polyline=plan["polyline"],
+                summary=plan["summary"],
+                places=plan["places"],
+                stops=plan["stops"],
+                order=plan.get("order"),
+            )
+            TripDay.objects.bulk_create([TripDay.from_day(trip, seq, day) for seq, day in enumerate(days)])
+        return trip
+
+    def as_plan(self):
+        out = {
+            "trip_id": self.id,
+            "route_id": self.route_id,
+            "driver": self.driver,
+            "polyline": self.polyline,
+            "summary": self.summary,
+            "places": self.places,
+            "stops": self.stops,
+            "days": [d.as_day() for d in self.days.all()],
+        }
+        if self.order is not None:
+            out["order"] = self.order
+        return out
+
+
+class TripDay(models.Model):
+    """
+    One log day, stored columnar: `statuses` holds a code per segment and
+    `bounds` the len(statuses)+1 minute marks (uint16) between them.
+    """
+
+    trip = models.ForeignKey(Trip, related_name="days", on_delete=models.CASCADE)
+    seq = models.PositiveSmallIntegerField()
+    date = models.DateField()
+    statuses = models.CharField(max_length=288)
+    bounds = models.BinaryField()
+    labels = models.JSONField(default=list)
+    totals = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ["trip", "seq"]
+        constraints = [models.UniqueConstraint(fields=["trip", "seq"], name="uniq_trip_day_seq")]
+        indexes = [models.Index(fields=["trip", "date"])]
+
+    @classmethod
+    def from_day(cls, trip, seq, day):
+        segs = day["segments"]
+        marks = array("H", [_hhmm_to_min(s["from"]) for s in segs] + ([_hhmm_to_min(segs[-1]["to"])] if segs else []))
+        return cls(
+            trip=trip,
+            seq=seq,
+            date=day["date"],
+            statuses="".join(STATUS_CODES[s["status"]] for s in segs),
+            bounds=marks.tobytes(),
+            labels=day.get("labels", []),
+            totals=day.get("totals", {}),
+        )
+
+    def segments(self):
+        marks = array("H")
+        marks.frombytes(bytes(self.bounds))
+        return [
+            {"status": CODE_STATUS[c], "from": _min_to_hhmm(marks[i]), "to": _min_to_hhmm(marks[i + 1])}
+            for i, c in enumerate(self.statuses)
+        ]
+
+    def as_day(self):
+        return {
+            "date": self.date.isoformat(),
+            "segments": self.segments(),
+            "totals": self.totals,
+            "labels": self.labels,
+        }
+
+
+class PlannedRoute(models.Model):
+    """
+    What a re-plan needs from the original plan (see replan.store_plan),
+    keyed by route id so any worker can pick the route up again.
+    """
+
+    route_id = models.CharField(max_length=32, unique=True)
+    route = models.JSONField()
+    waypoints = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    last_stop = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    places_by_type = models.JSONField(default=dict)
+    places_by_index = models.JSONField(default=list)
+    saved_at = models.DateTimeField(auto_now=True, db_index=True)
+
+
+class GeocodedAddress(models.Model):
+    """
+    Upstream geocoder answers by normalized address (geoimport.normalize_address),
+    including misses, so each distinct address is sent upstream once.
+    """
+
+    key = models.CharField(max_length=40, unique=True)   # sha1 of the normalized address
+    query = models.TextField()
+    found = models.BooleanField(default=True)
+    lat = models.FloatField(null=True, blank=True)
+    lng = models.FloatField(null=True, blank=True)
+    display_name = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def as_place(self):
+        if not self.found:
+            return None
+        return {"lat": self.lat, "lng": self.lng, "display_name": self.display_name}
+
+
+class RateLimitSlot(models.Model):
+    """
+    Next free upstream request time (epoch seconds) for a named rate limit
+    (geoimport.RateLimiter), shared by every worker process through the DB.
+    """
+
+    name = models.CharField(max_length=32, unique=True)
+    next_at = models.FloatField(default=0.0)
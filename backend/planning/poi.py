@@ -0,0 +1,169 @@
+import bisect
+import math
+import mmap
+import os
+import struct
+from functools import lru_cache
+from pathlib import Path
+
+from .spatial import corridor_query
+
+MILE_M = 1609.344
+
+SNAP_MILES     = 30.0   # how far back along the route a stop may move to reach parking
+CORRIDOR_MILES = 1.0    # how far off the route parking may be
+
+KINDS = ("truck_stop", "rest_area", "parking")
+
+# Binary index built by `manage.py build_poi_index`, read through mmap so
+# every worker process shares the same pages.
+INDEX_PATH_ENV = "SPOTTER_POI_INDEX"
+DEFAULT_INDEX_PATH = Path(__file__).resolve().parent.parent / "data" / "poi.idx"
+
+_MAGIC = b"SPOTPOI1"
+_HEADER = struct.Struct("<8sIId")   # magic, records, cells, cell_deg
+_KEY_OFFSET = 1 << 20
+
+
+def _cell_key(i, j):
+    return ((i + _KEY_OFFSET) << 32) | (j + _KEY_OFFSET)
+
+def _pad8(n):
+    return (n + 7) & ~7
+
+
+def write_index(records, path, cell_deg: float = 0.25):
+    """
+    records: iterable of (name, lat, lng, kind). Rows are sorted by grid cell so
+    each cell is one contiguous run. Layout after the header (8-byte aligned):
+    cell keys int64[C], cell starts uint32[C+1], lats float64[N], lngs float64[N],
+    kinds uint8[N], name offsets uint32[N+1], utf-8 names.
+    """
+    rows = []
+    for name, lat, lng, kind in records:
+        key = _cell_key(int(math.floor(lat / cell_deg)), int(math.floor(lng / cell_deg)))
+        rows.append((key, float(lat), float(lng), KINDS.index(kind) if kind in KINDS else 0, name.encode()))
+    rows.sort(key=lambda r: r[0])
+
+    keys, starts = [], []
+    for n, r in enumerate(rows):
+        if not keys or keys[-1] != r[0]:
+            keys.append(r[0])
+            starts.append(n)
+    starts.append(len(rows))
+
+    offsets = [0]
+    for r in rows:
+        offsets.append(offsets[-1] + len(r[4]))
+
+    def block(fmt, values):
+        raw = struct.pack(f"<{len(values)}{fmt}", *values)
+        return raw + b"\0" * (_pad8(len(raw)) - len(raw))
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(_HEADER.pack(_MAGIC, len(rows), len(keys), cell_deg))
+        fh.write(block("q", keys))
+        fh.write(block("I", starts))
+        fh.write(block("d", [r[1] for r in rows]))
+        fh.write(block("d", [r[2] for r in rows]))
+        fh.write(block("B", [r[3] for r in rows]))
+        fh.write(block("I", offsets))
+        fh.write(b"".join(r[4] for r in rows))
+    os.replace(tmp, path)
+    return len(rows)
+
+
+class MmapPOIIndex:
+    """Read-only POI index over an mmapped file; same query API as spatial.GridIndex."""
+
+    def __init__(self, path):
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n, c, self.cell_deg = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"Not a POI index: {path}")
+        buf = memoryview(self._mm)
+        pos = _HEADER.size
+
+        def take(fmt, count, size):
+            nonlocal pos
+            view = buf[pos:pos + count * size].cast(fmt)
+            pos += _pad8(count * size)
+            return view
+
+        self.keys = take("q", c, 8)
+        self.starts = take("I", c + 1, 4)
+        self.lats = take("d", n, 8)
+        self.lngs = take("d", n, 8)
+        self.kinds = take("B", n, 1)
+        self.offsets = take("I", n + 1, 4)
+        self._names = buf[pos:]
+
+    def __len__(self):
+        return len(self.lats)
+
+    def name(self, row) -> str:
+        return bytes(self._names[self.offsets[row]:self.offsets[row + 1]]).decode()
+
+    def kind(self, row) -> str:
+        return KINDS[self.kinds[row]]
+
+    def _cell(self, lat, lng):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg))
+
+    def query_bbox(self, min_lat, min_lng, max_lat, max_lng):
+        i0, j0 = self._cell(min_lat, min_lng)
+        i1, j1 = self._cell(max_lat, max_lng)
+        keys, starts, lats, lngs = self.keys, self.starts, self.lats, self.lngs
+        for i in range(i0, i1 + 1):
+            # cells of one grid row are contiguous in key order
+            k = bisect.bisect_left(keys, _cell_key(i, j0))
+            while k < len(keys) and keys[k] <= _cell_key(i, j1):
+                for row in range(starts[k], starts[k + 1]):
+                    if min_lat <= lats[row] <= max_lat and min_lng <= lngs[row] <= max_lng:
+                        yield row
+                k += 1
+
+
+@lru_cache(maxsize=4)
+def load_index(path: str):
+    return MmapPOIIndex(path)
+
+def get_index():
+    """Configured POI index, or None when it has not been built."""
+    path = os.environ.get(INDEX_PATH_ENV) or str(DEFAULT_INDEX_PATH)
+    if not os.path.exists(path):
+        return None
+    return load_index(path)
+
+def snap_stops(pts, cum, stop_along_m, index, keep=None, tolerance_miles=SNAP_MILES, corridor_miles=CORRIDOR_MILES):
+    """
+    Snap HOS stops to parking. All stops are resolved from a single corridor
+    query over the route; each stop takes the furthest POI at or *before* its
+    position (within tolerance_miles), so reaching it never exceeds the limit
+    that forced the stop. keep: optional pre-simplified vertex indices.
+    Returns one {along_m, lat, lng, near, kind} or None per stop.
+    """
+    if index is None or not len(index) or not stop_along_m:
+        return [None] * len(stop_along_m)
+    found = corridor_query(index, pts, cum, corridor_miles * MILE_M, keep=keep)
+    cands = sorted((along, row) for row, (along, _off) in found.items())
+    along_keys = [c[0] for c in cands]
+    tol = tolerance_miles * MILE_M
+
+    out = []
+    for s in stop_along_m:
+        k = bisect.bisect_right(along_keys, s) - 1
+        if k >= 0 and s - along_keys[k] <= tol:
+            along, row = cands[k]
+            out.append({
+                "along_m": along,
+                "lat": index.lats[row],
+                "lng": index.lngs[row],
+                "near": index.name(row),
+                "kind": index.kind(row),
+            })
+        else:
+            out.append(None)
+    return out
@@ -0,0 +1,184 @@
+import bisect
+import hashlib
+import json
+import math
+from datetime import timedelta
+from functools import lru_cache
+
+from dateutil import parser as dtparser
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import PlannedRoute, Trip
+
+from .routing import decode_polyline6, _cumdist
+from .spatial import GridIndex, M_PER_DEG_LAT, CORRIDOR_TOL_M, simplify
+
+ROUTE_TTL_S = 7 * 24 * 3600     # how long a planned route stays available for re-planning
+MAX_OFF_ROUTE_M = 5000.0        # GPS points further than this are rejected
+CLEANUP_EVERY_S = 3600          # expired plans are deleted at most this often (per cache)
+
+
+def route_id_for(polyline: str, spec=None) -> str:
+    """
+    Id of a plan: the route plus what a re-plan reads besides it (stops,
+    windows, durations, places), so trips sharing a lane only share an id
+    when their plans are the same.
+    """
+    h = hashlib.sha1(polyline.encode())
+    if spec is not None:
+        h.update(b"\0" + json.dumps(spec, cls=DjangoJSONEncoder, sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+def _plan_key(route_id):
+    return f"plan:{route_id}"
+
+def _expired():
+    """Plans past ROUTE_TTL_S, except those of stored trips (re-planned by trip_id)."""
+    return (PlannedRoute.objects.filter(saved_at__lt=timezone.now() - timedelta(seconds=ROUTE_TTL_S))
+            .exclude(route_id__in=Trip.objects.values("route_id")))
+
+def store_plan(route, waypoints=(), last_stop=None, places_by_type=None, places_by_index=None):
+    """
+    Keep what a re-plan needs (route with annotations, remaining on-duty stops,
+    their geocoded places) in the database, where every worker finds it, with
+    the Django cache in front. Returns the route id.
+    """
+    plan = {
+        "route": route,
+        "waypoints": list(waypoints),
+        "last_stop": last_stop,
+        "places_by_type": places_by_type or {},
+        "places_by_index": places_by_index or [],
+    }
+    route_id = route_id_for(route["polyline"], {k: v for k, v in plan.items() if k != "route"})
+    PlannedRoute.objects.update_or_create(route_id=route_id, defaults=plan)
+    if cache.add("plan:cleanup", True, CLEANUP_EVERY_S):
+        _expired().delete()
+    cache.set(_plan_key(route_id), plan, ROUTE_TTL_S)
+    return route_id
+
+def _revive(spec):
+    """ready_at comes back from the JSON column as an ISO string."""
+    if spec and isinstance(spec.get("ready_at"), str):
+        return dict(spec, ready_at=dtparser.isoparse(spec["ready_at"]))
+    return spec
+
+def load_plan(route_id: str):
+    """The stored plan for route_id, or None when unknown or expired."""
+    plan = cache.get(_plan_key(route_id))
+    if plan is not None:
+        return plan
+    row = PlannedRoute.objects.filter(route_id=route_id).first()
+    if row is None or _expired().filter(pk=row.pk).exists():
+        return None
+    plan = {
+        "route": row.route,
+        "waypoints": [_revive(w) for w in row.waypoints],
+        "last_stop": _revive(row.last_stop),
+        "places_by_type": row.places_by_type,
+        "places_by_index": row.places_by_index,
+    }
+    cache.set(_plan_key(route_id), plan, ROUTE_TTL_S)
+    return plan
+
+
+class RouteTrack:
+    """Decoded route, its corridor simplification and a vertex grid, built once per process per route."""
+
+    def __init__(self, polyline):
+        self.pts = decode_polyline6(polyline)
+        self.cum, self.total = _cumdist(self.pts)
+        self.keep = simplify(self.pts, CORRIDOR_TOL_M)
+        self.max_seg = max((b - a for a, b in zip(self.cum, self.cum[1:])), default=0.0)
+        self.index = GridIndex(cell_deg=0.05)
+        for lat, lng in self.pts:
+            self.index.add(lat, lng)
+
+    def project(self, lat, lng, max_m=MAX_OFF_ROUTE_M):
+        """Return (along_m, offset_m) of the closest route point within max_m, or None."""
+        # any segment passing within max_m has an endpoint within max_m + its length
+        reach = max_m + self.max_seg
+        dlat = reach / M_PER_DEG_LAT
+        c = max(math.cos(math.radians(lat)), 1e-6)
+        dlng = dlat / c
+        segs = set()
+        for v in self.index.query_bbox(lat - dlat, lng - dlng, lat + dlat, lng + dlng):
+            segs.update((v - 1, v))
+        best = None
+        for a in segs:
+            if a < 0 or a + 1 >= len(self.pts):
+                continue
+            (lat_a, lng_a), (lat_b, lng_b) = self.pts[a], self.pts[a + 1]
+            ax, ay = lng_a * c, lat_a
+            dx, dy = (lng_b - lng_a) * c, lat_b - lat_a
+            px, py = lng * c, lat
+            seg2 = dx * dx + dy * dy
+            t = 0.0 if seg2 == 0 else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / seg2))
+            off = math.hypot(px - (ax + t * dx), py - (ay + t * dy)) * M_PER_DEG_LAT
+            if off <= max_m and (best is None or off < best[1]):
+                best = (self.cum[a] + t * (self.cum[a + 1] - self.cum[a]), off)
+        return best
+
+
+@lru_cache(maxsize=512)
+def get_track(polyline: str) -> RouteTrack:
+    return RouteTrack(polyline)
+
+def _slice_cum(cum_from, cum_to, value):
+    """Interpolate cum_to at the point where cum_from reaches value."""
+    i = bisect.bisect_left(cum_from, value)
+    if i <= 0:
+        return cum_to[0]
+    if i >= len(cum_from):
+        return cum_to[-1]
+    a0, a1 = cum_from[i - 1], cum_from[i]
+    u = 0.0 if a1 == a0 else (value - a0) / (a1 - a0)
+    return cum_to[i - 1] + u * (cum_to[i] - cum_to[i - 1])
+
+def remaining_route(route, track: RouteTrack, along_m: float):
+    """
+    Route suffix from along_m (metres along the decoded geometry) as
+    (route dict, (points, cumulative metres, total metres, simplified
+    vertex indices), baseline hours already driven).
+    The suffix keeps OSRM's annotations, rebased to start at zero; its
+    polyline is left empty and only encoded on request.
+    """
+    k = max(0, bisect.bisect_right(track.cum, along_m) - 1)
+    frac = along_m / track.total if track.total > 0 else 1.0
+    pts = [_point_at(track, k, along_m)] + track.pts[k + 1:]
+    cum = [0.0] + [c - along_m for c in track.cum[k + 1:]]
+
+    total_h = route["duration_hours"]
+    cum_t, cum_d = route.get("cum_duration_s"), route.get("cum_distance_m")
+    if cum_t and cum_d and len(cum_d) > 1 and cum_d[-1] > 0:
+        done_m = frac * cum_d[-1]
+        done_s = _slice_cum(cum_d, cum_t, done_m)
+        j = bisect.bisect_right(cum_d, done_m)
+        sub_t = [0.0] + [t - done_s for t in cum_t[j:]]
+        sub_d = [0.0] + [d - done_m for d in cum_d[j:]]
+        done_h = done_s / 3600.0
+    else:
+        sub_t = sub_d = None
+        done_h = total_h * frac
+
+    suffix = {
+        "polyline": "",
+        "distance_m": route["distance_m"] * (1.0 - frac),
+        "distance_miles": route["distance_miles"] * (1.0 - frac),
+        "duration_hours": max(0.0, total_h - done_h),
+        "duration_s": max(0.0, total_h - done_h) * 3600.0,
+    }
+    if sub_t is not None:
+        suffix["cum_duration_s"], suffix["cum_distance_m"] = sub_t, sub_d
+    keep = [0] + [i - k for i in track.keep if i > k]
+    return suffix, (pts, cum, cum[-1], keep), done_h
+
+def _point_at(track, k, along_m):
+    if k + 1 >= len(track.pts):
+        return track.pts[-1]
+    s0, s1 = track.cum[k], track.cum[k + 1]
+    t = 0.0 if s1 == s0 else (along_m - s0) / (s1 - s0)
+    (lat0, lng0), (lat1, lng1) = track.pts[k], track.pts[k + 1]
+    return lat0 + t * (lat1 - lat0), lng0 + t * (lng1 - lng0)
@@ -0,0 +1,128 @@
+import csv
+import math
+import os
+from array import array
+from functools import lru_cache
+from pathlib import Path
+
+EARTH_KM = 6371.0
+MAX_KM = 80.0   # beyond this a point gets no "City, ST" label
+
+# CSV with columns name,state,lat,lng (state as the 2-letter abbreviation),
+# e.g. a GeoNames US populated-places extract.
+PLACES_PATH_ENV = "SPOTTER_PLACES"
+DEFAULT_PLACES_PATH = Path(__file__).resolve().parent.parent / "data" / "us_places.csv"
+
+STATE_ABBR = {
+    "Alabama":"AL","Alaska":"AK","Arizona":"AZ","Arkansas":"AR","California":"CA","Colorado":"CO",
+    "Connecticut":"CT","Delaware":"DE","Florida":"FL","Georgia":"GA","Hawaii":"HI","Idaho":"ID",
+    "Illinois":"IL","Indiana":"IN","Iowa":"IA","Kansas":"KS","Kentucky":"KY","Louisiana":"LA",
+    "Maine":"ME","Maryland":"MD","Massachusetts":"MA","Michigan":"MI","Minnesota":"MN","Mississippi":"MS",
+    "Missouri":"MO","Montana":"MT","Nebraska":"NE","Nevada":"NV","New Hampshire":"NH","New Jersey":"NJ",
+    "New Mexico":"NM","New York":"NY","North Carolina":"NC","North Dakota":"ND","Ohio":"OH","Oklahoma":"OK",
+    "Oregon":"OR","Pennsylvania":"PA","Rhode Island":"RI","South Carolina":"SC","South Dakota":"SD",
+    "Tennessee":"TN","Texas":"TX","Utah":"UT","Vermont":"VT","Virginia":"VA","Washington":"WA",
+    "West Virginia":"WV","Wisconsin":"WI","Wyoming":"WY"
+}
+
+
+def _unit(lat, lng):
+    p, l = math.radians(lat), math.radians(lng)
+    c = math.cos(p)
+    return c * math.cos(l), c * math.sin(l), math.sin(p)
+
+def _chord(km):
+    return 2.0 * math.sin(min(km / EARTH_KM, math.pi) / 2.0)
+
+
+class PlaceIndex:
+    """
+    Static KD-tree over places on the unit sphere (chord distance is monotonic
+    in great-circle distance, so no longitude distortion). The tree is implicit:
+    coordinates are reordered so every subrange [lo, hi) stores its median at
+    (lo + hi) // 2, split on axis depth % 3.
+    """
+
+    def __init__(self, rows):
+        rows = list(rows)
+        pts = [(_unit(lat, lng), f"{name}, {state}") for name, state, lat, lng in rows]
+        self.labels = []
+        self.xs, self.ys, self.zs = array("d"), array("d"), array("d")
+        order = [None] * len(pts)
+        stack = [(0, len(pts), 0, pts)]
+        while stack:
+            lo, hi, depth, chunk = stack.pop()
+            if not chunk:
+                continue
+            chunk.sort(key=lambda p: p[0][depth % 3])
+            mid = len(chunk) // 2
+            order[lo + mid] = chunk[mid]
+            stack.append((lo, lo + mid, depth + 1, chunk[:mid]))
+            stack.append((lo + mid + 1, hi, depth + 1, chunk[mid + 1:]))
+        for (x, y, z), label in order:
+            self.xs.append(x); self.ys.append(y); self.zs.append(z)
+            self.labels.append(label)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def _nearest(self, q, best_i, best_d2):
+        xs, ys, zs = self.xs, self.ys, self.zs
+        axes = (xs, ys, zs)
+        stack = [(0, len(xs), 0)]
+        while stack:
+            lo, hi, depth = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            dx, dy, dz = xs[mid] - q[0], ys[mid] - q[1], zs[mid] - q[2]
+            d2 = dx * dx + dy * dy + dz * dz
+            if d2 < best_d2:
+                best_i, best_d2 = mid, d2
+            ax = depth % 3
+            diff = q[ax] - axes[ax][mid]
+            near, far = ((mid + 1, hi), (lo, mid)) if diff > 0 else ((lo, mid), (mid + 1, hi))
+            if diff * diff < best_d2:
+                stack.append((far[0], far[1], depth + 1))
+            stack.append((near[0], near[1], depth + 1))
+        return best_i, best_d2
+
+    def nearest_many(self, latlngs, max_km: float = MAX_KM):
+        """
+        Batch lookup: one "City, ST" (or None) per (lat, lng). Consecutive
+        points (stops along one route) are usually near each other, so each
+        search starts bounded by the previous answer's distance.
+        """
+        limit = _chord(max_km) ** 2
+        out = []
+        prev = -1
+        for lat, lng in latlngs:
+            q = _unit(lat, lng)
+            best_i, best_d2 = -1, limit
+            if prev >= 0:
+                d2 = (self.xs[prev] - q[0]) ** 2 + (self.ys[prev] - q[1]) ** 2 + (self.zs[prev] - q[2]) ** 2
+                if d2 < best_d2:
+                    best_i, best_d2 = prev, d2
+            best_i, _ = self._nearest(q, best_i, best_d2)
+            out.append(self.labels[best_i] if best_i >= 0 else None)
+            prev = best_i
+        return out
+
+
+@lru_cache(maxsize=2)
+def load_places(path: str):
+    def rows():
+        with open(path, newline="") as fh:
+            for row in csv.DictReader(fh):
+                try:
+                    yield row["name"], row["state"], float(row["lat"]), float(row["lng"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+    return PlaceIndex(rows())
+
+def get_places():
+    """Configured place index, or None when no dataset is available."""
+    path = os.environ.get(PLACES_PATH_ENV) or str(DEFAULT_PLACES_PATH)
+    if not os.path.exists(path):
+        return None
+    return load_places(path)
@@ -1,5 +1,4 @@
 import math, bisect
-import time
 from functools import lru_cache
 import requests
 
@@ -8,49 +7,147 @@ NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
 
 HEADERS = {"User-Agent": "SpotterAssessment/1.0 (contact: dev@example.com)"}
 
-@lru_cache(maxsize=256)
-def geocode_place(q: str):
-    """Return dict: {lat, lng, display_name} using Nominatim."""
+def nominatim_search(q: str):
+    """One Nominatim lookup: {lat, lng, display_name}, or None when nothing matches. No rate limiting."""
     params = {"format": "json", "q": q, "limit": 1}
     r = requests.get(NOMINATIM_URL, params=params, headers=HEADERS, timeout=15)
     r.raise_for_status()
     data = r.json()
     if not data:
-        raise ValueError(f"Geocode failed for: {q}")
+        return None
     item = data[0]
-    # be polite to Nominatim
-    time.sleep(1.0)
     return {
         "lat": float(item["lat"]),
         "lng": float(item["lon"]),
         "display_name": item.get("display_name", q)
     }
 
-def osrm_route(points):
+@lru_cache(maxsize=256)
+def geocode_place(q: str):
+    """
+    Return dict: {lat, lng, display_name}. Answers (misses too) come from and
+    go to the GeocodedAddress table that address imports use, so a place is
+    sent to Nominatim once across workers and restarts.
     """
-    points: list of (lng, lat). Return dict {polyline, distance_miles, duration_hours, distance_m, duration_s}
+    from .geoimport import address_key, normalize_address, nominatim_limiter   # geoimport imports this module
+    from .models import GeocodedAddress
+    norm = normalize_address(q)
+    hit = GeocodedAddress.objects.filter(key=address_key(norm)).first() if norm else None
+    if hit is not None:
+        place = hit.as_place()
+    else:
+        nominatim_limiter.wait()
+        place = nominatim_search(q)
+        if norm:
+            GeocodedAddress.objects.update_or_create(
+                key=address_key(norm), defaults={"query": q, "found": place is not None, **(place or {})})
+    if place is None:
+        raise ValueError(f"Geocode failed for: {q}")
+    return place
+
+def osrm_route(points, annotations=False):
+    """
+    points: list of (lng, lat). Return dict {polyline, distance_miles, duration_hours, distance_m, duration_s, leg_durations_s}
+    With annotations=True also returns cum_duration_s / cum_distance_m: cumulative
+    per-coordinate profiles aligned with the decoded polyline (used to map drive
+    progress onto distance).
+    """
+    return osrm_routes(points, annotations=annotations)[0]
+
+def osrm_routes(points, annotations=False, alternatives=0):
+    """
+    Like osrm_route, but returns every route OSRM offers: the primary first,
+    then up to `alternatives` alternatives (OSRM only offers them between two points).
     """
     if len(points) < 2:
         raise ValueError("Need at least 2 points")
     coords = ";".join([f"{lng},{lat}" for (lng, lat) in points])
     url = f"{OSRM_BASE}/route/v1/driving/{coords}"
-    params = {"overview": "full", "geometries": "polyline6", "annotations":"false", "steps":"false"}
+    params = {"overview": "full", "geometries": "polyline6", "annotations": "distance,duration" if annotations else "false", "steps":"false"}
+    if alternatives:
+        params["alternatives"] = str(alternatives)
     r = requests.get(url, params=params, headers=HEADERS, timeout=20)
     r.raise_for_status()
     js = r.json()
     if js.get("code") != "Ok" or not js.get("routes"):
         raise ValueError(f"OSRM route failed: {js}")
-    route = js["routes"][0]
-    dist_m = route["distance"]
-    dur_s = route["duration"]
-    poly = route["geometry"]
-    return {
-        "polyline": poly,
-        "distance_m": dist_m,
-        "duration_s": dur_s,
-        "distance_miles": dist_m * 0.000621371,
-        "duration_hours": dur_s / 3600.0
-    }
+    out = []
+    for route in js["routes"][:alternatives + 1]:
+        dist_m = route["distance"]
+        dur_s = route["duration"]
+        poly = route["geometry"]
+        r_out = {
+            "polyline": poly,
+            "distance_m": dist_m,
+            "duration_s": dur_s,
+            "distance_miles": dist_m * 0.000621371,
+            "duration_hours": dur_s / 3600.0,
+            "leg_durations_s": [leg.get("duration", 0.0) for leg in route.get("legs") or []],
+        }
+        if annotations:
+            r_out["cum_duration_s"], r_out["cum_distance_m"] = _cum_annotation(route.get("legs") or [])
+        out.append(r_out)
+    return out
+
+def osrm_table(points):
+    """
+    points: list of (lng, lat). Return {durations: [[s]], distances: [[m]]} for every pair,
+    in one request to the OSRM table service.
+    """
+    coords = ";".join([f"{lng},{lat}" for (lng, lat) in points])
+    url = f"{OSRM_BASE}/table/v1/driving/{coords}"
+    r = requests.get(url, params={"annotations": "duration,distance"}, headers=HEADERS, timeout=20)
+    r.raise_for_status()
+    js = r.json()
+    if js.get("code") != "Ok" or not js.get("durations"):
+        raise ValueError(f"OSRM table failed: {js}")
+    if any(v is None for row in js["durations"] for v in row):
+        raise ValueError("OSRM table has unreachable pairs")
+    return {"durations": js["durations"], "distances": js.get("distances")}
+
+def _cum_annotation(legs):
+    """Concatenate per-leg segment annotations into cumulative arrays (first entry 0)."""
+    cum_t, cum_d = [0.0], [0.0]
+    for leg in legs:
+        ann = leg.get("annotation") or {}
+        for dt, dd in zip(ann.get("duration", []), ann.get("distance", [])):
+            cum_t.append(cum_t[-1] + dt)
+            cum_d.append(cum_d[-1] + dd)
+    return cum_t, cum_d
+
+def _remap(src, dst, fraction: float) -> float:
+    """Interpolate a fraction of cumulative array `src` into a fraction of `dst`."""
+    target = src[-1] * fraction
+    i = bisect.bisect_left(src, target)
+    if i == 0:
+        return 0.0
+    if i >= len(src):
+        return 1.0
+    a0, a1 = src[i-1], src[i]
+    u = 0.0 if a1 == a0 else (target - a0) / (a1 - a0)
+    return (dst[i-1] + u * (dst[i] - dst[i-1])) / dst[-1]
+
+def _has_annotation(route):
+    cum_t = route.get("cum_duration_s")
+    cum_d = route.get("cum_distance_m")
+    return bool(cum_t) and len(cum_t) > 1 and cum_t[-1] > 0 and cum_d[-1] > 0
+
+def distance_fraction_at(route, progress: float) -> float:
+    """Map a fraction of the route's drive duration to a fraction of its distance.
+
+    Falls back to the identity when the route carries no annotations.
+    """
+    progress = max(0.0, min(1.0, float(progress)))
+    if not _has_annotation(route):
+        return progress
+    return _remap(route["cum_duration_s"], route["cum_distance_m"], progress)
+
+def progress_at_distance_fraction(route, fraction: float) -> float:
+    """Inverse of distance_fraction_at."""
+    fraction = max(0.0, min(1.0, float(fraction)))
+    if not _has_annotation(route):
+        return fraction
+    return _remap(route["cum_distance_m"], route["cum_duration_s"], fraction)
 
 def decode_polyline6(polyline: str):
     coords = []
@@ -59,14 +156,14 @@ def decode_polyline6(polyline: str):
     lng = 0
     while index < len(polyline):
         # latitude
-        result, shift, b = 1, 0, 0x20
+        result, shift, b = 0, 0, 0x20
         while b >= 0x20:
             b = ord(polyline[index]) - 63; index += 1
             result += (b & 0x1f) << shift; shift += 5
         dlat = ~(result >> 1) if (result & 1) else (result >> 1)
         lat += dlat
         # longitude
-        result, shift, b = 1, 0, 0x20
+        result, shift, b = 0, 0, 0x20
         while b >= 0x20:
             b = ord(polyline[index]) - 63; index += 1
             result += (b & 0x1f) << shift; shift += 5
@@ -75,6 +172,21 @@ def decode_polyline6(polyline: str):
         coords.append((lat / 1e6, lng / 1e6))
     return coords
 
+def encode_polyline6(coords):
+    """Inverse of decode_polyline6: [(lat, lng)] -> polyline6 string."""
+    out = []
+    prev_lat = prev_lng = 0
+    for lat, lng in coords:
+        ilat, ilng = int(round(lat * 1e6)), int(round(lng * 1e6))
+        for d in (ilat - prev_lat, ilng - prev_lng):
+            v = ~(d << 1) if d < 0 else (d << 1)
+            while v >= 0x20:
+                out.append(chr((0x20 | (v & 0x1f)) + 63))
+                v >>= 5
+            out.append(chr(v + 63))
+        prev_lat, prev_lng = ilat, ilng
+    return "".join(out)
+
 def _hav_m(a, b):
     R = 6371000.0
     (lat1, lon1), (lat2, lon2) = a, b
@@ -92,15 +204,11 @@ def _cumdist(points):
         cum.append(total)
     return cum, total
 
-def point_on_polyline(polyline: str, fraction: float):
-    """Return {'lat','lng'} at given fraction (0..1) along the polyline."""
-    pts = decode_polyline6(polyline)
+def point_at_distance(pts, cum, s: float):
+    """Return {'lat','lng'} at s metres along already-decoded points with cumulative distances."""
     if len(pts) < 2:
         lat, lng = pts[0]
         return {"lat": lat, "lng": lng}
-    fraction = max(0.0, min(1.0, float(fraction)))
-    cum, total = _cumdist(pts)
-    s = total * fraction
     i = bisect.bisect_left(cum, s)
     if i == 0: 
         lat, lng = pts[0]; return {"lat": lat, "lng": lng}
@@ -110,3 +218,15 @@ def point_on_polyline(polyline: str, fraction: float):
     t = 0.0 if s1 == s0 else (s - s0) / (s1 - s0)
     (lat0, lon0), (lat1, lon1) = pts[i-1], pts[i]
     return {"lat": lat0 + t*(lat1-lat0), "lng": lon0 + t*(lon1-lon0)}
+
+def route_geometry(polyline: str):
+    """Decode once: return (points, cumulative metres, total metres)."""
+    pts = decode_polyline6(polyline)
+    cum, total = _cumdist(pts)
+    return pts, cum, total
+
+def point_on_polyline(polyline: str, fraction: float):
+    """Return {'lat','lng'} at given fraction (0..1) along the polyline."""
+    pts, cum, total = route_geometry(polyline)
+    fraction = max(0.0, min(1.0, float(fraction)))
+    return point_at_distance(pts, cum, total * fraction)
@@ -1,8 +1,96 @@
 from rest_framework import serializers
 
+MAX_TRIP_STOPS = 50
+MAX_SWEEP_STARTS = 200
+MAX_ALTERNATIVES = 3
+
+class TripStopInput(serializers.Serializer):
+    location = serializers.CharField()
+    kind = serializers.ChoiceField(choices=["pickup", "dropoff"], default="dropoff")
+    on_duty_min = serializers.IntegerField(min_value=0, max_value=24 * 60, default=60)
+    window_start_iso = serializers.DateTimeField(required=False)
+    window_end_iso = serializers.DateTimeField(required=False)
+    # a dropoff is kept after the pickup with the same shipment id
+    shipment = serializers.CharField(required=False)
+
 class PlanTripInput(serializers.Serializer):
     current_location = serializers.CharField()
-    pickup_location  = serializers.CharField()
-    dropoff_location = serializers.CharField()
+    pickup_location  = serializers.CharField(required=False)
+    dropoff_location = serializers.CharField(required=False)
+    stops = TripStopInput(many=True, required=False)
+    optimize_order = serializers.BooleanField(default=True)
     current_cycle_used_hours = serializers.FloatField()
     start_time_iso = serializers.DateTimeField(required=False)
+    traffic_aware = serializers.BooleanField(default=True)
+    # "optimal" searches break placement and sleeper-berth splits (hos_opt)
+    planner = serializers.ChoiceField(choices=["greedy", "optimal"], default="greedy")
+    # compare up to N alternative routes; the best legal arrival is returned
+    alternatives = serializers.IntegerField(min_value=0, max_value=MAX_ALTERNATIVES, default=0)
+    driver = serializers.CharField(max_length=64, required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        stops = attrs.get("stops")
+        if stops:
+            if len(stops) > MAX_TRIP_STOPS:
+                raise serializers.ValidationError({"stops": [f"At most {MAX_TRIP_STOPS} stops per trip."]})
+            return attrs
+        errors = {}
+        for field in ("pickup_location", "dropoff_location"):
+            if not attrs.get(field):
+                errors[field] = ["This field is required."]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+class SweepInput(PlanTripInput):
+    window_start_iso = serializers.DateTimeField()
+    window_end_iso = serializers.DateTimeField()
+    step_min = serializers.IntegerField(min_value=5, max_value=24 * 60, default=15)
+    # delivery appointment for the final stop
+    appointment_start_iso = serializers.DateTimeField(required=False)
+    appointment_end_iso = serializers.DateTimeField(required=False)
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if attrs.get("alternatives"):
+            raise serializers.ValidationError(
+                {"alternatives": ["The sweep plans one route; compare alternatives with plan-trip."]}
+            )
+        span_min = (attrs["window_end_iso"] - attrs["window_start_iso"]).total_seconds() / 60.0
+        if span_min < 0:
+            raise serializers.ValidationError({"window_end_iso": ["Must not be before window_start_iso."]})
+        if span_min / attrs["step_min"] + 1 > MAX_SWEEP_STARTS:
+            raise serializers.ValidationError(
+                {"step_min": [f"At most {MAX_SWEEP_STARTS} start times per sweep; widen the step or narrow the window."]}
+            )
+        a0, a1 = attrs.get("appointment_start_iso"), attrs.get("appointment_end_iso")
+        if a0 and a1 and a1 < a0:
+            raise serializers.ValidationError({"appointment_end_iso": ["Must not be before appointment_start_iso."]})
+        return attrs
+
+class ReplanInput(serializers.Serializer):
+    route_id = serializers.CharField(required=False)
+    trip_id = serializers.IntegerField(required=False)
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    at_iso = serializers.DateTimeField(required=False)
+    # driver's HOS counters right now
+    drive_today_hours = serializers.FloatField(min_value=0, default=0.0)
+    duty_window_elapsed_hours = serializers.FloatField(min_value=0, default=0.0)
+    since_break_drive_hours = serializers.FloatField(min_value=0, default=0.0)
+    cycle_used_hours = serializers.FloatField(min_value=0)
+    traffic_aware = serializers.BooleanField(default=True)
+    planner = serializers.ChoiceField(choices=["greedy", "optimal"], default="greedy")
+    include_polyline = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if not attrs.get("route_id") and attrs.get("trip_id") is None:
+            raise serializers.ValidationError({"route_id": ["Provide route_id or trip_id."]})
+        return attrs
+
+class AddressImportInput(serializers.Serializer):
+    file = serializers.FileField()
+    # address columns, joined with ", " when several are given
+    columns = serializers.ListField(child=serializers.CharField(), required=False)
+    # only the gazetteer and geocode cache, no upstream requests
+    cache_only = serializers.BooleanField(default=False)
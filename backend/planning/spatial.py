@@ -0,0 +1,134 @@
+import math
+from array import array
+
+# Local equirectangular projection: good to well under 1% over the few
+# hundred km a corridor query spans, and far cheaper than haversine.
+M_PER_DEG_LAT = 111_320.0
+
+# Route simplification tolerance for corridor queries; the corridor is
+# widened by the same amount so nothing within the buffer is missed.
+CORRIDOR_TOL_M = 800.0
+
+
+def _xy(lat, lng, lat0_cos):
+    return lng * M_PER_DEG_LAT * lat0_cos, lat * M_PER_DEG_LAT
+
+
+class GridIndex:
+    """Fixed lat/lng bucket grid over point items (geohash-style cells).
+
+    Points live in flat arrays; each cell keeps the row numbers of the
+    points inside it, so a bbox query touches only the covered cells.
+    """
+
+    def __init__(self, cell_deg: float = 0.25):
+        self.cell_deg = cell_deg
+        self.lats = array("d")
+        self.lngs = array("d")
+        self.cells = {}
+
+    def __len__(self):
+        return len(self.lats)
+
+    def _cell(self, lat, lng):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg))
+
+    def add(self, lat: float, lng: float) -> int:
+        row = len(self.lats)
+        self.lats.append(lat)
+        self.lngs.append(lng)
+        self.cells.setdefault(self._cell(lat, lng), []).append(row)
+        return row
+
+    def query_bbox(self, min_lat, min_lng, max_lat, max_lng):
+        """Yield rows of points inside the bbox (cell-granular pre-filter, then exact)."""
+        i0, j0 = self._cell(min_lat, min_lng)
+        i1, j1 = self._cell(max_lat, max_lng)
+        lats, lngs = self.lats, self.lngs
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                for row in self.cells.get((i, j), ()):
+                    if min_lat <= lats[row] <= max_lat and min_lng <= lngs[row] <= max_lng:
+                        yield row
+
+    def nearest(self, lat, lng, max_m):
+        """Return (row, distance_m) of the closest point within max_m, or None."""
+        dlat = max_m / M_PER_DEG_LAT
+        c = max(math.cos(math.radians(lat)), 1e-6)
+        dlng = dlat / c
+        x0, y0 = _xy(lat, lng, c)
+        best = None
+        for row in self.query_bbox(lat - dlat, lng - dlng, lat + dlat, lng + dlng):
+            x, y = _xy(self.lats[row], self.lngs[row], c)
+            d = math.hypot(x - x0, y - y0)
+            if d <= max_m and (best is None or d < best[1]):
+                best = (row, d)
+        return best
+
+
+def simplify(pts, tol_m: float):
+    """Douglas-Peucker over (lat, lng) points; returns kept indices (first and last always)."""
+    n = len(pts)
+    if n <= 2:
+        return list(range(n))
+    c = math.cos(math.radians(pts[n // 2][0]))
+    xy = [_xy(lat, lng, c) for lat, lng in pts]
+    keep = bytearray(n)
+    keep[0] = keep[n - 1] = 1
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        ax, ay = xy[a]
+        bx, by = xy[b]
+        dx, dy = bx - ax, by - ay
+        seg2 = dx * dx + dy * dy
+        worst, worst_d = -1, tol_m
+        for k in range(a + 1, b):
+            px, py = xy[k]
+            if seg2 == 0:
+                d = math.hypot(px - ax, py - ay)
+            else:
+                d = abs(dy * px - dx * py + bx * ay - by * ax) / math.sqrt(seg2)
+            if d > worst_d:
+                worst, worst_d = k, d
+        if worst >= 0:
+            keep[worst] = 1
+            stack.append((a, worst))
+            stack.append((worst, b))
+    return [i for i in range(n) if keep[i]]
+
+
+def corridor_query(index: GridIndex, pts, cum, buffer_m: float, keep=None, tol_m: float = CORRIDOR_TOL_M):
+    """
+    Find indexed points within buffer_m of the route.
+    pts: decoded (lat, lng) route; cum: cumulative metres per vertex.
+    keep: vertex indices of the route simplified at tol_m (computed if not
+    given); the buffer is widened by tol_m, and the cost scales with
+    simplified segments, not vertices.
+    Returns {row: (along_m, offset_m)} keeping the closest approach per point.
+    """
+    if keep is None:
+        keep = simplify(pts, tol_m)
+    reach = buffer_m + tol_m
+    found = {}
+    for a, b in zip(keep, keep[1:]):
+        (lat_a, lng_a), (lat_b, lng_b) = pts[a], pts[b]
+        c = max(math.cos(math.radians((lat_a + lat_b) / 2)), 1e-6)
+        dlat = reach / M_PER_DEG_LAT
+        dlng = dlat / c
+        ax, ay = _xy(lat_a, lng_a, c)
+        bx, by = _xy(lat_b, lng_b, c)
+        dx, dy = bx - ax, by - ay
+        seg2 = dx * dx + dy * dy
+        for row in index.query_bbox(min(lat_a, lat_b) - dlat, min(lng_a, lng_b) - dlng,
+                                    max(lat_a, lat_b) + dlat, max(lng_a, lng_b) + dlng):
+            px, py = _xy(index.lats[row], index.lngs[row], c)
+            t = 0.0 if seg2 == 0 else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / seg2))
+            off = math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+            if off > reach:
+                continue
+            along = cum[a] + t * (cum[b] - cum[a])
+            prev = found.get(row)
+            if prev is None or off < prev[1]:
+                found[row] = (along, off)
+    return found
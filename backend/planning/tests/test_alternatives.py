@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from planning import alternatives, views
+from planning.alternatives import _Leg, combine, route_candidates
+from planning.hos_opt import optimize_schedule
+from planning.tests.util import point_at_mile, straight_route
+
+MID_LNG = point_at_mile(200)[1]
+
+
+def _legs_for(pair, annotations=True, alternatives=0):
+    """Two options per leg: the primary at 55 mph and a slower one at 45 mph."""
+    (lng0, _), _ = pair
+    miles = 200 if lng0 < MID_LNG - 1e-6 else 300
+    return [straight_route(miles, lng=lng0, mph=mph) for mph in (55.0, 45.0)][:alternatives + 1]
+
+
+def test_combine_stitches_legs():
+    a = _Leg(straight_route(200))
+    b = _Leg(straight_route(300, lng=MID_LNG))
+    route, (pts, cum, total_m, keep) = combine([a, b])
+    assert route["distance_m"] == pytest.approx(a.route["distance_m"] + b.route["distance_m"])
+    assert route["leg_durations_s"] == [a.route["duration_s"], b.route["duration_s"]]
+    assert len(pts) == len(a.pts) + len(b.pts) - 1 == len(cum)
+    assert cum == sorted(cum) and cum[-1] == pytest.approx(total_m)
+    assert route["cum_distance_m"][-1] == pytest.approx(route["distance_m"])
+    assert route["cum_duration_s"][-1] == pytest.approx(route["duration_s"])
+    assert keep[0] == 0 and keep[-1] == len(pts) - 1
+
+
+def test_candidates_primary_first_then_by_added_time(monkeypatch):
+    monkeypatch.setattr(alternatives, "osrm_routes", _legs_for)
+    points = [(-100.0, 35.0), (MID_LNG, 35.0), (point_at_mile(500)[1], 35.0)]
+    cands = route_candidates(points, 2)
+    hours = [route["duration_hours"] for route, _ in cands]
+    assert len(cands) == 3
+    assert hours[0] == pytest.approx(500 / 55.0, rel=5e-3)
+    # the slower short leg costs less extra time than the slower long one
+    assert hours[1] == pytest.approx(200 / 45.0 + 300 / 55.0, rel=5e-3)
+    assert hours[2] == pytest.approx(200 / 55.0 + 300 / 45.0, rel=5e-3)
+
+
+def _plan(exceeded, arrival_h, cycle_used=10.0, distance_m=1000.0):
+    at = datetime(2025, 8, 15, tzinfo=timezone.utc) + timedelta(hours=arrival_h)
+    schedule = {"stops": [{"at_iso": at.isoformat(), "duration_min": 60}],
+                "summary": {"cycle_exceeded": exceeded, "cycle_used_hours": cycle_used}}
+    return {"route": {"distance_m": distance_m}}, schedule, []
+
+
+def test_rank_candidates():
+    plans = [_plan(True, 1), _plan(False, 5), _plan(False, 3, cycle_used=30), _plan(False, 3, cycle_used=20),
+             _plan(False, 3, cycle_used=20, distance_m=900)]
+    ranked = views._rank_candidates(plans)
+    assert ranked[0] is plans[4]
+    assert [p is plans[i] for p, i in zip(ranked, (4, 3, 2, 1, 0))] == [True] * 5
+
+
+@pytest.fixture
+def offline(db, monkeypatch):
+    places = {"A": {"lat": 35.0, "lng": -100.0, "display_name": "A"},
+              "B": {"lat": 35.0, "lng": MID_LNG, "display_name": "B"},
+              "C": {"lat": 35.0, "lng": point_at_mile(500)[1], "display_name": "C"}}
+    monkeypatch.setattr(views, "geocode_place", lambda q: places[q])
+    monkeypatch.setattr(alternatives, "osrm_routes", _legs_for)
+
+
+def _post(client, **kw):
+    body = {
+        "current_location": "A", "pickup_location": "B", "dropoff_location": "C",
+        "current_cycle_used_hours": 0, "start_time_iso": "2025-08-14T08:00:00Z",
+        "traffic_aware": False, "alternatives": 2,
+    }
+    body.update(kw)
+    return client.post("/api/plan-trip/", body, content_type="application/json")
+
+
+def test_plan_trip_with_alternatives(client, offline):
+    r = _post(client)
+    assert r.status_code == 200, r.content
+    out = r.json()
+    assert out["summary"]["drive_hours"] == pytest.approx(500 / 55.0, abs=0.1)
+    assert [alt["rank"] for alt in out["alternatives"]] == [2, 3]
+    last = out["stops"][-1]
+    arrivals = [datetime.fromisoformat(last["at_iso"]) + timedelta(minutes=last["duration_min"])]
+    arrivals += [datetime.fromisoformat(alt["arrival_iso"]) for alt in out["alternatives"]]
+    assert arrivals == sorted(arrivals)
+    assert out["trip_id"] and out["route_id"]
+
+
+def test_candidates_are_searched_one_at_a_time(client, offline, monkeypatch):
+    running, calls = [], []
+
+    def optimize(*args, **kw):
+        running.append(1)
+        calls.append((len(running), kw.get("budget_s")))
+        try:
+            return optimize_schedule(*args, **kw)
+        finally:
+            running.pop()
+
+    monkeypatch.setitem(views.PLANNERS, "optimal", optimize)
+    r = _post(client, planner="optimal")
+    assert r.status_code == 200, r.content
+    # three candidates, never overlapping, each with the optimizer's own full budget
+    assert calls == [(1, None)] * 3
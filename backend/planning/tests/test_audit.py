@@ -0,0 +1,126 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from planning.audit import FleetAudit, _day_rows, audit_rows, iter_day_rows, new_stats
+from planning.hos import plan_schedule
+from planning.hos_opt import optimize_schedule
+from planning.traffic import FlatProfile, SpeedProfile
+
+DAY0 = datetime(2025, 8, 14, tzinfo=timezone.utc)
+
+
+def _rows(plan, driver="d1"):
+    return [(driver, day["date"], s["status"], s["from"], s["to"]) for day in plan["days"] for s in day["segments"]]
+
+
+def _audit(rows):
+    stats = new_stats()
+    return list(audit_rows(rows, stats)), stats
+
+
+@pytest.mark.parametrize("planner", [plan_schedule, optimize_schedule], ids=["greedy", "optimal"])
+@pytest.mark.parametrize("profile", [FlatProfile(), SpeedProfile()], ids=["flat", "traffic"])
+@pytest.mark.parametrize("hours", [5, 12, 20, 30, 45, 60])
+@pytest.mark.parametrize("start_h", [0, 8, 14, 20])
+def test_plans_from_both_planners_audit_clean(planner, profile, hours, start_h):
+    plan = planner(hours, DAY0 + timedelta(hours=start_h), 0.0, profile=profile)
+    violations, stats = _audit(_rows(plan))
+    assert violations == []
+    assert stats["backwards"] == stats["overlapping"] == stats["out_of_order"] == 0
+
+
+def _day(date, *segs):
+    return [("d1", date, st, a, b) for st, a, b in segs]
+
+
+def test_flags_eleven_hour_and_break_violations():
+    rows = _day("2025-08-14", ("ON", "06:00", "07:00"), ("D", "07:00", "19:00"))
+    violations, stats = _audit(rows)
+    by_rule = {v["rule"]: v for v in violations}
+    assert by_rule["11_hour"]["excess_min"] == 60
+    assert by_rule["11_hour"]["at"] == "2025-08-14T18:00"
+    assert by_rule["30_min_break"]["excess_min"] == 240
+    assert stats["11_hour"] == 1
+
+
+def test_fourteen_hour_window_spans_midnight():
+    rows = (_day("2025-08-14", ("ON", "14:00", "18:00"), ("D", "18:00", "22:00"), ("OFF", "22:00", "23:00"),
+                 ("D", "23:00", "24:00"))
+            + _day("2025-08-15", ("D", "00:00", "05:00")))
+    violations, _ = _audit(rows)
+    assert [(v["rule"], v["date"], v["excess_min"]) for v in violations] == [("14_hour", "2025-08-15", 60)]
+
+
+def test_sleeper_split_is_legal():
+    # 2 h off + 8 h in the berth: the 11/14 hours count again from the end of the 2 h
+    rows = (_day("2025-08-14", ("ON", "08:00", "09:00"), ("D", "09:00", "17:00"), ("OFF", "17:00", "19:00"),
+                 ("D", "19:00", "22:00"), ("SB", "22:00", "24:00"))
+            + _day("2025-08-15", ("SB", "00:00", "06:00"), ("D", "06:00", "14:00")))
+    violations, _ = _audit(rows)
+    assert violations == []
+
+
+def test_rejects_backwards_and_overlapping_segments():
+    # two logs for the same date, as if one shift had been filed as two days
+    rows = (_day("2025-08-14", ("D", "08:00", "16:00"), ("OFF", "16:00", "24:00"))
+            + _day("2025-08-14", ("D", "20:00", "24:00"), ("ON", "10:00", "09:00")))
+    _, stats = _audit(rows)
+    assert stats["backwards"] == 1
+    assert stats["overlapping"] == 1
+
+
+def test_out_of_order_days():
+    rows = _day("2025-08-15", ("D", "08:00", "10:00")) + _day("2025-08-14", ("D", "08:00", "10:00"))
+    _, stats = _audit(rows)
+    assert stats["out_of_order"] == 1
+
+
+def test_fleet_audit_in_parallel_matches_serial(tmp_path):
+    path = tmp_path / "logs.ndjson"
+    with open(path, "w") as fh:
+        for n in range(12):
+            plan = plan_schedule(20 + n, DAY0 + timedelta(hours=n), 0.0)
+            for driver, date, status, a, b in _rows(plan, driver=f"drv{n}"):
+                fh.write(json.dumps({"driver": driver, "date": date, "status": status, "from": a, "to": b}) + "\n")
+            # and an illegal 13-hour drive per driver
+            fh.write(json.dumps({"driver": f"drv{n}", "status": "DRIVING",
+                                 "start": "2025-09-10T06:00", "end": "2025-09-10T19:00"}) + "\n")
+        fh.write(json.dumps({"driver": "drv0", "status": "D", "start": "2025-09-12T06:00", "end": "2025-09-12T05:00"}) + "\n")
+
+    serial = FleetAudit([str(path)], workers=1)
+    parallel = FleetAudit([str(path)], workers=2, shards=3)
+    key = lambda v: (v["driver"], v["at"], v["rule"])
+    assert sorted(serial, key=key) == sorted(parallel, key=key)
+    assert serial.stats == parallel.stats
+    assert serial.stats["11_hour"] == 12
+    assert serial.stats["invalid"] == 1
+    assert not list(tmp_path.glob("spotter-audit-*"))
+
+
+@pytest.mark.parametrize("bad", [
+    {"from": "8am"},
+    {"to": "25:00"},
+    {"from": "08:60"},
+    {"date": "2025-13-45"},
+    {"date": "01/02/2025"},
+], ids=["from-8am", "to-25h", "minute-60", "month-13", "us-date"])
+def test_malformed_date_records_are_counted_not_fatal(tmp_path, bad):
+    good = {"driver": "d1", "status": "D", "date": "2025-08-14", "from": "08:00", "to": "20:00"}
+    path = tmp_path / "logs.ndjson"
+    path.write_text(json.dumps(good) + "\n" + json.dumps({**good, "date": "2025-08-15", **bad}) + "\n")
+
+    stats = new_stats()
+    assert list(iter_day_rows([str(path)], stats)) == [("d1", "2025-08-14", "D", "08:00", "20:00")]
+    assert stats["invalid"] == 1
+
+    audit = FleetAudit([str(path)], workers=1)
+    assert [v["rule"] for v in audit] == ["11_hour", "30_min_break"]
+    assert audit.stats["invalid"] == 1
+
+
+
+def test_date_records_are_normalized():
+    rec = {"driver": "d1", "status": "3", "date": " 2025-08-14 ", "from": "8:05", "to": "24:00"}
+    assert _day_rows(rec) == [("d1", "2025-08-14", "D", "08:05", "24:00")]
@@ -0,0 +1,60 @@
+from planning.fuel import MILE_M, FuelStations, plan_fuel_stops
+from planning.tests.util import point_at_mile, route_geometry as _route
+
+
+def _stations(*spots):
+    """spots: (name, miles along the route, miles north of it)"""
+    stations = FuelStations()
+    for name, along, off in spots:
+        stations.add(name, *point_at_mile(along, lat=35.0 + off * MILE_M / 111_320.0))
+    return stations
+
+
+def test_short_route_needs_no_fuel():
+    pts, cum = _route(600)
+    assert plan_fuel_stops(pts, cum, stations=_stations(("A", 300, 0))) == []
+
+
+def test_without_stations_stops_at_range_limit():
+    pts, cum = _route(2500)
+    stops = plan_fuel_stops(pts, cum, stations=None)
+    assert [round(s["along_m"] / MILE_M) for s in stops] == [1000, 2000]
+    assert all(s["near"] is None for s in stops)
+
+
+def test_furthest_corridor_station_in_window():
+    pts, cum = _route(1500)
+    stations = _stations(
+        ("too early", 300, 0.2),       # first half of the tank
+        ("mid", 700, 0.5),
+        ("late", 950, 1.0),
+        ("off corridor", 990, 6.0),    # beyond CORRIDOR_MILES
+    )
+    stops = plan_fuel_stops(pts, cum, stations=stations)
+    assert [s["near"] for s in stops] == ["late"]
+    assert abs(stops[0]["along_m"] / MILE_M - 950) < 2
+
+
+def test_falls_back_to_an_early_station_before_the_road():
+    pts, cum = _route(1500)
+    stops = plan_fuel_stops(pts, cum, stations=_stations(("early", 200, 0.1)))
+    assert [s["near"] for s in stops] == ["early", None]
+    assert abs(stops[0]["along_m"] / MILE_M - 200) < 2
+    # the stop on the road comes a full tank after it
+    assert abs(stops[1]["along_m"] / MILE_M - 1200) < 2
+
+
+def test_prefers_station_near_hos_stop():
+    pts, cum = _route(1500)
+    stations = _stations(("mid", 640, 0.1), ("late", 950, 0.1))
+    stops = plan_fuel_stops(pts, cum, hos_along_m=[650 * MILE_M], stations=stations)
+    assert [s["near"] for s in stops] == ["mid"]
+
+
+def test_no_leg_exceeds_range():
+    pts, cum = _route(3000)
+    stations = _stations(*[(f"s{m}", m, 0.3) for m in range(50, 3000, 170)])
+    stops = plan_fuel_stops(pts, cum, stations=stations)
+    marks = [0.0] + [s["along_m"] for s in stops] + [cum[-1]]
+    assert all(b - a <= 1000 * MILE_M + 1 for a, b in zip(marks, marks[1:]))
+    assert all(s["near"] for s in stops)
@@ -0,0 +1,205 @@
+import io
+import json
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from planning import geoimport, routing, views
+from planning.geoimport import AddressImport, RateLimiter, address_key, normalize_address
+from planning.models import GeocodedAddress
+from planning.revgeo import PLACES_PATH_ENV
+
+
+class Clock:
+    """Stands in for the time module: sleeping advances the clock."""
+
+    def __init__(self, t=1000.0):
+        self.t = t
+        self.slept = []
+
+    def time(self):
+        return self.t
+
+    def monotonic(self):
+        return self.t
+
+    def sleep(self, s):
+        self.slept.append(s)
+        self.t += s
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(geoimport, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def upstream(monkeypatch, clock):
+    """Fake Nominatim: records (query, time) and finds everything except 'nowhere'."""
+    calls = []
+
+    def search(q):
+        calls.append((q, clock.t))
+        if "nowhere" in q.lower():
+            return None
+        return {"lat": 35.0, "lng": -100.0, "display_name": q}
+
+    monkeypatch.setenv(PLACES_PATH_ENV, "/nonexistent/places.csv")
+    monkeypatch.setattr(geoimport, "nominatim_search", search)
+    monkeypatch.setattr(routing, "nominatim_search", search)
+    return calls
+
+
+@pytest.fixture
+def fresh_geocode():
+    routing.geocode_place.cache_clear()
+    yield routing.geocode_place
+    routing.geocode_place.cache_clear()
+
+
+def _csv(*addresses):
+    return io.StringIO("address\n" + "".join(f'"{a}"\n' for a in addresses))
+
+
+def test_normalize_ignores_case_spacing_punctuation_and_state_names():
+    same = ["Dallas, TX", "  dallas ,tx.", "DALLAS, Texas, USA", "Dallas, T.X., United States"]
+    assert {normalize_address(a) for a in same} == {"dallas, tx"}
+    assert normalize_address("Dallas, TX") != normalize_address("Dallas, OK")
+    assert normalize_address("  ,, ") == ""
+
+
+@pytest.mark.django_db
+def test_each_distinct_address_goes_upstream_once(upstream):
+    job = AddressImport(_csv("Dallas, TX", "dallas, texas", "Nowhere, ZZ", "", "DALLAS TX", "nowhere,zz."))
+    results = [r for _, _, r in job]
+
+    assert [q for q, _ in upstream] == ["Dallas, TX", "Nowhere, ZZ", "DALLAS TX"]
+    assert [r["status"] for r in results] == ["ok", "ok", "not_found", "empty", "ok", "not_found"]
+    assert job.stats["nominatim"] == 3 and job.stats["lru"] == 2
+    # misses are stored too
+    assert GeocodedAddress.objects.get(key=address_key("nowhere, zz")).found is False
+
+
+@pytest.mark.django_db
+def test_a_second_run_is_answered_from_the_cache(upstream):
+    list(AddressImport(_csv("Dallas, TX", "Nowhere, ZZ")))
+    upstream.clear()
+
+    job = AddressImport(_csv("DALLAS, Texas", "nowhere, zz"))
+    results = [r for _, _, r in job]
+    assert upstream == []
+    assert [(r["source"], r["status"]) for r in results] == [("cache", "ok"), ("cache", "not_found")]
+
+
+@pytest.mark.django_db
+def test_failed_lookups_are_not_cached(upstream, monkeypatch):
+    def down(q):
+        raise OSError("503")
+
+    monkeypatch.setattr(geoimport, "nominatim_search", down)
+    results = [r for _, _, r in AddressImport(_csv("Dallas, TX"))]
+    assert results[0]["status"] == "error"
+    assert not GeocodedAddress.objects.exists()
+
+
+@pytest.mark.django_db
+def test_limiters_with_one_name_share_the_rate(clock):
+    # two workers, each with its own limiter
+    a, b = RateLimiter(1.0), RateLimiter(1.0)
+    starts = []
+    for limiter in (a, b, a, b):
+        limiter.wait()
+        starts.append(clock.t)
+    assert starts == [1000.0, 1001.0, 1002.0, 1003.0]
+
+    other = RateLimiter(1.0, name="elsewhere")
+    other.wait()
+    assert clock.t == 1003.0
+
+
+@pytest.mark.django_db
+def test_a_slot_past_the_deadline_is_not_taken(clock):
+    limiter = RateLimiter(1.0)
+    assert limiter.wait(deadline=1000.5)
+    assert not limiter.wait(deadline=1000.5)
+    assert clock.slept == []
+    # the refused slot is still free for the next caller
+    assert limiter.wait()
+    assert clock.t == 1001.0
+
+
+@pytest.mark.django_db
+def test_trip_geocoding_waits_on_the_import_limit(upstream, fresh_geocode):
+    list(AddressImport(_csv("Dallas, TX")))
+    fresh_geocode("Tulsa, OK")
+    assert [t for _, t in upstream] == [1000.0, 1001.0]
+
+
+@pytest.mark.django_db
+def test_budget_stops_before_the_row_that_would_overrun(upstream, clock):
+    job = AddressImport(_csv("A, TX", "B, TX", "A, TX", "C, TX", "D, TX"), budget_s=1.5)
+    rows = [n for n, _, _ in job]
+    assert rows == [1, 2, 3]
+    assert job.stopped_at == 4
+    assert len(upstream) == 2
+
+
+@pytest.mark.django_db
+def test_upload_reports_where_to_continue(upstream, client, monkeypatch):
+    monkeypatch.setattr(views, "IMPORT_BUDGET_S", 1.5)
+    body = b"address\nA, TX\nB, TX\nC, TX\n"
+
+    def upload():
+        resp = client.post("/api/geocode/import/", {"file": SimpleUploadedFile("a.csv", body, "text/csv")})
+        assert resp.status_code == 200
+        return [json.loads(line) for line in b"".join(resp.streaming_content).splitlines()]
+
+    first = upload()
+    assert [line["row"] for line in first[:-1]] == [1, 2]
+    assert first[-1]["done"] is False and first[-1]["next_row"] == 3
+
+    # the first two rows come from the cache now, so the budget covers the third
+    second = upload()
+    assert [line["source"] for line in second[:-1]] == ["cache", "cache", "nominatim"]
+    assert second[-1]["done"] is True
+
+
+@pytest.mark.django_db
+def test_trip_geocoding_uses_imported_answers(upstream, fresh_geocode):
+    list(AddressImport(_csv("Tulsa, OK", "Nowhere, ZZ")))
+    upstream.clear()
+
+    assert fresh_geocode("tulsa, Oklahoma")["display_name"] == "Tulsa, OK"
+    with pytest.raises(ValueError):
+        fresh_geocode("Nowhere, ZZ.")
+    assert upstream == []
+
+
+@pytest.mark.django_db
+def test_trip_geocoding_answers_are_shared(upstream, fresh_geocode):
+    fresh_geocode("Amarillo, TX")
+    fresh_geocode.cache_clear()   # another worker, or after a restart
+    fresh_geocode("amarillo, texas")
+    assert [q for q, _ in upstream] == ["Amarillo, TX"]
+
+    job = AddressImport(_csv("Amarillo, TX"))
+    assert [r["source"] for _, _, r in job] == ["cache"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("bad", [b"Caf\xe9, TX", b'"' + b"x" * 200_000 + b'"'], ids=["not-utf8", "huge-field"])
+def test_unreadable_row_ends_the_stream_with_a_status(client, monkeypatch, bad):
+    monkeypatch.setenv(PLACES_PATH_ENV, "/nonexistent/places.csv")
+    rows = [f"Town {n:04d}, TX".encode() for n in range(1, 1000)]
+    body = b"address\n" + b"\n".join(rows) + b"\n" + bad + b"\n"
+    resp = client.post("/api/geocode/import/", {"file": SimpleUploadedFile("a.csv", body, "text/csv"),
+                                                "cache_only": True})
+    assert resp.status_code == 200
+    lines = [json.loads(line) for line in b"".join(resp.streaming_content).splitlines()]
+    last = lines[-1]
+    assert last["done"] is False and "error" in last
+    # whole chunks that were read are reported, and the rest is where to pick up
+    assert last["next_row"] == len(lines) > 200
+    assert [line["row"] for line in lines[:-1]] == list(range(1, len(lines)))
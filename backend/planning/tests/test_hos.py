@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from planning.hos import OFF, ON, D, log_days, plan_schedule
+
+START = datetime(2025, 8, 14, 8, 0, tzinfo=timezone.utc)
+
+
+def _minutes(hhmm):
+    hh, mm = map(int, hhmm.split(":"))
+    return hh * 60 + mm
+
+
+def _check_days(plan):
+    dates = [d["date"] for d in plan["days"]]
+    assert dates == sorted(set(dates))
+    for day in plan["days"]:
+        ends = [(_minutes(s["from"]), _minutes(s["to"])) for s in day["segments"]]
+        assert all(a < b for a, b in ends)
+        assert all(b1 <= a2 for (_, b1), (a2, _) in zip(ends, ends[1:]))
+    assert sum(d["totals"][D] for d in plan["days"]) == pytest.approx(plan["summary"]["drive_hours"], abs=0.1)
+
+
+@pytest.mark.parametrize("hours", [3, 11, 30, 45, 60])
+@pytest.mark.parametrize("hour", [0, 8, 20])
+def test_days_are_calendar_days(hours, hour):
+    plan = plan_schedule(hours, START.replace(hour=hour), 0.0)
+    _check_days(plan)
+    for day in plan["days"][1:]:
+        assert sum(day["totals"].values()) == pytest.approx(24.0)
+
+
+def test_log_days_splits_at_midnight():
+    t = datetime(2025, 8, 14, 20, tzinfo=timezone.utc)
+    days = log_days([(ON, t, t + timedelta(hours=1)), (D, t + timedelta(hours=2), t + timedelta(hours=6))],
+                    timezone.utc)
+    assert [d["date"] for d in days] == ["2025-08-14", "2025-08-15"]
+    assert days[0]["segments"] == [
+        {"status": ON, "from": "20:00", "to": "21:00"},
+        {"status": OFF, "from": "21:00", "to": "22:00"},
+        {"status": D, "from": "22:00", "to": "24:00"},
+    ]
+    assert days[1]["segments"] == [
+        {"status": D, "from": "00:00", "to": "02:00"},
+        {"status": OFF, "from": "02:00", "to": "24:00"},
+    ]
+
+
+def test_overnight_wait_for_a_waypoint_window():
+    # arrive at the stop around noon; it opens at 06:00 the next morning
+    ready = datetime(2025, 8, 15, 6, tzinfo=timezone.utc)
+    waypoints = [{"at_h": 4.0, "duration_h": 1.0, "type": "pickup_on_duty", "ready_at": ready, "stop_index": 0}]
+    plan = plan_schedule(10.0, START, 0.0, waypoints=waypoints)
+    _check_days(plan)
+
+    day1, day2 = plan["days"]
+    assert day1["segments"][-1] == {"status": OFF, "from": "13:00", "to": "24:00"}
+    assert day2["segments"][0] == {"status": OFF, "from": "00:00", "to": "06:00"}
+    assert day2["segments"][1] == {"status": ON, "from": "06:00", "to": "07:00"}
+
+    # the 17-hour wait is the 10-hour reset: no extra overnight before delivery
+    types = [s["type"] for s in plan["stops"]]
+    assert "overnight_off" not in types
+    dropoff = plan["stops"][-1]
+    assert dropoff["type"] == "dropoff_on_duty"
+    assert dropoff["at_iso"] == "2025-08-15T13:00:00+00:00"
+
+
+def test_short_wait_keeps_the_duty_window_running():
+    ready = START + timedelta(hours=9)
+    waypoints = [{"at_h": 6.0, "duration_h": 1.0, "type": "dropoff_on_duty", "ready_at": ready}]
+    plan = plan_schedule(8.0, START, 0.0, waypoints=waypoints)
+    _check_days(plan)
+    # 1 h pickup + 6 h drive + 2 h wait + 1 h stop = 10 h: only 4 h of window left to drive 2 h
+    types = [s["type"] for s in plan["stops"]]
+    assert types == ["pickup_on_duty", "dropoff_on_duty", "dropoff_on_duty"]
@@ -0,0 +1,61 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from dateutil import parser as dtparser
+
+from planning.audit import audit_rows, new_stats
+from planning.hos import plan_schedule
+from planning.hos_opt import optimize_schedule
+from planning.traffic import FlatProfile, SpeedProfile
+
+START = datetime(2025, 8, 14, 8, tzinfo=timezone.utc)
+
+
+def _finish(plan):
+    last = plan["stops"][-1]
+    return dtparser.isoparse(last["at_iso"]) + timedelta(minutes=last["duration_min"])
+
+
+def _violations(plan):
+    rows = [("d1", day["date"], s["status"], s["from"], s["to"]) for day in plan["days"] for s in day["segments"]]
+    return list(audit_rows(rows, new_stats()))
+
+
+@pytest.mark.parametrize("hours", [6, 12, 20, 30])
+@pytest.mark.parametrize("profile", [FlatProfile(), SpeedProfile()], ids=["flat", "traffic"])
+def test_never_later_than_greedy_and_legal(hours, profile):
+    greedy = plan_schedule(hours, START, 0.0, profile=profile)
+    best = optimize_schedule(hours, START, 0.0, profile=profile)
+    assert _finish(best) <= _finish(greedy)
+    assert _violations(best) == []
+    dates = [d["date"] for d in best["days"]]
+    assert dates == sorted(set(dates))
+
+
+def test_uses_a_sleeper_split_when_it_pays():
+    # 12 h from 08:00: a 2 h + 8 h split instead of a 30-minute break and a 10 h reset
+    best = optimize_schedule(12, START, 0.0)
+    assert best["summary"]["planner"] == "optimal"
+    assert [s["type"] for s in best["stops"]] == ["pickup_on_duty", "off_duty_rest", "sleeper_berth", "dropoff_on_duty"]
+    assert _finish(best) == _finish(plan_schedule(12, START, 0.0)) - timedelta(minutes=30)
+    assert _violations(best) == []
+
+
+def test_time_budget_bounds_the_worst_case():
+    t0 = time.perf_counter()
+    plan = optimize_schedule(60, START, 0.0, profile=SpeedProfile(), budget_s=0.05)
+    assert time.perf_counter() - t0 < 0.5
+    # whatever the search got to, the answer is a complete, legal plan
+    assert plan["stops"][-1]["type"] == "dropoff_on_duty"
+    assert _finish(plan) <= _finish(plan_schedule(60, START, 0.0, profile=SpeedProfile()))
+    assert _violations(plan) == []
+
+
+def test_waypoint_windows_are_respected():
+    ready = START + timedelta(hours=10)
+    waypoints = [{"at_h": 3.0, "duration_h": 1.0, "type": "pickup_on_duty", "ready_at": ready, "stop_index": 0}]
+    best = optimize_schedule(12, START, 0.0, waypoints=waypoints)
+    pickup = next(s for s in best["stops"] if s.get("stop_index") == 0)
+    assert dtparser.isoparse(pickup["at_iso"]) >= ready
+    assert _violations(best) == []
@@ -0,0 +1,46 @@
+import pytest
+
+from planning.poi import MILE_M, MmapPOIIndex, snap_stops, write_index
+from planning.tests.util import point_at_mile, route_geometry as _route
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "poi.idx"
+    write_index([
+        ("Pilot 100", *point_at_mile(100, lat=35.002), "truck_stop"),
+        ("Rest area 180", *point_at_mile(180, lat=34.997), "rest_area"),
+        ("Far off", *point_at_mile(240, lat=35.2), "truck_stop"),
+        ("Elsewhere", 47.6, -122.3, "parking"),
+    ], path)
+    return MmapPOIIndex(str(path))
+
+
+def test_index_round_trip(index):
+    assert len(index) == 4
+    rows = list(index.query_bbox(47.0, -123.0, 48.0, -122.0))
+    assert [(index.name(r), index.kind(r)) for r in rows] == [("Elsewhere", "parking")]
+    assert index.lats[rows[0]] == pytest.approx(47.6)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "junk.idx"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        MmapPOIIndex(str(path))
+
+
+def test_snaps_back_to_parking_within_tolerance(index):
+    pts, cum = _route(300)
+    snapped = snap_stops(pts, cum, [110 * MILE_M, 185 * MILE_M, 95 * MILE_M, 250 * MILE_M], index)
+    assert snapped[0]["near"] == "Pilot 100" and snapped[0]["kind"] == "truck_stop"
+    assert snapped[1]["near"] == "Rest area 180"
+    assert snapped[0]["along_m"] <= 110 * MILE_M
+    # never moved forward past the limit that forced the stop, nor off the corridor
+    assert snapped[2] is None
+    assert snapped[3] is None
+
+
+def test_no_index_means_no_snaps():
+    pts, cum = _route(100)
+    assert snap_stops(pts, cum, [50 * MILE_M], None) == [None]
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone as djtz
+
+from planning.models import PlannedRoute
+from planning.replan import get_track, load_plan, remaining_route, store_plan
+from planning.tests.util import point_at_mile, straight_route
+
+READY = datetime(2025, 8, 15, 9, tzinfo=timezone.utc)
+DROPOFF = {"type": "dropoff_on_duty", "duration_h": 1.0, "ready_at": READY, "stop_index": 1}
+PLACES = {"pretrip_on_duty": {"lat": 35.0, "lng": -100.0, "display_name": "Start"}}
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def stored(db):
+    route = straight_route(550, legs=(200,))
+    waypoints = [{"at_h": 200 / 55.0, "type": "pickup_on_duty", "duration_h": 1.0, "ready_at": None, "stop_index": 0}]
+    places = [{"lat": 35.0, "lng": -96.0, "display_name": "Pickup"}, {"lat": 35.0, "lng": -90.0, "display_name": "Dropoff"}]
+    route_id = store_plan(route, waypoints, last_stop=DROPOFF, places_by_type=PLACES, places_by_index=places)
+    return route_id, route
+
+
+def test_round_trip_through_the_database(stored):
+    route_id, route = stored
+    cache.clear()   # another worker, or after a restart
+    plan = load_plan(route_id)
+    assert plan["route"] == route
+    assert plan["last_stop"] == DROPOFF
+    assert plan["waypoints"][0]["stop_index"] == 0
+    assert plan["places_by_index"][1]["display_name"] == "Dropoff"
+    # and it's cached again for the next request
+    assert cache.get(f"plan:{route_id}") == plan
+
+
+def test_expired_plans_are_gone(stored):
+    route_id, _ = stored
+    PlannedRoute.objects.update(saved_at=djtz.now() - timedelta(days=30))
+    cache.clear()
+    assert load_plan(route_id) is None
+    assert load_plan("nope") is None
+
+
+def test_trips_on_one_lane_keep_their_own_plans(db):
+    route = straight_route(550, legs=(200,))
+    early = dict(DROPOFF, ready_at=READY)
+    late = dict(DROPOFF, ready_at=READY + timedelta(hours=6))
+    a = store_plan(route, last_stop=early, places_by_type=PLACES)
+    b = store_plan(route, last_stop=late, places_by_type=PLACES)
+    assert a != b
+    assert store_plan(route, last_stop=early, places_by_type=PLACES) == a
+
+    cache.clear()
+    assert load_plan(a)["last_stop"]["ready_at"] == READY
+    assert load_plan(b)["last_stop"]["ready_at"] == READY + timedelta(hours=6)
+
+
+def test_expired_plans_are_cleaned_up_at_most_hourly(stored):
+    PlannedRoute.objects.update(saved_at=djtz.now() - timedelta(days=30))
+    store_plan(straight_route(100), places_by_type=PLACES)
+    assert PlannedRoute.objects.count() == 2
+    cache.delete("plan:cleanup")    # an hour later
+    store_plan(straight_route(100), places_by_type=PLACES)
+    assert PlannedRoute.objects.count() == 1
+
+
+def test_remaining_route_from_midway():
+    route = straight_route(300)
+    track = get_track(route["polyline"])
+    along_m, off_m = track.project(*point_at_mile(100))
+    assert off_m < 50
+    rest, geometry, done_h = remaining_route(route, track, along_m)
+    assert done_h == pytest.approx(100 / 55.0, rel=0.02)
+    assert rest["duration_hours"] == pytest.approx(200 / 55.0, rel=0.02)
+    assert geometry[2] == pytest.approx(route["distance_m"] - along_m, rel=1e-3)
+
+
+def test_replan_endpoint_after_cache_loss(stored, client):
+    route_id, route = stored
+    cache.clear()
+    lat, lng = point_at_mile(300)
+    r = client.post("/api/replan/", {
+        "route_id": route_id, "lat": lat, "lng": lng, "at_iso": "2025-08-14T14:00:00Z",
+        "cycle_used_hours": 20, "traffic_aware": False,
+    }, content_type="application/json")
+    assert r.status_code == 200, r.content
+    out = r.json()
+    assert out["route_id"] == route_id
+    assert out["progress"] == pytest.approx(300 / 550, abs=0.01)
+    # pickup is behind the driver; the dropoff waits for its window
+    assert [s["type"] for s in out["stops"]][-1] == "dropoff_on_duty"
+    assert datetime.fromisoformat(out["stops"][-1]["at_iso"]) == READY
+    assert not any(s["type"] == "pickup_on_duty" for s in out["stops"])
+
+
+def test_replan_unknown_route(db, client):
+    r = client.post("/api/replan/", {"route_id": "deadbeef", "lat": 35.0, "lng": -100.0, "cycle_used_hours": 0},
+                    content_type="application/json")
+    assert r.status_code == 404
+
+
+def test_replan_off_route(stored, client):
+    route_id, _ = stored
+    r = client.post("/api/replan/", {"route_id": route_id, "lat": 40.0, "lng": -100.0, "cycle_used_hours": 0},
+                    content_type="application/json")
+    assert r.status_code == 400
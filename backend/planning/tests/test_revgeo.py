@@ -0,0 +1,43 @@
+import pytest
+
+from planning import revgeo
+from planning.revgeo import PlaceIndex
+
+PLACES = [
+    ("Dallas", "TX", 32.7767, -96.7970),
+    ("Fort Worth", "TX", 32.7555, -97.3308),
+    ("Oklahoma City", "OK", 35.4676, -97.5164),
+    ("Amarillo", "TX", 35.2220, -101.8313),
+    ("Denver", "CO", 39.7392, -104.9903),
+]
+
+
+def _brute(lat, lng):
+    from haversine import haversine
+    return min(PLACES, key=lambda p: haversine((lat, lng), (p[2], p[3])))
+
+
+def test_nearest_matches_brute_force():
+    index = PlaceIndex(PLACES)
+    queries = [(32.9, -97.0), (32.7, -97.2), (35.3, -97.9), (35.4, -101.5), (39.5, -104.8), (32.76, -97.07)]
+    expected = ["{}, {}".format(*_brute(*q)) for q in queries]
+    assert index.nearest_many(queries) == expected
+
+
+def test_nothing_beyond_max_km():
+    index = PlaceIndex(PLACES)
+    assert index.nearest_many([(45.0, -90.0), (32.78, -96.80)]) == [None, "Dallas, TX"]
+
+
+def test_get_places_reads_csv(tmp_path, monkeypatch):
+    path = tmp_path / "places.csv"
+    path.write_text("name,state,lat,lng\nDenver,CO,39.7392,-104.9903\nbad,XX,,\n")
+    monkeypatch.setenv(revgeo.PLACES_PATH_ENV, str(path))
+    places = revgeo.get_places()
+    assert len(places) == 1
+    assert places.nearest_many([(39.7, -105.0)]) == ["Denver, CO"]
+
+
+def test_get_places_missing_dataset(tmp_path, monkeypatch):
+    monkeypatch.setenv(revgeo.PLACES_PATH_ENV, str(tmp_path / "none.csv"))
+    assert revgeo.get_places() is None
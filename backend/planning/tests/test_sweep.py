@@ -0,0 +1,116 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from planning import views
+from planning.hos_opt import optimize_schedule
+from planning.tests.util import straight_route
+
+T0 = datetime(2025, 8, 18, 6, tzinfo=timezone.utc)
+PLACES = {
+    "Amarillo, TX": {"lat": 35.0, "lng": -100.0, "display_name": "Amarillo, Texas, United States"},
+    "Tucumcari, NM": {"lat": 35.0, "lng": -99.0, "display_name": "Tucumcari, New Mexico, United States"},
+    "Memphis, TN": {"lat": 35.0, "lng": -90.0, "display_name": "Memphis, Tennessee, United States"},
+}
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Geocode from PLACES and route along a straight 600-mile line."""
+    monkeypatch.setattr(views, "geocode_place", lambda q: PLACES[q])
+    monkeypatch.setattr(views, "osrm_route", lambda points, annotations=False: straight_route(600, legs=(55,)))
+
+
+def _body(**kw):
+    body = {
+        "current_location": "Amarillo, TX", "pickup_location": "Tucumcari, NM", "dropoff_location": "Memphis, TN",
+        "current_cycle_used_hours": 10, "traffic_aware": False,
+        "window_start_iso": T0.isoformat(), "window_end_iso": (T0 + timedelta(hours=12)).isoformat(), "step_min": 60,
+    }
+    body.update(kw)
+    return body
+
+
+def test_candidate_without_stops():
+    schedule = {"stops": [], "summary": {"cycle_used_hours": 0.0, "cycle_exceeded": False}}
+    cand, arrival = views._sweep_candidate(schedule, T0, True, T0 + timedelta(hours=1))
+    assert arrival == T0
+    assert cand["duration_hours"] == 0 and cand["overnights"] == 0 and cand["on_time"]
+
+
+def _cand(exceeded, arrival_h, overnights=0, late_min=0):
+    arrival = T0 + timedelta(hours=arrival_h)
+    return {"cycle_exceeded": exceeded, "overnights": overnights, "late_min": late_min}, arrival
+
+
+def test_best_candidate_prefers_legal_then_earliest():
+    cands = [_cand(True, 5), _cand(False, 9, overnights=1), _cand(False, 8, overnights=1), _cand(False, 8, overnights=2)]
+    assert views._best_candidate(cands, has_appt=False) == 2
+    assert views._best_candidate([], has_appt=False) is None
+
+
+def test_best_candidate_against_appointment_prefers_latest_on_time_start():
+    cands = [_cand(False, 8), _cand(False, 9), _cand(False, 10, late_min=30), _cand(True, 9)]
+    assert views._best_candidate(cands, has_appt=True) == 1
+
+
+def test_sweep_endpoint(offline, client):
+    r = client.post("/api/plan-sweep/", _body(), content_type="application/json")
+    assert r.status_code == 200, r.content
+    out = r.json()
+    assert len(out["candidates"]) == 13
+    starts = [c["start_iso"] for c in out["candidates"]]
+    assert starts == sorted(starts)
+    best = out["best"]
+    assert best["arrival_iso"] == min(c["arrival_iso"] for c in out["candidates"] if not c["cycle_exceeded"])
+
+
+def test_sweep_with_appointment(offline, client):
+    appt = T0 + timedelta(days=1, hours=8)
+    r = client.post("/api/plan-sweep/", _body(appointment_start_iso=appt.isoformat(),
+                                              appointment_end_iso=(appt + timedelta(hours=2)).isoformat()),
+                    content_type="application/json")
+    assert r.status_code == 200, r.content
+    out = r.json()
+    assert all("on_time" in c for c in out["candidates"])
+    # never at the dock before it opens
+    assert all(datetime.fromisoformat(c["arrival_iso"]) >= appt for c in out["candidates"])
+    assert out["best"]["on_time"]
+
+
+def test_optimal_sweep_shares_one_search_budget(offline, client, monkeypatch):
+    monkeypatch.setattr(views, "SWEEP_BUDGET_S", 1.0)
+    monkeypatch.setattr(views, "osrm_route", lambda points, annotations=False: straight_route(3000, legs=(55,)))
+    budgets = []
+
+    def optimize(*args, budget_s=None, **kw):
+        budgets.append(budget_s)
+        return optimize_schedule(*args, budget_s=budget_s, **kw)
+
+    monkeypatch.setitem(views.PLANNERS, "optimal", optimize)
+    t0 = time.perf_counter()
+    r = client.post("/api/plan-sweep/", _body(planner="optimal", traffic_aware=True, step_min=15,
+                                              window_end_iso=(T0 + timedelta(hours=24)).isoformat()),
+                    content_type="application/json")
+    elapsed = time.perf_counter() - t0
+    assert r.status_code == 200, r.content
+    assert len(budgets) == 97
+    assert None not in budgets and budgets[0] == pytest.approx(1.0 / 97, rel=0.05)
+    # each start's overrun is taken from the ones after it (0.2 s each used to add up to ~20 s)
+    assert elapsed < 1.25
+
+
+def test_sweep_rejects_alternatives(offline, client):
+    r = client.post("/api/plan-sweep/", _body(alternatives=2), content_type="application/json")
+    assert r.status_code == 400
+    assert "alternatives" in r.json()
+
+
+def test_sweep_window_limits(offline, client):
+    r = client.post("/api/plan-sweep/", _body(step_min=5, window_end_iso=(T0 + timedelta(days=2)).isoformat()),
+                    content_type="application/json")
+    assert r.status_code == 400 and "step_min" in r.json()
+    r = client.post("/api/plan-sweep/", _body(window_end_iso=(T0 - timedelta(hours=1)).isoformat()),
+                    content_type="application/json")
+    assert r.status_code == 400 and "window_end_iso" in r.json()
@@ -0,0 +1,151 @@
+from datetime import date, timedelta
+
+import pytest
+
+from planning import tiles
+from planning.models import Trip
+from planning.routing import encode_polyline6
+from planning.tiles import EXTENT, TripTileIndex, _clip_line, mercator, render_tile
+
+TODAY = date.today()
+
+
+def _varint(buf, i):
+    n = shift = 0
+    while True:
+        b = buf[i]
+        n |= (b & 0x7F) << shift
+        i += 1
+        if b < 0x80:
+            return n, i
+        shift += 7
+
+
+def _message(buf):
+    """Minimal protobuf reader: {field number: [values]} (bytes for length-delimited fields)."""
+    out, i = {}, 0
+    while i < len(buf):
+        key, i = _varint(buf, i)
+        num, wire = key >> 3, key & 7
+        if wire == 0:
+            v, i = _varint(buf, i)
+        elif wire == 2:
+            n, i = _varint(buf, i)
+            v, i = bytes(buf[i:i + n]), i + n
+        elif wire == 1:
+            v, i = bytes(buf[i:i + 8]), i + 8
+        else:
+            raise AssertionError(f"unexpected wire type {wire}")
+        out.setdefault(num, []).append(v)
+    return out
+
+
+def _packed(buf):
+    vals, i = [], 0
+    while i < len(buf):
+        v, i = _varint(buf, i)
+        vals.append(v)
+    return vals
+
+
+def _unzig(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def _layers(data):
+    return {_message(raw)[1][0].decode(): _message(raw) for raw in _message(data).get(3, [])}
+
+
+def _tile_of(lat, lng, z):
+    x, y = mercator(lat, lng)
+    return int(x * (1 << z)), int(y * (1 << z))
+
+
+def _trip(days_ago, driver="ann", lat=35.0):
+    pts = [(lat, -100.0 + 0.05 * i) for i in range(60)]
+    stops = [{"type": "overnight_off", "lat": lat, "lng": -99.0, "place": "Somewhere, TX"}]
+    return Trip.objects.create(driver=driver, start_date=TODAY - timedelta(days=days_ago),
+                               polyline=encode_polyline6(pts), stops=stops)
+
+
+def test_clip_line_to_tile():
+    parts = _clip_line([-100, 50, 200, 5000], [10, 10, 10, 10], -64, EXTENT + 64)
+    assert parts == [[(-64, 10), (50, 10), (200, 10), (4160, 10)]]
+    assert _clip_line([-500, -400], [10, 10], -64, EXTENT + 64) == []
+
+
+@pytest.mark.django_db
+def test_tile_encoding():
+    trip = _trip(1)
+    index = TripTileIndex()
+    index.refresh(TODAY - timedelta(days=14))
+    z = 8
+    x, y = _tile_of(35.0, -99.0, z)
+    layers = _layers(render_tile(index, z, x, y))
+    assert set(layers) == {"routes", "stops"}
+
+    routes = layers["routes"]
+    assert routes[15] == [2] and routes[5] == [EXTENT]
+    assert [k.decode() for k in routes[3]] == ["trip_id", "driver"]
+    feature = _message(routes[2][0])
+    assert feature[1] == [trip.id] and feature[3] == [2]   # LINESTRING
+    geom = _packed(feature[4][0])
+    assert geom[0] & 7 == 1 and geom[0] >> 3 == 1        # MoveTo 1
+    assert geom[3] & 7 == 2 and geom[3] >> 3 >= 1        # LineTo n
+    assert len(geom) == 4 + 2 * (geom[3] >> 3)
+
+    stop = _message(layers["stops"][2][0])
+    px, py = (_unzig(v) for v in _packed(stop[4][0])[1:])
+    sx, sy = mercator(35.0, -99.0)
+    assert (px, py) == (round((sx * (1 << z) - x) * EXTENT), round((sy * (1 << z) - y) * EXTENT))
+
+    # no stops layer below STOPS_MIN_ZOOM, and empty tiles are empty
+    assert set(_layers(render_tile(index, 3, *_tile_of(35.0, -99.0, 3)))) == {"routes"}
+    assert render_tile(index, z, 0, 0) == b""
+
+
+@pytest.mark.django_db
+def test_index_holds_only_the_served_window():
+    old, recent = _trip(30), _trip(2)
+    index = TripTileIndex()
+    index.refresh(TODAY - timedelta(days=14))
+    assert set(index.trips) == {recent.id}
+
+    # the window moves on: trips that fall out of it are evicted
+    index.refresh(TODAY - timedelta(days=1))
+    assert index.trips == {} and index.cells == {}
+
+    # and widening it reloads what's needed
+    index.refresh(TODAY - timedelta(days=60))
+    assert set(index.trips) == {old.id, recent.id}
+
+
+@pytest.mark.django_db
+def test_refresh_is_throttled(monkeypatch):
+    since = TODAY - timedelta(days=14)
+    index = TripTileIndex()
+    index.refresh(since)
+    first = _trip(0)
+    index.refresh(since)
+    assert first.id not in index.trips     # within REFRESH_S
+    index.refresh(since, force=True)
+    assert first.id in index.trips
+    monkeypatch.setattr(tiles, "REFRESH_S", 0.0)
+    second = _trip(0)
+    index.refresh(since)
+    assert second.id in index.trips and index.version == second.id
+
+
+@pytest.mark.django_db
+def test_vector_tile_endpoint(client, monkeypatch):
+    monkeypatch.setattr(tiles, "_index", None)
+    _trip(1, driver="ann")
+    z = 8
+    x, y = _tile_of(35.0, -99.0, z)
+    r = client.get(f"/tiles/{z}/{x}/{y}.mvt")
+    assert r.status_code == 200
+    assert r["Content-Type"] == "application/vnd.mapbox-vector-tile"
+    assert "routes" in _layers(r.content)
+    assert _layers(client.get(f"/tiles/{z}/{x}/{y}.mvt", {"driver": "bob"}).content) == {}
+    assert client.get("/tiles/19/0/0.mvt").status_code == 404
+    assert client.get("/tiles/2/4/0.mvt").status_code == 404
@@ -0,0 +1,58 @@
+import itertools
+import random
+
+import pytest
+
+from planning.tour import INFEASIBLE, Tour, haversine_matrix
+
+
+def _random_tour(n, seed):
+    rnd = random.Random(seed)
+    pts = [(rnd.uniform(30, 40), rnd.uniform(-100, -90)) for _ in range(n + 1)]
+    dur = [[v / 3600.0 for v in row] for row in haversine_matrix(pts)["durations"]]
+    return Tour(dur, [0.25] + [0.5] * n)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_improvement_close_to_brute_force(seed):
+    tour = _random_tour(6, seed)
+    optimum = min(tour.cost(list(p)) for p in itertools.permutations(range(1, 7)))
+    start = tour.nearest_neighbour()
+    order, cost = tour.improve(start)
+    assert sorted(order) == list(range(1, 7))
+    assert cost <= tour.cost(start)
+    assert cost <= optimum * 1.05
+
+
+def test_pickup_before_dropoff():
+    # node 2 is the dropoff of the shipment picked up at node 1, which is further away
+    dur = [
+        [0, 5, 1],
+        [5, 0, 5],
+        [1, 5, 0],
+    ]
+    tour = Tour(dur, [0, 0.5, 0.5], before=[None, None, 1])
+    assert tour.cost([2, 1]) == INFEASIBLE
+    order, _ = tour.solve()
+    assert order == [1, 2]
+
+
+def test_time_windows_reorder_stops():
+    # node 2 is closer but only opens after node 1 closes
+    dur = [
+        [0, 3, 1],
+        [3, 0, 3],
+        [1, 3, 0],
+    ]
+    windows = [(None, None), (None, 4.0), (8.0, None)]
+    tour = Tour(dur, [0, 1, 1], windows=windows)
+    order, cost = tour.solve()
+    assert order == [1, 2]
+    assert cost == pytest.approx(9.0)
+
+
+def test_haversine_matrix_is_symmetric():
+    m = haversine_matrix([(32.78, -96.80), (35.47, -97.52), (39.74, -104.99)])
+    dist = m["distances"]
+    assert all(dist[i][i] == 0 for i in range(3))
+    assert dist[0][1] == dist[1][0] > 0
@@ -0,0 +1,112 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from planning.hos import plan_schedule
+from planning.traffic import DEFAULT_PROFILE, FlatProfile, SpeedProfile, zone_for
+
+CHICAGO = ZoneInfo("America/Chicago")
+
+
+def test_rejects_bad_tables():
+    with pytest.raises(ValueError):
+        SpeedProfile([1.0] * 24)
+    with pytest.raises(ValueError):
+        SpeedProfile([1.0] * 167 + [0.0])
+
+
+def test_factor_indexed_by_hour_of_week():
+    profile = SpeedProfile()
+    monday_8am = datetime(2025, 8, 18, 8, 30, tzinfo=timezone.utc)
+    sunday_8am = datetime(2025, 8, 17, 8, 30, tzinfo=timezone.utc)
+    assert profile.factor_at(monday_8am) == DEFAULT_PROFILE[8]
+    assert profile.factor_at(sunday_8am) == DEFAULT_PROFILE[6 * 24 + 8]
+
+
+def test_progress_and_wall_hours_are_inverse():
+    profile = SpeedProfile()
+    start = datetime(2025, 8, 18, 5, 40, tzinfo=timezone.utc)
+    wall = profile.wall_hours(start, 6.0)
+    assert wall > 6.0   # through the morning peak
+    assert profile.progress(start, wall) == pytest.approx(6.0)
+    assert profile.wall_hours(start, 6.0, limit=2.0) == 2.0
+
+
+def test_flat_profile_is_identity():
+    start = datetime(2025, 8, 18, 7, tzinfo=timezone.utc)
+    assert FlatProfile().wall_hours(start, 3.5) == 3.5
+    assert FlatProfile().progress(start, 3.5) == 3.5
+
+
+@pytest.mark.parametrize("lat, lng, zone", [
+    (40.71, -74.01, "America/New_York"),
+    (32.78, -96.80, "America/Chicago"),
+    (39.74, -104.99, "America/Denver"),
+    (34.05, -118.24, "America/Los_Angeles"),
+    (61.22, -149.90, "America/Anchorage"),
+    (21.31, -157.86, "Pacific/Honolulu"),
+    # either side of the Eastern/Central line
+    (36.16, -86.78, "America/Chicago"),      # Nashville
+    (33.52, -86.80, "America/Chicago"),      # Birmingham
+    (34.73, -86.59, "America/Chicago"),      # Huntsville
+    (30.42, -87.22, "America/Chicago"),      # Pensacola
+    (30.16, -85.66, "America/Chicago"),      # Panama City
+    (35.95, -85.03, "America/Chicago"),      # Crossville
+    (36.99, -86.44, "America/Chicago"),      # Bowling Green
+    (37.97, -87.57, "America/Chicago"),      # Evansville
+    (41.60, -87.35, "America/Chicago"),      # Gary
+    (45.82, -88.07, "America/Chicago"),      # Iron Mountain
+    (30.44, -84.28, "America/New_York"),     # Tallahassee
+    (35.05, -85.31, "America/New_York"),     # Chattanooga
+    (35.96, -83.92, "America/New_York"),     # Knoxville
+    (38.25, -85.76, "America/New_York"),     # Louisville
+    (37.69, -85.86, "America/New_York"),     # Elizabethtown
+    (39.47, -87.41, "America/New_York"),     # Terre Haute
+    (41.68, -86.25, "America/New_York"),     # South Bend
+    (46.54, -87.40, "America/New_York"),     # Marquette
+    # Central/Mountain
+    (35.22, -101.83, "America/Chicago"),     # Amarillo
+    (31.04, -104.83, "America/Chicago"),     # Van Horn
+    (44.37, -100.35, "America/Chicago"),     # Pierre
+    (48.15, -103.62, "America/Chicago"),     # Williston
+    (31.76, -106.44, "America/Denver"),      # El Paso
+    (39.35, -101.71, "America/Denver"),      # Goodland
+    (41.13, -101.72, "America/Denver"),      # Ogallala
+    (46.88, -102.79, "America/Denver"),      # Dickinson
+    # Mountain/Pacific, and Arizona without DST
+    (43.62, -116.20, "America/Denver"),      # Boise
+    (46.87, -113.99, "America/Denver"),      # Missoula
+    (46.42, -117.02, "America/Los_Angeles"), # Lewiston
+    (36.17, -115.14, "America/Los_Angeles"), # Las Vegas
+    (33.61, -114.60, "America/Los_Angeles"), # Blythe
+    (33.45, -112.07, "America/Phoenix"),
+    (32.69, -114.62, "America/Phoenix"),     # Yuma
+    (35.20, -111.65, "America/Phoenix"),     # Flagstaff
+])
+def test_zone_for_us_locations(lat, lng, zone):
+    assert zone_for(lat, lng).key == zone
+
+
+def test_localized_profile_reads_local_clock():
+    profile = SpeedProfile().localized(CHICAGO)
+    # 13:00 UTC is 08:00 CDT: the local morning peak, not UTC's early afternoon
+    at = datetime(2025, 8, 18, 13, tzinfo=timezone.utc)
+    assert profile.factor_at(at) == DEFAULT_PROFILE[8]
+    assert SpeedProfile().factor_at(at) == DEFAULT_PROFILE[13]
+
+
+def test_rush_hour_slowdown_at_local_time():
+    # half a baseline hour started at 07:00 Chicago time vs. 02:00 Chicago time
+    profile = SpeedProfile().localized(CHICAGO)
+    rush = profile.wall_hours(datetime(2025, 8, 18, 12, tzinfo=timezone.utc), 0.5)
+    night = profile.wall_hours(datetime(2025, 8, 18, 7, tzinfo=timezone.utc), 0.5)
+    assert rush == pytest.approx(0.5 * DEFAULT_PROFILE[7])
+    assert night == pytest.approx(0.5 * DEFAULT_PROFILE[2])
+
+    # after the 1 h pickup, driving starts at 08:00 local (13:00 UTC, off-peak)
+    start = datetime(2025, 8, 18, 12, tzinfo=timezone.utc)
+    local = plan_schedule(0.5, start, 0.0, profile=profile)
+    utc = plan_schedule(0.5, start, 0.0, profile=SpeedProfile())
+    assert local["summary"]["drive_hours"] == pytest.approx(0.5 * DEFAULT_PROFILE[8], abs=0.01)
+    assert utc["summary"]["drive_hours"] == pytest.approx(0.5 * DEFAULT_PROFILE[13], abs=0.01)
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from planning.models import PlannedRoute, Trip
+from planning.replan import load_plan, store_plan
+from planning.tests.util import straight_route
+
+DAY = {
+    "date": "2025-08-14",
+    "segments": [
+        {"status": "OFF", "from": "00:00", "to": "08:00"},
+        {"status": "ON", "from": "08:00", "to": "09:00"},
+        {"status": "D", "from": "09:00", "to": "17:00"},
+        {"status": "OFF", "from": "17:00", "to": "24:00"},
+    ],
+    "totals": {"OFF": 15.0, "SB": 0.0, "D": 8.0, "ON": 1.0},
+    "labels": [{"time": "08:00", "text": "Pickup — Dallas, TX"}],
+}
+
+
+def _plan(route_id="r1", days=(DAY,)):
+    return {"route_id": route_id, "polyline": "_ibE_seK_seK_seK", "summary": {"drive_hours": 8.0},
+            "places": {}, "stops": [], "days": list(days)}
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_keyset_pagination(client):
+    ids = [Trip.from_plan(_plan(), driver="ann" if i % 2 else "bob").id for i in range(5)]
+    r = client.get("/api/trips/", {"limit": 2}).json()
+    assert [t["trip_id"] for t in r["results"]] == ids[:-3:-1]
+    assert r["next_before"] == ids[3]
+    r = client.get("/api/trips/", {"limit": 2, "before": r["next_before"]}).json()
+    assert [t["trip_id"] for t in r["results"]] == [ids[2], ids[1]]
+    r = client.get("/api/trips/", {"limit": 2, "before": r["next_before"]}).json()
+    assert [t["trip_id"] for t in r["results"]] == [ids[0]]
+    assert r["next_before"] is None
+
+    r = client.get("/api/trips/", {"driver": "ann"}).json()
+    assert [t["trip_id"] for t in r["results"]] == [ids[3], ids[1]]
+    assert client.get("/api/trips/", {"before": "x"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_trip_detail_round_trip(client):
+    trip = Trip.from_plan(_plan(), driver="ann")
+    out = client.get(f"/api/trips/{trip.id}/").json()
+    assert out["days"] == [DAY]
+    assert out["route_id"] == "r1"
+    assert client.get("/api/trips/999999/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_trip_day_svg(client):
+    trip = Trip.from_plan(_plan())
+    r = client.get(f"/api/trips/{trip.id}/days/2025-08-14.svg")
+    assert r.status_code == 200
+    assert r["Content-Type"] == "image/svg+xml"
+    assert "max-age" in r["Cache-Control"]
+    assert client.get(f"/api/trips/{trip.id}/days/notadate.svg").status_code == 400
+    assert client.get(f"/api/trips/{trip.id}/days/2025-02-30.svg").status_code == 400
+    assert client.get(f"/api/trips/{trip.id}/days/2025-08-20.svg").status_code == 404
+    assert client.get("/api/trips/999999/days/2025-08-14.svg").status_code == 404
+
+
+@pytest.mark.django_db
+def test_stored_trips_keep_their_route_for_replanning():
+    kept = store_plan(straight_route(100))
+    dropped = store_plan(straight_route(120))
+    Trip.from_plan(_plan(route_id=kept))
+    PlannedRoute.objects.update(saved_at=timezone.now() - timedelta(days=30))
+    cache.clear()
+
+    assert load_plan(kept) is not None
+    assert load_plan(dropped) is None
+    store_plan(straight_route(140))   # prunes expired plans no trip refers to
+    assert set(PlannedRoute.objects.values_list("route_id", flat=True)) >= {kept}
+    assert not PlannedRoute.objects.filter(route_id=dropped).exists()
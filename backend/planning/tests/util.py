@@ -0,0 +1,43 @@
+from planning.routing import _cumdist, encode_polyline6
+
+MILE_M = 1609.344
+
+
+def straight_route(miles, lat=35.0, lng=-100.0, mph=55.0, step_miles=5, legs=()):
+    """
+    A route dict shaped like routing.osrm_route(..., annotations=True): due east
+    from (lat, lng) at a constant mph. legs: mile marks where a leg ends
+    (the last leg ends at the destination).
+    """
+    pts, cum_d = route_geometry(miles, lat, lng, step_miles)
+    total_m = cum_d[-1]
+    mps = mph * MILE_M / 3600.0
+    cum_t = [d / mps for d in cum_d]
+    marks = [m * MILE_M for m in legs] + [total_m]
+    leg_s, prev = [], 0.0
+    for m in marks:
+        leg_s.append((m - prev) / mps)
+        prev = m
+    return {
+        "polyline": encode_polyline6(pts),
+        "distance_m": total_m,
+        "duration_s": total_m / mps,
+        "distance_miles": total_m / MILE_M,
+        "duration_hours": total_m / mps / 3600.0,
+        "leg_durations_s": leg_s,
+        "cum_duration_s": cum_t,
+        "cum_distance_m": cum_d,
+    }
+
+
+def point_at_mile(mile, lat=35.0, lng=-100.0):
+    """(lat, lng) `mile` miles along straight_route() with the same origin."""
+    deg = MILE_M / (111_320.0 * 0.8191520)   # degrees of longitude per mile near 35N
+    return lat, lng + mile * deg
+
+
+def route_geometry(miles, lat=35.0, lng=-100.0, step_miles=5):
+    """straight_route()'s decoded geometry: (points, cumulative metres)."""
+    pts = [point_at_mile(m, lat, lng) for m in range(0, int(miles) + 1, step_miles)]
+    cum, _ = _cumdist(pts)
+    return pts, cum
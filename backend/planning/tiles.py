@@ -0,0 +1,363 @@
+import math
+import os
+import struct
+import threading
+import time
+from array import array
+from datetime import date, timedelta
+
+from .routing import decode_polyline6
+from .spatial import simplify
+
+# Mapbox Vector Tile (spec 2.1) encoding of stored trips, written against
+# the protobuf wire format directly so no extra dependency is needed.
+
+EXTENT = 4096
+BUFFER = 64             # tile units drawn outside the tile edge, hides seams
+MAX_ZOOM = 18
+BASE_ZOOM = 14          # geometry is kept at this zoom's detail; deeper tiles reuse it
+INDEX_ZOOM = 6          # bbox index cells are the tiles of this zoom
+STOPS_MIN_ZOOM = 6
+SIMPLIFY_PX = 0.5       # Douglas-Peucker tolerance in 256-px tile pixels
+
+MAX_LAT = 85.05112878
+M_PER_PX_Z0 = 156_543.03392   # metres per 256-px pixel at the equator, zoom 0
+
+# Trips drawn on the fleet map: those starting within the last N days.
+TILE_DAYS_ENV = "SPOTTER_TILE_DAYS"
+DEFAULT_TILE_DAYS = 14
+
+REFRESH_S = 30.0        # how often the index looks for new trips
+
+LAYER_ROUTES = "routes"
+LAYER_STOPS = "stops"
+
+_POINT, _LINESTRING = 1, 2
+
+
+def mercator(lat, lng):
+    """(lat, lng) -> Web Mercator unit square (x, y), y growing southwards."""
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    s = math.sin(math.radians(lat))
+    return (lng + 180.0) / 360.0, 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+
+
+# --- protobuf / MVT encoding -------------------------------------------------
+
+def _varint(n, out):
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+def _field(num, payload, out):
+    """Length-delimited field."""
+    _varint((num << 3) | 2, out)
+    _varint(len(payload), out)
+    out += payload
+
+def _packed(num, values, out):
+    buf = bytearray()
+    for v in values:
+        _varint(v, buf)
+    _field(num, buf, out)
+
+def _value(v):
+    out = bytearray()
+    if isinstance(v, bool):
+        out += bytes([(7 << 3) | 0, int(v)])
+    elif isinstance(v, int):
+        if v >= 0:
+            _varint((5 << 3) | 0, out)
+            _varint(v, out)
+        else:
+            _varint((6 << 3) | 0, out)
+            _varint(_zigzag(v), out)
+    elif isinstance(v, float):
+        out.append((3 << 3) | 1)
+        out += struct.pack("<d", v)
+    else:
+        _field(1, str(v).encode(), out)
+    return out
+
+
+class _Layer:
+    def __init__(self, name):
+        self.name = name
+        self.keys, self.values = {}, {}
+        self.features = []
+
+    def _tags(self, props):
+        tags = []
+        for k, v in props.items():
+            if v is None or v == "":
+                continue
+            tags.append(self.keys.setdefault(k, len(self.keys)))
+            tags.append(self.values.setdefault((type(v).__name__, v), len(self.values)))
+        return tags
+
+    def add(self, geom_type, geometry, props, fid=None):
+        if not geometry:
+            return
+        out = bytearray()
+        if fid is not None:
+            out.append((1 << 3) | 0)
+            _varint(fid, out)
+        _packed(2, self._tags(props), out)
+        out += bytes([(3 << 3) | 0, geom_type])
+        _packed(4, geometry, out)
+        self.features.append(out)
+
+    def encode(self):
+        out = bytearray()
+        _varint((15 << 3) | 0, out)
+        _varint(2, out)
+        _field(1, self.name.encode(), out)
+        for f in self.features:
+            _field(2, f, out)
+        for k in self.keys:
+            _field(3, k.encode(), out)
+        for (_t, v) in self.values:
+            _field(4, _value(v), out)
+        _varint((5 << 3) | 0, out)
+        _varint(EXTENT, out)
+        return out
+
+
+def _command(cmd, count):
+    return (cmd & 0x7) | (count << 3)
+
+def _line_geometry(parts):
+    """[[(x, y) ints], ...] -> MVT command stream (MoveTo/LineTo with zigzag deltas)."""
+    geom = []
+    cx = cy = 0
+    for part in parts:
+        if len(part) < 2:
+            continue
+        geom.append(_command(1, 1))
+        geom += [_zigzag(part[0][0] - cx), _zigzag(part[0][1] - cy)]
+        cx, cy = part[0]
+        geom.append(_command(2, len(part) - 1))
+        for x, y in part[1:]:
+            geom += [_zigzag(x - cx), _zigzag(y - cy)]
+            cx, cy = x, y
+    return geom
+
+def _clip_segment(x0, y0, x1, y1, lo, hi):
+    """Liang-Barsky: the part of a segment inside [lo, hi]^2, or None."""
+    t0, t1 = 0.0, 1.0
+    dx, dy = x1 - x0, y1 - y0
+    for p, q in ((-dx, x0 - lo), (dx, hi - x0), (-dy, y0 - lo), (dy, hi - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        r = q / p
+        if p < 0:
+            if r > t1:
+                return None
+            t0 = max(t0, r)
+        else:
+            if r < t0:
+                return None
+            t1 = min(t1, r)
+    return (x0 + t0 * dx, y0 + t0 * dy, x0 + t1 * dx, y0 + t1 * dy, t0 == 0.0, t1 == 1.0)
+
+def _clip_line(xs, ys, lo, hi):
+    """Clip tile-space vertices to the buffered tile; returns integer parts."""
+    parts, cur = [], None
+    for i in range(len(xs) - 1):
+        c = _clip_segment(xs[i], ys[i], xs[i + 1], ys[i + 1], lo, hi)
+        if c is None:
+            cur = None
+            continue
+        ax, ay, bx, by, a_in, b_in = c
+        a, b = (round(ax), round(ay)), (round(bx), round(by))
+        if cur is None or not a_in:
+            cur = [a]
+            parts.append(cur)
+        if b != cur[-1]:
+            cur.append(b)
+        if not b_in:
+            cur = None
+    return [p for p in parts if len(p) >= 2]
+
+
+# --- trip index ----------------------------------------------------------------
+
+class _TripGeom:
+    __slots__ = ("id", "driver", "start_date", "pts", "xs", "ys", "lat_mid", "bbox", "stops", "_keep")
+
+    def __init__(self, trip):
+        self.id = trip.id
+        self.driver = trip.driver
+        self.start_date = trip.start_date
+        pts = decode_polyline6(trip.polyline) if trip.polyline else []
+        self.lat_mid = pts[len(pts) // 2][0] if pts else 0.0
+        if pts:
+            # drop detail no tile will ever draw
+            pts = [pts[i] for i in simplify(pts, self._tol_m(BASE_ZOOM))]
+        self.pts = pts
+        merc = [mercator(lat, lng) for lat, lng in pts]
+        self.xs = array("d", (m[0] for m in merc))
+        self.ys = array("d", (m[1] for m in merc))
+        self.stops = []
+        for s in trip.stops or []:
+            if isinstance(s.get("lat"), (int, float)) and isinstance(s.get("lng"), (int, float)):
+                x, y = mercator(s["lat"], s["lng"])
+                self.stops.append((x, y, s.get("type", ""), s.get("place") or s.get("near") or ""))
+        allx = list(self.xs) + [s[0] for s in self.stops]
+        ally = list(self.ys) + [s[1] for s in self.stops]
+        self.bbox = (min(allx), min(ally), max(allx), max(ally)) if allx else None
+        self._keep = {}
+
+    def _tol_m(self, z):
+        return SIMPLIFY_PX * M_PER_PX_Z0 * math.cos(math.radians(self.lat_mid)) / (1 << z)
+
+    def keep(self, z):
+        """Vertex indices simplified for zoom z (cached per zoom)."""
+        if z >= BASE_ZOOM:
+            return range(len(self.xs))
+        k = self._keep.get(z)
+        if k is None:
+            k = self._keep[z] = simplify(self.pts, self._tol_m(z))
+        return k
+
+
+class TripTileIndex:
+    """
+    Stored trips in Web Mercator with a bbox index: each trip is listed in
+    every INDEX_ZOOM tile its bbox touches. Only trips starting on or after
+    `since` are held; older ones are evicted as the window moves. New trips
+    are picked up incrementally by id (trips are immutable), at most every
+    REFRESH_S seconds, so `version` changes exactly when new trips do.
+    """
+
+    def __init__(self):
+        self.trips = {}
+        self.cells = {}
+        self.max_id = 0
+        self.since = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.max_id
+
+    def refresh(self, since, force=False):
+        from .models import Trip
+        with self._lock:
+            if self.since is not None and since < self.since:
+                # window widened: trips skipped so far are needed after all
+                self.trips, self.cells, self.max_id = {}, {}, 0
+            elif since != self.since:
+                for geom in [g for g in self.trips.values() if g.start_date < since]:
+                    self.remove(geom)
+            elif not force and self._checked is not None and time.monotonic() - self._checked < REFRESH_S:
+                return
+            self.since = since
+            self._checked = time.monotonic()
+            qs = (Trip.objects.filter(id__gt=self.max_id, start_date__gte=since).order_by("id")
+                  .only("id", "driver", "start_date", "polyline", "stops"))
+            for trip in qs.iterator():
+                self.add(_TripGeom(trip))
+                self.max_id = trip.id
+
+    def _cells_of(self, geom):
+        n = 1 << INDEX_ZOOM
+        x0, y0, x1, y1 = geom.bbox
+        for cx in range(int(x0 * n), min(n - 1, int(x1 * n)) + 1):
+            for cy in range(int(y0 * n), min(n - 1, int(y1 * n)) + 1):
+                yield cx, cy
+
+    def add(self, geom):
+        if geom.bbox is None:
+            return
+        self.trips[geom.id] = geom
+        for c in self._cells_of(geom):
+            self.cells.setdefault(c, set()).add(geom.id)
+
+    def remove(self, geom):
+        del self.trips[geom.id]
+        for c in self._cells_of(geom):
+            ids = self.cells[c]
+            ids.discard(geom.id)
+            if not ids:
+                del self.cells[c]
+
+    def query(self, z, x, y, pad=0.0):
+        """Trips whose bbox meets tile z/x/y (padded by `pad` tile widths)."""
+        if z >= INDEX_ZOOM:
+            shift = z - INDEX_ZOOM
+            cells = {(x >> shift, y >> shift)}
+            if pad:
+                n = 1 << INDEX_ZOOM
+                cells |= {((x >> shift) + dx, (y >> shift) + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                          if 0 <= (x >> shift) + dx < n and 0 <= (y >> shift) + dy < n}
+        else:
+            span = 1 << (INDEX_ZOOM - z)
+            cells = {(cx, cy) for cx in range(x * span, (x + 1) * span) for cy in range(y * span, (y + 1) * span)}
+        ids = set()
+        for c in cells:
+            ids |= self.cells.get(c, set())
+        size = 1.0 / (1 << z)
+        tx0, ty0 = x * size - pad * size, y * size - pad * size
+        tx1, ty1 = (x + 1) * size + pad * size, (y + 1) * size + pad * size
+        out = []
+        for i in sorted(ids):
+            bx0, by0, bx1, by1 = self.trips[i].bbox
+            if bx0 <= tx1 and bx1 >= tx0 and by0 <= ty1 and by1 >= ty0:
+                out.append(self.trips[i])
+        return out
+
+
+def tile_days():
+    try:
+        return int(os.environ.get(TILE_DAYS_ENV, DEFAULT_TILE_DAYS))
+    except ValueError:
+        return DEFAULT_TILE_DAYS
+
+def default_since():
+    return date.today() - timedelta(days=tile_days())
+
+
+_index = None
+
+def get_index(since=None):
+    """The process-wide index, holding trips from `since` (default_since() by default)."""
+    global _index
+    if _index is None:
+        _index = TripTileIndex()
+    _index.refresh(since or default_since())
+    return _index
+
+def render_tile(index, z, x, y, driver=None, since=None):
+    """Encode tile z/x/y with a `routes` line layer and (from STOPS_MIN_ZOOM) a `stops` point layer."""
+    scale = float(1 << z)
+    lo, hi = -BUFFER, EXTENT + BUFFER
+    routes, stops = _Layer(LAYER_ROUTES), _Layer(LAYER_STOPS)
+    for g in index.query(z, x, y, pad=BUFFER / EXTENT):
+        if driver is not None and g.driver != driver:
+            continue
+        if since is not None and (g.start_date is None or g.start_date < since):
+            continue
+        props = {"trip_id": g.id, "driver": g.driver}
+        keep = g.keep(z)
+        xs = [(g.xs[i] * scale - x) * EXTENT for i in keep]
+        ys = [(g.ys[i] * scale - y) * EXTENT for i in keep]
+        routes.add(_LINESTRING, _line_geometry(_clip_line(xs, ys, lo, hi)), props, fid=g.id)
+        if z >= STOPS_MIN_ZOOM:
+            for sx, sy, kind, place in g.stops:
+                px, py = round((sx * scale - x) * EXTENT), round((sy * scale - y) * EXTENT)
+                if lo <= px <= hi and lo <= py <= hi:
+                    stops.add(_POINT, [_command(1, 1), _zigzag(px), _zigzag(py)],
+                              {"trip_id": g.id, "type": kind, "place": place})
+    out = bytearray()
+    for layer in (routes, stops):
+        if layer.features:
+            _field(3, layer.encode(), out)
+    return bytes(out)
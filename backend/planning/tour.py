@@ -0,0 +1,103 @@
+from .routing import _hav_m
+
+LATE_PENALTY = 10.0          # cost hours per hour of lateness past a window end
+INFEASIBLE = 1e9             # dropoff before its shipment's pickup
+
+OFFLINE_SPEED_MPH = 50.0     # straight-line matrix fallback
+OFFLINE_DETOUR    = 1.25     # road distance / straight-line distance
+
+
+def haversine_matrix(latlngs, speed_mph=OFFLINE_SPEED_MPH, detour=OFFLINE_DETOUR):
+    """Offline duration (s) / distance (m) matrix from straight-line distances."""
+    n = len(latlngs)
+    mps = speed_mph * 0.44704
+    dist = [[0.0] * n for _ in range(n)]
+    dur = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            d = _hav_m(latlngs[i], latlngs[j]) * detour
+            dist[i][j] = dist[j][i] = d
+            dur[i][j] = dur[j][i] = d / mps
+    return {"durations": dur, "distances": dist}
+
+
+class Tour:
+    """
+    Open-path ordering of stops 1..n from node 0 (the truck's position).
+    dur: (n+1)x(n+1) hours. service[i]: on-duty hours at stop i.
+    windows[i]: (ready_h, due_h) relative to departure, either may be None.
+    before[i]: node that must be visited before i (pickup of its shipment), or None.
+    """
+
+    def __init__(self, dur, service, windows=None, before=None):
+        self.dur = dur
+        self.n = len(dur) - 1
+        self.service = service
+        self.windows = windows or [(None, None)] * (self.n + 1)
+        self.before = before or [None] * (self.n + 1)
+
+    def cost(self, order):
+        dur, windows, before = self.dur, self.windows, self.before
+        seen = set()
+        t = 0.0
+        late = 0.0
+        prev = 0
+        for i in order:
+            b = before[i]
+            if b is not None and b not in seen:
+                return INFEASIBLE
+            t += dur[prev][i]
+            ready, due = windows[i]
+            if ready is not None and t < ready:
+                t = ready
+            if due is not None and t > due:
+                late += t - due
+            t += self.service[i]
+            seen.add(i)
+            prev = i
+        return t + LATE_PENALTY * late
+
+    def nearest_neighbour(self):
+        left = set(range(1, self.n + 1))
+        order, prev = [], 0
+        while left:
+            ready = [i for i in left if self.before[i] is None or self.before[i] not in left]
+            nxt = min(ready or left, key=lambda i: self.dur[prev][i])
+            order.append(nxt)
+            left.discard(nxt)
+            prev = nxt
+        return order
+
+    def improve(self, order, max_rounds=50):
+        """First-improvement 2-opt (segment reversal) and or-opt (move 1-3 stops)."""
+        best = self.cost(order)
+        n = len(order)
+        for _ in range(max_rounds):
+            improved = False
+            for i in range(n - 1):
+                for j in range(i + 1, n):
+                    cand = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                    c = self.cost(cand)
+                    if c < best - 1e-9:
+                        order, best, improved = cand, c, True
+            for size in (1, 2, 3):
+                for i in range(n - size + 1):
+                    seg = order[i:i + size]
+                    rest = order[:i] + order[i + size:]
+                    for k in range(len(rest) + 1):
+                        if k == i:
+                            continue
+                        cand = rest[:k] + seg + rest[k:]
+                        c = self.cost(cand)
+                        if c < best - 1e-9:
+                            order, best, improved = cand, c, True
+                            break
+            if not improved:
+                break
+        return order, best
+
+    def solve(self):
+        if self.n <= 1:
+            order = list(range(1, self.n + 1))
+            return order, self.cost(order)
+        return self.improve(self.nearest_neighbour())
@@ -0,0 +1,197 @@
+import copy
+import json
+import os
+from zoneinfo import ZoneInfo
+
+# Hour-of-week speed-factor table: 168 multipliers applied to OSRM's
+# baseline duration, indexed by weekday()*24 + hour (Monday 00:00 = 0).
+# 1.0 means OSRM's estimate holds; 1.25 means the same leg takes 25% longer.
+
+HOURS_PER_WEEK = 168
+
+_NIGHT = 0.95
+_WEEKDAY = [
+    _NIGHT, _NIGHT, _NIGHT, _NIGHT, 0.97, 1.05,   # 00-05
+    1.20, 1.30, 1.25, 1.10, 1.02, 1.03,           # 06-11
+    1.05, 1.04, 1.06, 1.15, 1.28, 1.30,           # 12-17
+    1.15, 1.05, 1.00, 0.98, 0.97, 0.96,           # 18-23
+]
+_WEEKEND = [
+    _NIGHT, _NIGHT, _NIGHT, _NIGHT, _NIGHT, _NIGHT,
+    0.96, 0.98, 1.00, 1.04, 1.08, 1.10,
+    1.10, 1.10, 1.08, 1.06, 1.05, 1.04,
+    1.02, 1.00, 0.98, 0.97, 0.96, 0.96,
+]
+
+DEFAULT_PROFILE = tuple(_WEEKDAY * 5 + _WEEKEND * 2)
+
+# Optional JSON file with a flat list of 168 factors overriding the default.
+PROFILE_PATH_ENV = "SPOTTER_TRAFFIC_PROFILE"
+
+# The table is in local time. US zone boundaries follow state and county
+# lines; each line below traces one, south to north, as (lat, lng) vertices
+# to interpolate between, and points east of it are in the zone it's listed
+# with. They're drawn along the counties the boundary follows, so the
+# corridor cities either side (Nashville, Birmingham and Pensacola vs
+# Chattanooga, Louisville and Tallahassee; Amarillo and Williston vs El Paso
+# and Dickinson) land in the right zone. A vertex 0.01 deg above another
+# makes a step where the line jumps along a state border.
+_ZONE_LINES = (
+    ("America/New_York", (
+        (24.0, -85.2), (29.9, -85.2), (30.7, -84.9), (31.0, -85.0),         # Apalachicola River
+        (32.85, -85.18), (34.99, -85.6),                                    # Chattahoochee, GA/AL
+        (35.0, -85.47), (35.6, -85.0), (36.0, -84.7), (36.4, -84.75),       # East Tennessee
+        (36.7, -84.6), (36.9, -84.8), (37.1, -84.9), (37.3, -85.05),        # Kentucky
+        (37.35, -85.4), (37.45, -85.75), (37.6, -86.1), (37.85, -86.3),
+        (38.0, -86.45), (38.2, -86.5), (38.22, -87.0), (38.25, -87.3),      # SW Indiana
+        (38.5, -87.7), (39.0, -87.6), (40.72, -87.53),                      # Wabash
+        (40.76, -86.95), (41.15, -86.95), (41.2, -86.47), (41.76, -86.5),   # NW Indiana
+        (42.0, -87.0), (45.4, -87.2), (45.9, -87.4), (46.3, -88.0),         # Lake Michigan, U.P.
+        (46.4, -89.4), (49.0, -89.4),
+    )),
+    ("America/Chicago", (
+        (25.0, -104.9), (31.99, -104.9), (32.0, -103.06),                   # El Paso, Hudspeth
+        (36.99, -103.0), (37.0, -102.05), (37.7, -102.05),                  # NM, OK panhandle
+        (37.75, -101.5), (39.5, -101.4), (42.0, -101.4), (43.0, -101.2),    # KS, NE
+        (44.0, -101.0), (44.4, -100.38), (45.95, -100.55),                  # SD: Missouri River
+        (46.45, -101.3), (47.0, -101.8), (47.3, -102.6), (47.6, -104.05),   # SW North Dakota
+        (49.0, -104.05),
+    )),
+    ("America/Denver", (
+        (31.0, -114.8), (32.69, -114.7), (33.0, -114.5), (33.6, -114.55),   # Colorado River
+        (34.3, -114.35), (34.85, -114.55), (35.0, -114.63), (36.0, -114.05),
+        (42.0, -114.05), (42.01, -117.5), (44.5, -117.3),                   # NV/UT, Malheur County
+        (45.45, -116.8), (45.55, -114.5), (46.6, -114.4),                   # Salmon River, ID/MT
+        (47.5, -115.7), (48.0, -116.05), (49.0, -116.05),
+    )),
+)
+
+# Mountain time without DST; the Navajo Nation, which keeps DST, is ignored.
+_ARIZONA = (31.3, 37.0, -109.045)   # lat from, lat to, east edge
+
+
+def _line_lng(line, lat):
+    """Longitude of a zone line at lat (its end vertices beyond its ends)."""
+    if lat <= line[0][0]:
+        return line[0][1]
+    for (lat0, lng0), (lat1, lng1) in zip(line, line[1:]):
+        if lat <= lat1:
+            return lng0 + (lng1 - lng0) * (lat - lat0) / (lat1 - lat0)
+    return line[-1][1]
+
+
+def zone_for(lat: float, lng: float) -> ZoneInfo:
+    """Local time zone of a US location, to county-line precision on the main corridors."""
+    if lat < 25.0 and lng < -150.0:
+        return ZoneInfo("Pacific/Honolulu")
+    if lng < -130.0:
+        return ZoneInfo("America/Anchorage")
+    for name, line in _ZONE_LINES:
+        if lng >= _line_lng(line, lat):
+            if name == "America/Denver" and _ARIZONA[0] <= lat <= _ARIZONA[1] and lng <= _ARIZONA[2]:
+                return ZoneInfo("America/Phoenix")
+            return ZoneInfo(name)
+    return ZoneInfo("America/Los_Angeles")
+
+
+class SpeedProfile:
+    """Array-indexed hour-of-week speed factors.
+
+    Progress along the route is measured in *baseline hours* (OSRM's
+    duration); wall-clock driving time is baseline time scaled by the
+    factor of the hour in which it is driven.
+
+    Hours are read on the clock of `tz` (see localized()); without one, on
+    the clock of the datetime passed in. The hour index advances by one per
+    hour from the start, so a DST change mid-trip shifts the rest of the
+    trip by an hour.
+    """
+
+    tz = None
+
+    def __init__(self, factors=DEFAULT_PROFILE):
+        factors = [float(f) for f in factors]
+        if len(factors) != HOURS_PER_WEEK:
+            raise ValueError(f"Speed profile needs {HOURS_PER_WEEK} factors, got {len(factors)}")
+        if min(factors) <= 0:
+            raise ValueError("Speed factors must be positive")
+        self.factors = tuple(factors)
+
+    def localized(self, tz) -> "SpeedProfile":
+        """The same factors read on the local clock of `tz`."""
+        local = copy.copy(self)
+        local.tz = tz
+        return local
+
+    def _local(self, dt):
+        return dt.astimezone(self.tz) if self.tz is not None and dt.tzinfo is not None else dt
+
+    def factor_at(self, dt) -> float:
+        dt = self._local(dt)
+        return self.factors[dt.weekday() * 24 + dt.hour]
+
+    def _slices(self, start_dt):
+        """Yield (factor, hours until next hour boundary) starting at start_dt."""
+        start_dt = self._local(start_dt)
+        idx = start_dt.weekday() * 24 + start_dt.hour
+        first = 1.0 - (start_dt.minute * 60 + start_dt.second + start_dt.microsecond / 1e6) / 3600.0
+        yield self.factors[idx], first
+        while True:
+            idx = (idx + 1) % HOURS_PER_WEEK
+            yield self.factors[idx], 1.0
+
+    def progress(self, start_dt, wall_hours: float) -> float:
+        """Baseline hours covered by driving `wall_hours` from start_dt."""
+        done = 0.0
+        left = wall_hours
+        for f, span in self._slices(start_dt):
+            if left <= 1e-12:
+                break
+            step = min(span, left)
+            done += step / f
+            left -= step
+        return done
+
+    def wall_hours(self, start_dt, baseline_hours: float, limit: float = None) -> float:
+        """Wall-clock hours needed to cover `baseline_hours`, capped at `limit`."""
+        wall = 0.0
+        left = baseline_hours
+        for f, span in self._slices(start_dt):
+            if left <= 1e-12 or (limit is not None and wall >= limit - 1e-12):
+                break
+            need = left * f
+            if need <= span:
+                wall += need
+                left = 0.0
+            else:
+                wall += span
+                left -= span / f
+        return wall if limit is None else min(wall, limit)
+
+
+class FlatProfile(SpeedProfile):
+    """Factor 1.0 everywhere: driving time equals OSRM's duration."""
+
+    def __init__(self):
+        super().__init__([1.0] * HOURS_PER_WEEK)
+
+    def progress(self, start_dt, wall_hours):
+        return wall_hours
+
+    def wall_hours(self, start_dt, baseline_hours, limit=None):
+        return baseline_hours if limit is None else min(baseline_hours, limit)
+
+
+_profile = None
+
+def get_profile() -> SpeedProfile:
+    """Load the configured profile once per process (bundled default if unset)."""
+    global _profile
+    if _profile is None:
+        path = os.environ.get(PROFILE_PATH_ENV)
+        if path:
+            with open(path) as fh:
+                _profile = SpeedProfile(json.load(fh))
+        else:
+            _profile = SpeedProfile()
+    return _profile
@@ -1,26 +1,47 @@
+import csv
+import io
+import json
+import time
 from datetime import datetime, timezone, timedelta
-from django.http import HttpResponse
+from urllib.parse import quote
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
 from dateutil import parser as dtparser
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import PlanTripInput
-from .routing import geocode_place, osrm_route, point_on_polyline
-from .hos import plan_schedule, parse_start_time
+from .serializers import AddressImportInput, PlanTripInput, ReplanInput, SweepInput
+from .models import Trip, TripDay
+from .routing import (
+    geocode_place, osrm_route, osrm_table, route_geometry, point_at_distance, encode_polyline6,
+    distance_fraction_at, progress_at_distance_fraction,
+)
+from .hos import plan_schedule, parse_start_time, PRETRIP_H
+from .hos_opt import optimize_schedule
 from .logbook import render_svg, normalize_segments
-from rest_framework.exceptions import ValidationError
-
-STATE_ABBR = {
-    "Alabama":"AL","Alaska":"AK","Arizona":"AZ","Arkansas":"AR","California":"CA","Colorado":"CO",
-    "Connecticut":"CT","Delaware":"DE","Florida":"FL","Georgia":"GA","Hawaii":"HI","Idaho":"ID",
-    "Illinois":"IL","Indiana":"IN","Iowa":"IA","Kansas":"KS","Kentucky":"KY","Louisiana":"LA",
-    "Maine":"ME","Maryland":"MD","Massachusetts":"MA","Michigan":"MI","Minnesota":"MN","Mississippi":"MS",
-    "Missouri":"MO","Montana":"MT","Nebraska":"NE","Nevada":"NV","New Hampshire":"NH","New Jersey":"NJ",
-    "New Mexico":"NM","New York":"NY","North Carolina":"NC","North Dakota":"ND","Ohio":"OH","Oklahoma":"OK",
-    "Oregon":"OR","Pennsylvania":"PA","Rhode Island":"RI","South Carolina":"SC","South Dakota":"SD",
-    "Tennessee":"TN","Texas":"TX","Utah":"UT","Vermont":"VT","Virginia":"VA","Washington":"WA",
-    "West Virginia":"WV","Wisconsin":"WI","Wyoming":"WY"
-}
+from .traffic import get_profile, zone_for, FlatProfile
+from .fuel import get_stations, plan_fuel_stops
+from .poi import get_index as get_poi_index, snap_stops
+from .revgeo import STATE_ABBR, get_places
+from .tour import Tour, haversine_matrix
+from .spatial import simplify, CORRIDOR_TOL_M
+from .replan import store_plan, load_plan, get_track, remaining_route
+from .alternatives import route_candidates
+from .geoimport import AddressImport
+from .tiles import MAX_ZOOM, default_since, get_index as get_tile_index, render_tile
+from rest_framework.exceptions import APIException, ValidationError
+
+PLANNERS = {"greedy": plan_schedule, "optimal": optimize_schedule}
+
+TRIPS_PAGE_MAX = 100
+SVG_CACHE_S = 24 * 3600
+SWEEP_BUDGET_S = 4.0     # optimizing planner's search time across all sweep starts
+IMPORT_BUDGET_S = 20.0   # upstream geocoding per upload, inside the worker timeout (gunicorn.conf.py)
+TILE_CACHE_S = 300
+TILE_MAX_AGE_S = 60
 
 def _compact_place(display_name: str) -> str:
     # "City, County, State, United States" -> "City, ST"
@@ -43,23 +64,6 @@ def _to_dt(day_date_str, hhmm, tz):
     hh, mm = map(int, hhmm.split(":"))
     return datetime(day.year, day.month, day.day, hh, mm, tzinfo=tz)
 
-def _drive_hours_until(days, stop_dt, tz):
-    """Sum driving hours from trip start until stop_dt."""
-    total_h = 0.0
-    for day in days:
-        for seg in day["segments"]:
-            a = _to_dt(day["date"], seg["from"], tz)
-            b = _to_dt(day["date"], seg["to"], tz)
-            # add only the overlap that occurs before stop_dt
-            if b <= a:
-                b += timedelta(days=1)
-            if a >= stop_dt:
-                return total_h
-            end = min(b, stop_dt)
-            if seg["status"] == "D" and end > a:
-                total_h += (end - a).total_seconds() / 3600.0
-    return total_h
-
 def _labels_for_day(day_date_str, stops, tz):
     labels = []
     for s in stops:
@@ -67,40 +71,33 @@ def _labels_for_day(day_date_str, stops, tz):
         if t.date().isoformat() != day_date_str:
             continue
         kind = s["type"]
-        if kind == "pickup_on_duty":
+        where = s.get("place") or s.get("near")
+        if kind == "pretrip_on_duty":
+            text = f"Pre-trip/TIV — {_compact_place(s.get('near','')) or 'Start'}"
+        elif kind in ("pickup_on_duty", "dropoff_on_duty") and "stop_index" in s:
+            verb = "Pickup" if kind == "pickup_on_duty" else "Dropoff"
+            text = f"{verb} — {_compact_place(s.get('near','')) or 'Stop ' + str(s['stop_index'] + 1)}"
+        elif kind == "pickup_on_duty":
             text = f"Pre-trip/TIV — {_compact_place(s.get('near','')) or 'Pickup'}"
         elif kind == "break_30min":
-            text = "30-min break"
+            text = f"30-min break — {where}" if where else "30-min break"
         elif kind == "overnight_off":
-            text = "10-hr break"
+            text = f"10-hr break — {where}" if where else "10-hr break"
+        elif kind in ("sleeper_berth", "off_duty_rest"):
+            what = f"{s['duration_min'] // 60}-hr {'sleeper berth' if kind == 'sleeper_berth' else 'off duty'}"
+            text = f"{what} — {where}" if where else what
         elif kind == "dropoff_on_duty":
             text = f"Post-trip/TIV — {_compact_place(s.get('near','')) or 'Dropoff'}"
         elif kind == "fuel_stop":
-            text = "Fuel stop"
+            text = f"Fuel — {where}" if where else "Fuel stop"
         else:
             text = kind.replace("_", " ").title()
         labels.append({"time": t.strftime("%H:%M"), "text": text})
     return sorted(labels, key=lambda L: L["time"])
 
-def _dt_at_drive_fraction(days, tz, fraction: float):
-    """Return datetime at which the cumulative driving reaches `fraction` of total driving."""
-    # total driving hours in schedule
-    total_drive = 0.0
-    for d in days:
-        for seg in d["segments"]:
-            if seg["status"] != "D":
-                continue
-            a = _to_dt(d["date"], seg["from"], tz)
-            b = _to_dt(d["date"], seg["to"], tz)
-            if b <= a:
-                b += timedelta(days=1)
-            total_drive += (b - a).total_seconds() / 3600.0
-
-    if total_drive <= 1e-9:
-        # no driving — just return the start of the first day
-        return _to_dt(days[0]["date"], "00:00", tz)
-
-    target = max(0.0, min(1.0, float(fraction))) * total_drive
+def _dt_at_progress(days, tz, progress: float, total_drive_h: float, profile):
+    """Return datetime at which driving has covered `progress` of the route's baseline duration."""
+    target = max(0.0, min(1.0, float(progress))) * total_drive_h
     cum = 0.0
     for d in days:
         for seg in d["segments"]:
@@ -111,19 +108,145 @@ def _dt_at_drive_fraction(days, tz, fraction: float):
             if b <= a:
                 b += timedelta(days=1)
             dur = (b - a).total_seconds() / 3600.0
-            if cum + dur >= target:
-                return a + timedelta(hours=(target - cum))
-            cum += dur
+            covered = profile.progress(a, dur)
+            if cum + covered >= target:
+                return a + timedelta(hours=profile.wall_hours(a, target - cum, limit=dur))
+            cum += covered
 
     # Fallback: end of last day
     return _to_dt(days[-1]["date"], "24:00", tz)
 
-@api_view(["POST"])
-def plan_trip(request):
-    ser = PlanTripInput(data=request.data)
-    ser.is_valid(raise_exception=True)
-    data = ser.validated_data
+def _enrich_stops(schedule, route, start_dt, profile, pinned, geometry=None):
+    """
+    Attach coordinates/labels to scheduled stops and add fuel stops.
+    pinned(stop) returns the geocoded place of a stop at a known location
+    (pickup, dropoff, ...) or None for stops placed along the route.
+    geometry: (points, cumulative metres, total metres, simplified vertex
+    indices) when already known; decoded from route["polyline"] otherwise.
+    """
+    if geometry is None:
+        pts, cum, total_m = route_geometry(route["polyline"])
+        keep = simplify(pts, CORRIDOR_TOL_M)
+    else:
+        pts, cum, total_m, keep = geometry
+    enriched_stops = []
+    en_route = []
+    hos = []
+    for s in schedule["stops"]:
+        t = dict(s)
+        place = pinned(s)
+        if place is not None:
+            t["lat"], t["lng"], t["near"] = place["lat"], place["lng"], place["display_name"]
+        else:
+            # break / overnight: place on route by drive progress, mapped to distance
+            along = distance_fraction_at(route, s["progress"]) * total_m
+            p = point_at_distance(pts, cum, along)
+            t["lat"], t["lng"], t["near"] = p["lat"], p["lng"], None
+            hos.append((t, along))
+            en_route.append(t)
+        enriched_stops.append(t)
+
+    # snap breaks/overnights to truck stops / rest areas in one corridor pass
+    hos_along_m = []
+    snaps = snap_stops(pts, cum, [along for _, along in hos], get_poi_index(), keep=keep)
+    for (t, along), snap in zip(hos, snaps):
+        if snap is not None:
+            t["lat"], t["lng"], t["near"] = snap["lat"], snap["lng"], snap["near"]
+            along = snap["along_m"]
+        hos_along_m.append(along)
+
+    # fuel stops within tank range, at corridor stations (preferably during HOS stops)
+    for f in plan_fuel_stops(pts, cum, hos_along_m, stations=get_stations(), keep=keep):
+        progress = progress_at_distance_fraction(route, f["along_m"] / total_m if total_m > 0 else 1.0)
+        when = _dt_at_progress(schedule["days"], start_dt.tzinfo, progress, route["duration_hours"], profile)
+        t = {
+            "type": "fuel_stop",
+            "at_iso": when.isoformat(),
+            "duration_min": 0,
+            "progress": progress,
+            "lat": f["lat"],
+            "lng": f["lng"],
+            "near": f["near"],
+        }
+        enriched_stops.append(t)
+        en_route.append(t)
+
+    # "City, ST" for every intermediate stop, resolved locally in one batch
+    places = get_places()
+    if places is not None and en_route:
+        for t, label in zip(en_route, places.nearest_many([(t["lat"], t["lng"]) for t in en_route])):
+            t["place"] = label
+            if t["near"] is None:
+                t["near"] = label
+    return enriched_stops
+
+def _plan_days(schedule, stops, tz):
+    return [{
+        "date": day["date"],
+        "segments": normalize_segments(day["segments"]),
+        "totals": day.get("totals", {}),
+        "labels": _labels_for_day(day["date"], stops, tz),
+    } for day in schedule["days"]]
+
+def _plan_summary(route, schedule):
+    return {
+        "distance_miles": round(route["distance_miles"], 1),
+        "drive_hours": round(schedule["summary"]["drive_hours"], 2),
+        "cycle_used_hours": round(schedule["summary"]["cycle_used_hours"], 2),
+        "cycle_max_hours": schedule["summary"]["cycle_max_hours"],
+        "cycle_exceeded": schedule["summary"]["cycle_exceeded"],
+        "planner": schedule["summary"].get("planner", "greedy"),
+    }
 
+class RouteUnavailable(APIException):
+    status_code = status.HTTP_502_BAD_GATEWAY
+    default_detail = "We couldn't compute a route between those locations. Please try again."
+
+def _order_stops(data, cur, stop_places, start_dt):
+    """Visiting order (indices into data["stops"]) from a duration matrix and 2-opt/or-opt."""
+    stops_in = data["stops"]
+    n = len(stops_in)
+    if not data.get("optimize_order", True) or n < 2:
+        return list(range(n))
+    latlngs = [(cur["lat"], cur["lng"])] + [(p["lat"], p["lng"]) for p in stop_places]
+    try:
+        matrix = osrm_table([(lng, lat) for lat, lng in latlngs])
+    except Exception:
+        matrix = haversine_matrix(latlngs)
+    dur = [[v / 3600.0 for v in row] for row in matrix["durations"]]
+
+    def rel_h(dt):
+        return None if dt is None else (dt - start_dt).total_seconds() / 3600.0
+
+    service = [PRETRIP_H] + [st["on_duty_min"] / 60.0 for st in stops_in]
+    windows = [(None, None)] + [(rel_h(st.get("window_start_iso")), rel_h(st.get("window_end_iso"))) for st in stops_in]
+    pickups = {st["shipment"]: k + 1 for k, st in enumerate(stops_in) if st["kind"] == "pickup" and st.get("shipment")}
+    before = [None] + [
+        pickups.get(st.get("shipment")) if st["kind"] == "dropoff" else None for st in stops_in
+    ]
+    order, _ = Tour(dur, service, windows, before).solve()
+    return [k - 1 for k in order]
+
+def _route(points, alternatives=0):
+    """Primary route, plus candidate (route, geometry) pairs when alternatives are asked for."""
+    try:
+        if alternatives:
+            candidates = route_candidates(points, alternatives)
+            return candidates[0][0], candidates
+        return osrm_route(points, annotations=True), None
+    except Exception:
+        raise RouteUnavailable()
+
+def _waypoints(route, specs):
+    """Waypoint positions in baseline drive hours from the route's leg durations."""
+    waypoints = []
+    at_h = 0.0
+    for spec, leg_s in zip(specs, route["leg_durations_s"]):
+        at_h = min(at_h + leg_s / 3600.0, route["duration_hours"])
+        waypoints.append({"at_h": at_h, **spec})
+    return waypoints
+
+def _prepare_classic(data, alternatives=0):
     errors = {}
 
     # geocode
@@ -147,86 +270,328 @@ def plan_trip(request):
 
     # build route current->pickup->dropoff
     points = [(cur["lng"], cur["lat"]), (pu["lng"], pu["lat"]), (do["lng"], do["lat"])]
-    
+    route, candidates = _route(points, alternatives)
+
+    pins = {"pickup_on_duty": pu, "dropoff_on_duty": do}
+    return {
+        "route": route,
+        "places": {
+            "current": cur,
+            "pickup": pu,
+            "dropoff": do
+        },
+        "waypoints": [],
+        "waypoint_specs": [],
+        "candidates": candidates,
+        "first_stop": None,
+        "last_stop": None,
+        "places_by_type": pins,
+        "places_by_index": [],
+        "order": None,
+    }
+
+def _prepare_multi_stop(data, start_dt, alternatives=0):
+    errors = {}
     try:
-        route = osrm_route(points)
+        cur = geocode_place(data["current_location"])
     except Exception:
-        return Response(
-            {"detail": "We couldn't compute a route between those locations. Please try again."},
-            status=status.HTTP_502_BAD_GATEWAY,
-        )
+        errors["current_location"] = ["We couldn't find that place. Try 'City, ST' (e.g., 'Dallas, TX')."]
 
-    # HOS plan
-    start_dt = parse_start_time(data.get("start_time_iso"))
-    schedule = plan_schedule(
-        total_drive_hours = route["duration_hours"],
+    stop_places, stop_errors = [], []
+    for st in data["stops"]:
+        try:
+            stop_places.append(geocode_place(st["location"]))
+            stop_errors.append({})
+        except Exception:
+            stop_places.append(None)
+            stop_errors.append({"location": ["We couldn't find this stop. Try 'City, ST' or a full address."]})
+    if any(stop_errors):
+        errors["stops"] = stop_errors
+    if errors:
+        raise ValidationError(errors)
+
+    order = _order_stops(data, cur, stop_places, start_dt)
+
+    points = [(cur["lng"], cur["lat"])] + [(stop_places[i]["lng"], stop_places[i]["lat"]) for i in order]
+    route, candidates = _route(points, alternatives)
+
+    def spec(i):
+        st = data["stops"][i]
+        return {
+            "type": f"{st['kind']}_on_duty",
+            "duration_h": st["on_duty_min"] / 60.0,
+            "ready_at": st.get("window_start_iso"),
+            "stop_index": i,
+        }
+
+    specs = [spec(i) for i in order[:-1]]
+    return {
+        "route": route,
+        "places": {"current": cur, "stops": stop_places},
+        "waypoints": _waypoints(route, specs),
+        "waypoint_specs": specs,
+        "candidates": candidates,
+        "first_stop": {"type": "pretrip_on_duty", "duration_h": PRETRIP_H},
+        "last_stop": spec(order[-1]),
+        "places_by_type": {"pretrip_on_duty": cur},
+        "places_by_index": stop_places,
+        "order": order,
+    }
+
+def _prepare_trip(data, start_dt, alternatives=0):
+    """
+    Geocode and route a trip once; everything plan_schedule needs besides the
+    start time. With alternatives, "candidates" holds the routes to compare.
+    """
+    if data.get("stops"):
+        return _prepare_multi_stop(data, start_dt, alternatives)
+    return _prepare_classic(data, alternatives)
+
+def _schedule(trip, start_dt, cycle_used, profile, planner="greedy", **opts):
+    return PLANNERS[planner](
+        total_drive_hours = trip["route"]["duration_hours"],
         start_dt = start_dt,
-        current_cycle_used = float(data["current_cycle_used_hours"])
+        current_cycle_used = cycle_used,
+        profile = profile,
+        waypoints = trip["waypoints"],
+        first_stop = trip["first_stop"],
+        last_stop = trip["last_stop"],
+        **opts,
     )
 
-    # Enrich stops with coords along the route
-    enriched_stops = []
-    total_drive_h = route["duration_hours"]
-    for s in schedule["stops"]:
-        t = dict(s)
-        if s["type"] == "pickup_on_duty":
-            t["lat"], t["lng"], t["near"] = pu["lat"], pu["lng"], pu["display_name"]
-        elif s["type"] == "dropoff_on_duty":
-            t["lat"], t["lng"], t["near"] = do["lat"], do["lng"], do["display_name"]
-        else:
-            # break / overnight: place on route by drive progress fraction
-            stop_dt = dtparser.parse(s["at_iso"])
-            drive_h = _drive_hours_until(schedule["days"], stop_dt, start_dt.tzinfo)
-            frac = 0.0 if total_drive_h <= 0 else min(max(drive_h / total_drive_h, 0.0), 1.0)
-            p = point_on_polyline(route["polyline"], frac)
-            t["lat"], t["lng"], t["near"] = p["lat"], p["lng"], None
-        enriched_stops.append(t)
+def _profile(data, lat, lng):
+    """Speed profile for the request, on the local clock where the driver starts."""
+    if not data.get("traffic_aware", True):
+        return FlatProfile()
+    return get_profile().localized(zone_for(lat, lng))
 
-    # fuel stops every ~1000 miles as route markers
-    dist_miles = route["distance_miles"]
-    if dist_miles >= 1000:
-        fuel_count = int(dist_miles // 1000)
-        for i in range(1, fuel_count + 1):
-            frac = (i * 1000.0) / dist_miles
-            when = _dt_at_drive_fraction(schedule["days"], start_dt.tzinfo, frac)
-            p = point_on_polyline(route["polyline"], frac)
-            enriched_stops.append({
-                "type": "fuel_stop",
-                "at_iso": when.isoformat(),
-                "duration_min": 0,
-                "lat": p["lat"],
-                "lng": p["lng"],
-                "near": None,
-            })
-
-
-
-    normalized_days = []
-    for day in schedule["days"]:
-        normalized_days.append({
-            "date": day["date"],
-            "segments": normalize_segments(day["segments"]),
-            "totals": day.get("totals", {}),
-            "labels": _labels_for_day(day["date"], enriched_stops, start_dt.tzinfo),
-        })
+def _pinned(places_by_type, places_by_index):
+    def pinned(s):
+        if "stop_index" in s:
+            return places_by_index[s["stop_index"]]
+        return places_by_type.get(s["type"])
+    return pinned
+
+def _plan_candidate(trip, candidate, start_dt, cycle_used, profile, planner, pinned):
+    """Schedule and enrich one candidate route, reusing its decoded geometry."""
+    route, geometry = candidate
+    trip = dict(trip, route=route, waypoints=_waypoints(route, trip["waypoint_specs"]))
+    schedule = _schedule(trip, start_dt, cycle_used, profile, planner)
+    return trip, schedule, _enrich_stops(schedule, route, start_dt, profile, pinned, geometry=geometry)
+
+def _plan_arrival(schedule):
+    last = schedule["stops"][-1]
+    return dtparser.isoparse(last["at_iso"]) + timedelta(minutes=last["duration_min"])
+
+def _rank_candidates(plans):
+    """Legal plans first, then earliest arrival, least cycle used, shortest distance."""
+    def key(plan):
+        trip, schedule, _ = plan
+        summary = schedule["summary"]
+        return (summary["cycle_exceeded"], _plan_arrival(schedule), summary["cycle_used_hours"],
+                trip["route"]["distance_m"])
+    return sorted(plans, key=key)
+
+@api_view(["POST"])
+def plan_trip(request):
+    ser = PlanTripInput(data=request.data)
+    ser.is_valid(raise_exception=True)
+    data = ser.validated_data
+
+    start_dt = parse_start_time(data.get("start_time_iso"))
+    trip = _prepare_trip(data, start_dt, data["alternatives"])
+
+    # HOS plan
+    profile = _profile(data, trip["places"]["current"]["lat"], trip["places"]["current"]["lng"])
+    cycle_used = float(data["current_cycle_used_hours"])
+    pinned = _pinned(trip["places_by_type"], trip["places_by_index"])
+    if trip["candidates"]:
+        # every candidate gets the full plan; the best one becomes the trip. In
+        # turn, not in threads: this is pure-Python CPU work, and with the
+        # optimal planner each search gets its whole time budget uncontended
+        plans = _rank_candidates([
+            _plan_candidate(trip, c, start_dt, cycle_used, profile, data["planner"], pinned)
+            for c in trip["candidates"]
+        ])
+        trip, schedule, enriched_stops = plans[0]
+    else:
+        plans = []
+        schedule = _schedule(trip, start_dt, cycle_used, profile, data["planner"])
+        enriched_stops = _enrich_stops(schedule, trip["route"], start_dt, profile, pinned)
+    route = trip["route"]
+    route_id = store_plan(route, trip["waypoints"], last_stop=trip["last_stop"],
+                          places_by_type=trip["places_by_type"], places_by_index=trip["places_by_index"])
 
     out = {
+        "route_id": route_id,
         "polyline": route["polyline"],
-        "summary": {
+        "summary": _plan_summary(route, schedule),
+        "places": trip["places"],
+        "stops": enriched_stops,
+        "days": _plan_days(schedule, enriched_stops, start_dt.tzinfo)
+    }
+    if trip["order"] is not None:
+        out["order"] = trip["order"]
+    if plans:
+        out["alternatives"] = [{
+            "rank": rank,
+            "polyline": alt["route"]["polyline"],
+            "summary": _plan_summary(alt["route"], alt_schedule),
+            "arrival_iso": _plan_arrival(alt_schedule).isoformat(),
+            "overnights": sum(1 for s in alt_schedule["stops"] if s["type"] in ("overnight_off", "sleeper_berth")),
+            "stops": alt_stops,
+        } for rank, (alt, alt_schedule, alt_stops) in enumerate(plans[1:], start=2)]
+    out["trip_id"] = Trip.from_plan(out, driver=data.get("driver", "")).id
+    return Response(out, status=status.HTTP_200_OK)
+
+def _sweep_candidate(schedule, start_dt, has_appt, appt_end):
+    stops = schedule["stops"]
+    # no stops at all when there is nothing to drive: already there
+    arrival = dtparser.isoparse(stops[-1]["at_iso"]) if stops else start_dt
+    summary = schedule["summary"]
+    cand = {
+        "start_iso": start_dt.isoformat(),
+        "arrival_iso": arrival.isoformat(),
+        "overnights": sum(1 for s in stops if s["type"] in ("overnight_off", "sleeper_berth")),
+        "duration_hours": round((arrival - start_dt).total_seconds() / 3600.0, 2),
+        "cycle_used_hours": round(summary["cycle_used_hours"], 2),
+        "cycle_exceeded": summary["cycle_exceeded"],
+    }
+    if has_appt:
+        late_min = max(0.0, (arrival - appt_end).total_seconds() / 60.0) if appt_end else 0.0
+        cand["on_time"] = late_min == 0
+        cand["late_min"] = int(round(late_min))
+    return cand, arrival
+
+def _best_candidate(cands, has_appt):
+    """
+    Legal candidates first. Against an appointment: on time, then least late,
+    fewest overnights, latest start (least idle before the dock). Otherwise
+    earliest arrival, then fewest overnights.
+    """
+    if not cands:
+        return None
+    def key(item):
+        k, (cand, arrival) = item
+        illegal = 1 if cand["cycle_exceeded"] else 0
+        if has_appt:
+            return (illegal, cand["late_min"], cand["overnights"], -k)
+        return (illegal, arrival, cand["overnights"], k)
+    k, _ = min(enumerate(cands), key=key)
+    return k
+
+@api_view(["POST"])
+def plan_sweep(request):
+    """
+    Evaluate the HOS plan for every start time in a window. Geocoding and
+    routing happen once; each candidate is an HOS schedule only (no stop
+    enrichment), so a 100-start sweep costs about as much as one plan.
+    """
+    ser = SweepInput(data=request.data)
+    ser.is_valid(raise_exception=True)
+    data = ser.validated_data
+
+    w0 = parse_start_time(data["window_start_iso"])
+    w1 = parse_start_time(data["window_end_iso"])
+    trip = _prepare_trip(data, w0)
+    route = trip["route"]
+
+    appt_start = data.get("appointment_start_iso")
+    appt_end = data.get("appointment_end_iso")
+    has_appt = appt_start is not None or appt_end is not None
+    last_stop = trip["last_stop"] or {"type": "dropoff_on_duty", "duration_h": 1.0}
+    if appt_start is not None:
+        # don't start the final stop before the dock opens
+        ready = last_stop.get("ready_at")
+        last_stop = dict(last_stop, ready_at=max(ready, appt_start) if ready else appt_start)
+    trip = dict(trip, last_stop=last_stop)
+
+    profile = _profile(data, trip["places"]["current"]["lat"], trip["places"]["current"]["lng"])
+    cycle_used = float(data["current_cycle_used_hours"])
+    step = timedelta(minutes=data["step_min"])
+    # the optimizer's search time is shared out over the starts still to plan,
+    # so time one start leaves unused (or overruns) carries to the rest
+    deadline = time.perf_counter() + SWEEP_BUDGET_S
+    starts_left = int((w1 - w0) / step) + 1
+
+    cands = []
+    start_dt = w0
+    while start_dt <= w1:
+        opts = {}
+        if data["planner"] == "optimal":
+            opts["budget_s"] = max(0.0, deadline - time.perf_counter()) / starts_left
+            starts_left -= 1
+        schedule = _schedule(trip, start_dt, cycle_used, profile, data["planner"], **opts)
+        cands.append(_sweep_candidate(schedule, start_dt, has_appt, appt_end))
+        start_dt += step
+
+    best = _best_candidate(cands, has_appt)
+
+    out = {
+        "route": {
             "distance_miles": round(route["distance_miles"], 1),
-            "drive_hours": round(route["duration_hours"], 2),
-            "cycle_used_hours": round(schedule["summary"]["cycle_used_hours"], 2),
-            "cycle_max_hours": schedule["summary"]["cycle_max_hours"],
-            "cycle_exceeded": schedule["summary"]["cycle_exceeded"]
+            "duration_hours": round(route["duration_hours"], 2),
         },
-        "places": {
-            "current": cur,
-            "pickup": pu,
-            "dropoff": do
+        "places": trip["places"],
+        "candidates": [c for c, _ in cands],
+        "best": None if best is None else cands[best][0],
+    }
+    if trip["order"] is not None:
+        out["order"] = trip["order"]
+    return Response(out, status=status.HTTP_200_OK)
+
+@api_view(["POST"])
+def replan_trip(request):
+    """Re-schedule the rest of a planned trip from the driver's position and duty counters."""
+    ser = ReplanInput(data=request.data)
+    ser.is_valid(raise_exception=True)
+    data = ser.validated_data
+
+    route_id = data.get("route_id")
+    if not route_id:
+        route_id = get_object_or_404(Trip.objects.only("route_id"), pk=data["trip_id"]).route_id
+    plan = load_plan(route_id)
+    if plan is None:
+        return Response({"detail": "That route is no longer available. Please plan the trip again."},
+                        status=status.HTTP_404_NOT_FOUND)
+    route = plan["route"]
+    track = get_track(route["polyline"])
+    hit = track.project(data["lat"], data["lng"])
+    if hit is None:
+        raise ValidationError({"lat": ["This position is not on the planned route."]})
+    along_m, off_route_m = hit
+    remaining, geometry, done_h = remaining_route(route, track, along_m)
+
+    # on-duty stops still ahead, repositioned relative to the driver
+    waypoints = [dict(w, at_h=w["at_h"] - done_h) for w in plan["waypoints"] if w["at_h"] > done_h + 1e-6]
+    now = data.get("at_iso") or datetime.now(timezone.utc)
+    profile = _profile(data, data["lat"], data["lng"])
+    schedule = PLANNERS[data["planner"]](
+        total_drive_hours = remaining["duration_hours"],
+        start_dt = now,
+        current_cycle_used = float(data["cycle_used_hours"]),
+        profile = profile,
+        waypoints = waypoints,
+        last_stop = plan["last_stop"],
+        state = {
+            "drive_today": data["drive_today_hours"],
+            "duty_elapsed": data["duty_window_elapsed_hours"],
+            "since_break_drive": data["since_break_drive_hours"],
         },
+    )
+
+    pinned = _pinned(plan["places_by_type"], plan["places_by_index"])
+    enriched_stops = _enrich_stops(schedule, remaining, now, profile, pinned, geometry=geometry)
+    out = {
+        "route_id": route_id,
+        "progress": along_m / track.total if track.total > 0 else 1.0,
+        "off_route_m": round(off_route_m, 1),
+        "summary": _plan_summary(remaining, schedule),
         "stops": enriched_stops,
-        "days": normalized_days
+        "days": _plan_days(schedule, enriched_stops, now.tzinfo),
     }
+    if data["include_polyline"]:
+        out["polyline"] = encode_polyline6(geometry[0])
     return Response(out, status=status.HTTP_200_OK)
 
 @api_view(["POST"])
@@ -237,4 +602,121 @@ def render_logbook(request):
     if not date or not segments:
         return Response({"detail": "Provide JSON with 'date' and 'segments'."}, status=400)
     svg = render_svg(date, segments, labels=labels)
-    return HttpResponse(svg, content_type="image/svg+xml")
\ No newline at end of file
+    return HttpResponse(svg, content_type="image/svg+xml")
+
+@api_view(["POST"])
+def import_addresses(request):
+    """
+    Geocode an uploaded CSV (multipart `file`) and stream the results back as
+    NDJSON, one line per row as it resolves, then a totals line. Nominatim
+    lookups stop after IMPORT_BUDGET_S; the totals line then has done false
+    and the first row left. Answers are cached, so re-uploading continues
+    from there; files that need more belong to `manage.py import_addresses`.
+    A row that can't be read ends the stream the same way, with an error.
+    """
+    ser = AddressImportInput(data=request.data)
+    ser.is_valid(raise_exception=True)
+    data = ser.validated_data
+
+    fh = io.TextIOWrapper(data["file"].file, encoding="utf-8-sig", newline="")
+    try:
+        job = AddressImport(fh, columns=data.get("columns") or ["address"], upstream=not data["cache_only"],
+                            budget_s=IMPORT_BUDGET_S)
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise ValidationError({"file": [f"We couldn't read that CSV: {e}"]})
+
+    def lines():
+        last = 0
+        try:
+            for n, row, result in job:
+                yield json.dumps({"row": n, "address": job.address(row), **result}) + "\n"
+                last = n
+        except (UnicodeDecodeError, csv.Error) as e:
+            yield json.dumps({
+                "done": False, "next_row": last + 1, "stats": job.stats,
+                "error": f"We couldn't read the CSV after row {last}: {e}",
+            }) + "\n"
+            return
+        if job.stopped_at is None:
+            yield json.dumps({"done": True, "stats": job.stats}) + "\n"
+        else:
+            yield json.dumps({
+                "done": False, "next_row": job.stopped_at, "stats": job.stats,
+                "detail": "Geocoding time for one upload ran out. Upload the file again to continue "
+                          "(rows so far are cached), or run manage.py import_addresses for large files.",
+            }) + "\n"
+
+    return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+
+@api_view(["GET"])
+def list_trips(request):
+    """Newest first, keyset-paginated on id: pass the previous page's next_before as ?before=."""
+    qs = Trip.objects.order_by("-id").only("id", "driver", "start_date", "created_at", "summary")
+    driver = request.query_params.get("driver")
+    if driver is not None:
+        qs = qs.filter(driver=driver)
+    try:
+        before = request.query_params.get("before")
+        if before:
+            qs = qs.filter(id__lt=int(before))
+        limit = max(1, min(TRIPS_PAGE_MAX, int(request.query_params.get("limit", 20))))
+    except ValueError:
+        raise ValidationError({"detail": ["'before' and 'limit' must be integers."]})
+    rows = list(qs[:limit + 1])
+    page = rows[:limit]
+    return Response({
+        "results": [{
+            "trip_id": t.id,
+            "driver": t.driver,
+            "start_date": t.start_date,
+            "created_at": t.created_at,
+            "summary": t.summary,
+        } for t in page],
+        "next_before": page[-1].id if len(rows) > limit else None,
+    })
+
+@api_view(["GET"])
+def trip_detail(request, trip_id):
+    trip = get_object_or_404(Trip.objects.prefetch_related("days"), pk=trip_id)
+    return Response(trip.as_plan())
+
+@require_GET
+def trip_day_svg(request, trip_id, date):
+    """Render a stored log day; trips are immutable, so the SVG is cached server- and client-side."""
+    try:
+        date = datetime.strptime(date, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        return JsonResponse({"detail": "Use a YYYY-MM-DD date."}, status=400)
+    key = f"trip-svg:{trip_id}:{date}"
+    svg = cache.get(key)
+    if svg is None:
+        days = list(TripDay.objects.filter(trip_id=trip_id, date=date))
+        if not days:
+            get_object_or_404(Trip, pk=trip_id)
+            return HttpResponse(status=404)
+        # a calendar date can hold more than one duty period
+        segments = [seg for d in days for seg in d.segments() if seg["status"] != "OFF"]
+        labels = [lab for d in days for lab in d.labels]
+        svg = render_svg(date, segments, labels=labels)
+        cache.set(key, svg, SVG_CACHE_S)
+    resp = HttpResponse(svg, content_type="image/svg+xml")
+    patch_cache_control(resp, public=True, max_age=SVG_CACHE_S)
+    return resp
+
+@require_GET
+def vector_tile(request, z, x, y):
+    """Fleet map: stored trips' routes and stops as a Mapbox Vector Tile (?driver= to filter)."""
+    if z > MAX_ZOOM or x >= 1 << z or y >= 1 << z:
+        return HttpResponse(status=404)
+    driver = request.GET.get("driver") or None
+    since = default_since()
+    index = get_tile_index(since)
+    # the index version moves with every new trip, so stale tiles are never served
+    key = f"tile:{index.version}:{since}:{quote(driver or '')}:{z}/{x}/{y}"
+    data = cache.get(key)
+    if data is None:
+        data = render_tile(index, z, x, y, driver=driver, since=since)
+        cache.set(key, data, TILE_CACHE_S)
+    resp = HttpResponse(data, content_type="application/vnd.mapbox-vector-tile")
+    patch_cache_control(resp, public=True, max_age=TILE_MAX_AGE_S)
+    return resp
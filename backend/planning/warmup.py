@@ -0,0 +1,52 @@
+import gc
+import time
+from importlib import import_module
+
+from . import fuel, geoimport, logbook, poi, revgeo, tiles, traffic
+
+# Read-only data every worker needs. Under gunicorn with preload_app
+# (gunicorn.conf.py) this runs once in the master before workers fork, so the
+# workers share it copy-on-write; the POI index is an mmap and is shared
+# through the page cache either way.
+
+
+def _urlconf():
+    from django.conf import settings
+    return import_module(settings.ROOT_URLCONF)
+
+WARMUPS = (
+    ("urlconf and views", _urlconf),
+    ("traffic profile", traffic.get_profile),
+    ("place index", revgeo.get_places),
+    ("gazetteer", geoimport.get_gazetteer),
+    ("truck stop index", poi.get_index),
+    ("fuel stations", fuel.get_stations),
+    ("logbook grid", logbook.grid_svg),
+    ("trip tile index", tiles.get_index),
+)
+
+
+def warm_up(steps=WARMUPS):
+    """Run each step; returns [(name, seconds, status)], status being ok, missing (no dataset) or the error."""
+    report = []
+    for name, build in steps:
+        t0 = time.perf_counter()
+        try:
+            status = "ok" if build() is not None else "missing"
+        except Exception as e:
+            status = f"failed: {e}"
+        report.append((name, time.perf_counter() - t0, status))
+    return report
+
+
+def freeze():
+    """
+    Call in the master once preloading is done. Database connections opened
+    while warming must not be inherited by workers, and moving everything
+    allocated so far out of the collector's reach keeps worker collections
+    from writing to (and so un-sharing) the preloaded pages.
+    """
+    from django.db import connections
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
@@ -1,6 +1,6 @@
 import { useEffect, useMemo, useState } from "react";
 import MapView from "./components/MapView";
-import { planTrip, renderLogbookSVG } from "./lib/api";
+import { planTrip, renderLogbookSVG, fetchTripDaySVG } from "./lib/api";
 
 export default function App() {
   const [form, setForm] = useState({
@@ -19,6 +19,7 @@ export default function App() {
   const [logbooksLoading, setLogbooksLoading] = useState(false);
   const [triedSubmit, setTriedSubmit] = useState(false);
   const [apiError, setApiError] = useState(null);
+  const [showFleet, setShowFleet] = useState(false);
 
   const onChange = (e) => {
     const { name, value } = e.target;
@@ -96,11 +97,13 @@ const onSubmit = async (e) => {
       try {
         const entries = await Promise.all(
           trip.days.map(async (d) => {
-            const svg = await renderLogbookSVG({
-              date: d.date,
-              segments: d.segments,
-              labels: d.labels ?? [],
-            });
+            const svg = trip.trip_id
+              ? await fetchTripDaySVG(trip.trip_id, d.date)
+              : await renderLogbookSVG({
+                  date: d.date,
+                  segments: d.segments,
+                  labels: d.labels ?? [],
+                });
             return [d.date, svg];
           })
         );
@@ -254,6 +257,10 @@ const onSubmit = async (e) => {
               <div className="bg-white shadow rounded-2xl p-5">
                 <div className="flex items-center justify-between">
                   <h2 className="text-lg font-semibold">Route</h2>
+                  <label className="ml-auto mr-4 text-sm text-gray-600 flex items-center gap-1">
+                    <input type="checkbox" checked={showFleet} onChange={e => setShowFleet(e.target.checked)} />
+                    Show fleet
+                  </label>
                   <div className="text-sm text-gray-600">
                     {trip.summary.distance_miles} mi • {trip.summary.drive_hours} hrs
                     {trip.summary.cycle_exceeded && (
@@ -264,7 +271,7 @@ const onSubmit = async (e) => {
                   </div>
                 </div>
                 <div className="mt-3">
-                  <MapView polyline={trip.polyline} places={trip.places} stops={trip.stops} />
+                  <MapView polyline={trip.polyline} places={trip.places} stops={trip.stops} fleet={showFleet} />
                 </div>
               </div>
             </section>
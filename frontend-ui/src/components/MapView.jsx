@@ -2,8 +2,9 @@ import { useEffect, useRef } from "react";
 import maplibregl from "maplibre-gl";
 import "maplibre-gl/dist/maplibre-gl.css";
 import { decodePolyline6 } from "../lib/polyline6";
+import { fleetTileURL } from "../lib/api";
 
-export default function MapView({ polyline, places, stops }) {
+export default function MapView({ polyline, places, stops, fleet = false }) {
   const mapRef = useRef(null);
   const containerRef = useRef(null);
 
@@ -19,6 +20,25 @@ export default function MapView({ polyline, places, stops }) {
     mapRef.current = map;
 
     map.on("load", () => {
+      if (fleet) {
+        // every stored trip, served as vector tiles and drawn under this trip
+        map.addSource("fleet", { type: "vector", tiles: [fleetTileURL()], maxzoom: 14 });
+        map.addLayer({
+          id: "fleet-routes",
+          type: "line",
+          source: "fleet",
+          "source-layer": "routes",
+          paint: { "line-width": 2, "line-color": "#9ca3af", "line-opacity": 0.7 },
+        });
+        map.addLayer({
+          id: "fleet-stops",
+          type: "circle",
+          source: "fleet",
+          "source-layer": "stops",
+          paint: { "circle-radius": 3, "circle-color": "#6b7280" },
+        });
+      }
+
       if (!polyline) return;
 
       const lineCoords = decodePolyline6(polyline);
@@ -72,7 +92,7 @@ export default function MapView({ polyline, places, stops }) {
     });
 
     return () => mapRef.current?.remove();
-  }, [polyline, places, stops]);
+  }, [polyline, places, stops, fleet]);
 
   return <div ref={containerRef} className="w-full h-96 rounded-xl border" />;
 }
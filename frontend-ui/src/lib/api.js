@@ -28,3 +28,14 @@ export async function renderLogbookSVG(payload) {
   if (!r.ok) throw new Error(`renderLogbook failed: ${r.status}`);
   return await r.text();
 }
+
+export async function fetchTripDaySVG(tripId, date) {
+  const r = await fetch(`${BASE}/api/trips/${tripId}/days/${date}.svg`);
+  if (!r.ok) throw new Error(`fetchTripDaySVG failed: ${r.status}`);
+  return await r.text();
+}
+
+// Vector tiles of all stored trips (routes + stops) for the fleet overlay.
+export function fleetTileURL() {
+  return `${BASE}/tiles/{z}/{x}/{y}.mvt`;
+}